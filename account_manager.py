@@ -1,9 +1,7 @@
 import os
 import json
 import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from discovery_cache import discovery_cache
 
 class AccountManager:
     ACCOUNTS_FILE = 'accounts.json'
@@ -39,11 +37,13 @@ class AccountManager:
             if not os.path.exists(self.CLIENT_SECRETS_FILE):
                 return False, f"'{self.CLIENT_SECRETS_FILE}' not found."
 
+            # Imported on first use: the OAuth libraries are only needed while linking an account.
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file(self.CLIENT_SECRETS_FILE, self.SCOPES)
             creds = flow.run_local_server(port=0)
 
             # Get channel info to use as a friendly name
-            service = build('youtube', 'v3', credentials=creds)
+            service = discovery_cache.build('youtube', 'v3', creds)
             response = service.channels().list(part='snippet', mine=True).execute()
             
             if not response.get('items'):
@@ -0,0 +1,141 @@
+"""
+Replacement soundtracks prepared once and shared by every render that uses them.
+
+A track is decoded, loudness-normalised (two-pass loudnorm, measured once per track) and encoded
+to AAC a single time. Renders then loop and trim the prepared file with a stream copy instead of
+decoding and encoding the same music bed for every video in the batch.
+"""
+from typing import Dict, Optional, Tuple
+import hashlib
+import json
+import math
+import os
+import re
+import subprocess
+import tempfile
+import threading
+
+TARGET_LUFS = -14.0      # YouTube plays music back at about this loudness
+TARGET_TRUE_PEAK = -1.0
+TARGET_LRA = 11.0
+SAMPLE_RATE = 48000
+AUDIO_BITRATE = "192k"
+
+_LOUDNORM_JSON_RE = re.compile(r"\{[^{}]*\"input_i\"[^{}]*\}", re.S)
+_MEASURED_KEYS = ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")
+
+
+class AudioCache:
+    """
+    Prepared soundtracks stored as `<key>.m4a` in CACHE_DIR.
+
+    The key covers the track's absolute path, size and modification time and the normalisation
+    target, so an edited track is prepared again while an unchanged one never is. Files are written
+    to a temporary name and renamed into place, so render processes never see a partial track.
+    """
+    CACHE_DIR = 'audio_cache'
+    SUFFIX = '.m4a'
+
+    def __init__(self, cache_dir: Optional[str] = None, ffmpeg_path: Optional[str] = None):
+        self.cache_dir = cache_dir or self.CACHE_DIR
+        self._ffmpeg_path = ffmpeg_path
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def ffmpeg_path(self) -> Optional[str]:
+        if not self._ffmpeg_path:
+            # Imported here because ffmpeg_backend itself uses this cache.
+            from ffmpeg_backend import find_ffmpeg
+            self._ffmpeg_path = find_ffmpeg()
+        return self._ffmpeg_path
+
+    def key_for(self, audio_path: str, normalize: bool = True) -> str:
+        stat = os.stat(audio_path)
+        target = f"{TARGET_LUFS}/{TARGET_TRUE_PEAK}/{TARGET_LRA}" if normalize else "none"
+        key = f"{os.path.abspath(audio_path)}|{stat.st_size}|{stat.st_mtime_ns}|{target}|{SAMPLE_RATE}|{AUDIO_BITRATE}"
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    def cached_path(self, audio_path: str, normalize: bool = True) -> str:
+        return os.path.join(self.cache_dir, self.key_for(audio_path, normalize) + self.SUFFIX)
+
+    def lookup(self, audio_path: str, normalize: bool = True) -> Optional[str]:
+        try:
+            path = self.cached_path(audio_path, normalize)
+        except OSError:
+            return None
+        return path if os.path.exists(path) else None
+
+    def is_prepared(self, path: Optional[str]) -> bool:
+        return bool(path) and path.endswith(self.SUFFIX) and \
+            os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.cache_dir)
+
+    def prepare(self, audio_path: str, normalize: bool = True) -> Tuple[bool, str]:
+        """
+        Returns the prepared copy of `audio_path`, creating it on first use.
+
+        Returns:
+            Tuple[bool, str]: A success flag and the prepared file path or an error message.
+        """
+        if not self.ffmpeg_path:
+            return (False, "ffmpeg executable not found.")
+        try:
+            target = self.cached_path(audio_path, normalize)
+        except OSError as e:
+            return (False, f"Cannot read audio track: {e}")
+        with self._lock_for(target):
+            if os.path.exists(target):
+                return (True, target)
+            filters = []
+            if normalize:
+                measured = self._measure_loudness(audio_path)
+                if measured:
+                    filters.append(
+                        f"loudnorm=I={TARGET_LUFS}:TP={TARGET_TRUE_PEAK}:LRA={TARGET_LRA}"
+                        f":measured_I={measured['input_i']}:measured_TP={measured['input_tp']}"
+                        f":measured_LRA={measured['input_lra']}:measured_thresh={measured['input_thresh']}"
+                        f":offset={measured['target_offset']}:linear=true"
+                    )
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.audio_', suffix=self.SUFFIX, dir=self.cache_dir)
+            os.close(fd)
+            cmd = [self.ffmpeg_path, "-hide_banner", "-nostdin", "-y", "-i", audio_path, "-vn", "-map", "0:a:0"]
+            if filters:
+                cmd += ["-af", ",".join(filters)]
+            cmd += ["-ar", str(SAMPLE_RATE), "-ac", "2", "-c:a", "aac", "-b:a", AUDIO_BITRATE,
+                    "-movflags", "+faststart", tmp_path]
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+            if result.returncode != 0:
+                os.remove(tmp_path)
+                return (False, f"Preparing audio track failed: {result.stderr.strip()[-2000:]}")
+            os.replace(tmp_path, target)
+            return (True, target)
+
+    def track_for(self, audio_path: str, normalize: bool = True) -> str:
+        """The prepared track when it exists or can be made, otherwise the original file."""
+        ok, result = self.prepare(audio_path, normalize)
+        return result if ok else audio_path
+
+    def _measure_loudness(self, audio_path: str) -> Optional[Dict[str, str]]:
+        """First loudnorm pass; None for silent or unmeasurable tracks, which are left as they are."""
+        cmd = [self.ffmpeg_path, "-hide_banner", "-nostdin", "-i", audio_path, "-vn", "-map", "0:a:0",
+               "-af", f"loudnorm=I={TARGET_LUFS}:TP={TARGET_TRUE_PEAK}:LRA={TARGET_LRA}:print_format=json",
+               "-f", "null", "-"]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+        matches = _LOUDNORM_JSON_RE.findall(result.stderr)
+        if result.returncode != 0 or not matches:
+            return None
+        try:
+            measured = json.loads(matches[-1])
+            if not all(math.isfinite(float(measured[key])) for key in _MEASURED_KEYS):
+                return None
+        except (ValueError, KeyError):
+            return None
+        return {key: measured[key] for key in _MEASURED_KEYS}
+
+    def _lock_for(self, target: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(target, threading.Lock())
+
+
+audio_cache = AudioCache()
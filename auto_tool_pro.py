@@ -1,82 +1,82 @@
 import sys
 import os
-import json
+import multiprocessing
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QLabel, QLineEdit, QAction, QComboBox, QProgressBar,
+    QLabel, QLineEdit, QAction, QProgressBar, QSpinBox,
     QFileDialog, QMessageBox, QFrame, QScrollArea, QTableView, QHeaderView, 
-    QTextEdit, QTabWidget
+    QTextEdit, QTabWidget, QCheckBox, QAbstractItemView
 )
-from PyQt5.QtGui import QStandardItemModel, QStandardItem, QColor
-from PyQt5.QtCore import Qt, QThread, QObject, pyqtSignal, QUrl
+from PyQt5.QtCore import Qt, QThread, QObject, QTimer, pyqtSignal, QUrl
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
 from PyQt5.QtMultimediaWidgets import QVideoWidget
 
 # Import local modules
-from config import VideoConfig, YouTubeConfig
-from video_processor import VideoProcessor
-from youtube_uploader import YouTubeUploader
-from folder_watcher import FolderWatcher
+from config import VIDEO_EXTENSIONS
+from resumable_upload import DEFAULT_CHUNK_SIZE
+from quota_tracker import QuotaTracker, DEFAULT_DAILY_LIMIT
+from job_store import JobStore, STATE_LABELS
+from render_pool import default_render_workers
+from render_cache import RenderCache
+from folder_watcher import DEFAULT_STABLE_SECONDS
+from file_index import FileIndex
+from bulk_ingest import FolderScanner, FolderWatcher, SessionReader, MediaProber
+from media_probe import MediaProbeCache
+from engine import ProcessingEngine, EngineEvents, build_tasks
 from account_manager import AccountManager
 from accounts_dialog import AccountsDialog
 from preset_manager import PresetManager
 from presets_dialog import PresetsDialog
+from queue_model import QueueTableModel, QueueRecord, ComboDelegate, NO_PRESET, PRESET_COLUMN, CHANNEL_COLUMN, MEDIA_COLUMN
+
+# Restored jobs are added to the queue table this many rows per event-loop turn.
+RESTORE_CHUNK_SIZE = 1000
 
 class ProcessingWorker(QObject):
-   
+    """
+    Runs a ProcessingEngine on a QThread and turns its events into signals for the window.
+    Keyword arguments are passed to the engine.
+    """
     log_updated = pyqtSignal(str)
     overall_progress_updated = pyqtSignal(int, str)
     task_status_updated = pyqtSignal(int, str)
-    task_progress_updated = pyqtSignal(int)
+    task_progress_updated = pyqtSignal(int, int)
     task_finished = pyqtSignal(str, bool)
+    quota_updated = pyqtSignal(str)
 
-    def __init__(self, tasks, processor, uploader):
+    def __init__(self, tasks, job_store, **engine_options):
         super().__init__()
-        self.tasks, self.processor, self.uploader = tasks, processor, uploader
-        self.is_cancelled = False
+        self.engine = ProcessingEngine(tasks, job_store, events=_SignalEvents(self), **engine_options)
 
     def run(self):
-        total_tasks = len(self.tasks)
-        for i, task_info in enumerate(self.tasks):
-            if self.is_cancelled:
-                self.log_updated.emit("Processing cancelled by user.")
-                break
-            
-            row, input_path, yt_config, token_file, output_folder, video_config = task_info.values()
-            
-            self.task_status_updated.emit(row, "Processing...")
-            self.log_updated.emit(f"Processing: {os.path.basename(input_path)}")
-            self.overall_progress_updated.emit(int((i / total_tasks) * 100), f"Processing {i+1}/{total_tasks}")
-            
-            try:
-                base_name, _ = os.path.splitext(os.path.basename(input_path))
-                output_path = os.path.join(output_folder, f"{base_name}_processed_{int(datetime.now().timestamp())}.mp4")
-                
-                process_ok, process_msg = self.processor.process_video(
-                    input_path, output_path, video_config, self.is_cancelled, self.task_progress_updated.emit
-                )
-                if not process_ok: raise RuntimeError(process_msg)
-                
-                self.task_status_updated.emit(row, "Uploading...")
-                self.log_updated.emit(f"Uploading: {os.path.basename(output_path)}")
-                self.task_progress_updated.emit(0)
-                if "{filename}" in yt_config.title:
-                    yt_config.title = yt_config.title.replace("{filename}", base_name)
-                
-                upload_ok, upload_msg = self.uploader.upload_video(
-                    output_path, yt_config, token_file, self.task_progress_updated.emit
-                )
-                if not upload_ok: raise RuntimeError(upload_msg)
-                
-                self.task_status_updated.emit(row, "Completed")
-            except Exception as e:
-                self.task_status_updated.emit(row, "Error")
-                self.log_updated.emit(f"Error with {os.path.basename(input_path)}: {e}")
-        
-        self.task_finished.emit("Queue processing finished!", False)
+        self.engine.run()
+
+    def stop(self):
+        self.engine.stop()
+
+
+class _SignalEvents(EngineEvents):
+    def __init__(self, worker):
+        self.worker = worker
+
+    def log(self, message):
+        self.worker.log_updated.emit(message)
 
-    def stop(self): self.is_cancelled = True
+    def overall_progress(self, percent, text):
+        self.worker.overall_progress_updated.emit(percent, text)
+
+    def task_status(self, row, status):
+        self.worker.task_status_updated.emit(row, status)
+
+    def task_progress(self, row, percent):
+        self.worker.task_progress_updated.emit(row, percent)
+
+    def quota(self, summary):
+        self.worker.quota_updated.emit(summary)
+
+    def finished(self, message, is_error):
+        self.worker.task_finished.emit(message, is_error)
 
 class AutoVideoTool(QMainWindow):
     def __init__(self):
@@ -86,14 +86,22 @@ class AutoVideoTool(QMainWindow):
         
         self.account_manager = AccountManager()
         self.preset_manager = PresetManager()
-        self.processor = VideoProcessor()
-        self.uploader = YouTubeUploader()
+        self.job_store = JobStore()
+        self.file_index = FileIndex()
+        self.media_probe = MediaProbeCache()
+        self.media_prober = MediaProber(self.media_probe)
+        self.render_cache = RenderCache(max_bytes=int(self.job_store.get_setting("render_cache_gb", "20")) * 1024 ** 3)
+        self.quota_tracker = QuotaTracker(daily_limit=int(self.job_store.get_setting("quota_daily_limit", str(DEFAULT_DAILY_LIMIT))))
         self.processing_thread, self.processing_worker = None, None
         self.watcher_thread, self.folder_watcher = None, None
+        self.ingest_thread, self.ingest_worker = None, None
+        self._ingest_cancelled, self._ingest_source, self._ingest_added = False, None, 0
+        self._pending_records, self._pending_position = None, 0
         self.is_processing = False
 
         self._init_ui()
         self._apply_stylesheet()
+        self._restore_jobs()
 
     def _log(self, message):
         if hasattr(self, 'log_textbox'):
@@ -111,12 +119,19 @@ class AutoVideoTool(QMainWindow):
         main_layout.addWidget(left_panel, 2)
         left_layout.addWidget(QLabel("<h2>Queue Dashboard</h2>"))
         self.queue_view = QTableView()
-        self.queue_model = QStandardItemModel()
-        self.queue_model.setHorizontalHeaderLabels(["Status", "Filename", "Editing Preset", "Upload To Channel"])
+        self.queue_model = QueueTableModel(self.job_store.update_selection, self)
+        self.queue_model.set_presets(list(self.preset_manager.get_presets().keys()))
+        self.queue_model.set_accounts(self.account_manager.get_accounts())
         self.queue_view.setModel(self.queue_model)
+        self.media_prober.probed.connect(self.queue_model.set_media)
+        # Combo boxes are only created while a cell is edited, not kept for every row.
+        self.queue_view.setItemDelegateForColumn(PRESET_COLUMN, ComboDelegate(self.queue_model.preset_choices, self.queue_view))
+        self.queue_view.setItemDelegateForColumn(CHANNEL_COLUMN, ComboDelegate(self.queue_model.channel_choices, self.queue_view))
+        self.queue_view.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked | QAbstractItemView.EditKeyPressed)
         header = self.queue_view.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents); header.setSectionResizeMode(1, QHeaderView.Stretch)
         header.setSectionResizeMode(2, QHeaderView.ResizeToContents); header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(MEDIA_COLUMN, QHeaderView.ResizeToContents)
         self.queue_view.selectionModel().selectionChanged.connect(self.on_queue_selection_changed)
         left_layout.addWidget(self.queue_view)
 
@@ -161,9 +176,9 @@ class AutoVideoTool(QMainWindow):
     def _create_menu(self):
         menubar = self.menuBar()
         file_menu = menubar.addMenu("File")
-        save_action = QAction("Save Session...", self); load_action = QAction("Load Session...", self)
-        save_action.triggered.connect(self.save_session); load_action.triggered.connect(self.load_session)
-        file_menu.addAction(save_action); file_menu.addAction(load_action)
+        save_action = QAction("Save Session...", self); self.load_action = QAction("Load Session...", self)
+        save_action.triggered.connect(self.save_session); self.load_action.triggered.connect(self.load_session)
+        file_menu.addAction(save_action); file_menu.addAction(self.load_action)
         
         settings_menu = menubar.addMenu("Settings")
         presets_action = QAction("Manage Presets...", self)
@@ -192,9 +207,7 @@ class AutoVideoTool(QMainWindow):
         if not indexes:
             self.player.stop()
             return
-        selected_row = indexes[0].row()
-        path_item = self.queue_model.item(selected_row, 1)
-        video_path = path_item.data(Qt.UserRole)
+        video_path = self._input_path(indexes[0].row())
         if video_path and os.path.exists(video_path):
             self.player.setMedia(QMediaContent(QUrl.fromLocalFile(video_path)))
             self.main_tabs.setCurrentIndex(1)
@@ -203,50 +216,113 @@ class AutoVideoTool(QMainWindow):
             self.player.stop()
 
     def save_session(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Session", "", "JSON Files (*.json)")
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Session", "", "Session Files (*.db)")
         if not file_path: return
-        session_data = {
-            "batch_settings": {"output_folder": self.output_entry.text(), "title_template": self.title_entry.text()},
-            "queue": []
-        }
-        for row in range(self.queue_model.rowCount()):
-            channel_combo = self.queue_view.indexWidget(self.queue_model.index(row, 3))
-            preset_combo = self.queue_view.indexWidget(self.queue_model.index(row, 2))
-            session_data["queue"].append({
-                "video_path": self.queue_model.item(row, 1).data(Qt.UserRole),
-                "selected_token_file": channel_combo.currentData() if channel_combo else None,
-                "selected_preset": preset_combo.currentText() if preset_combo else "None (No Effects)"
-            })
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(session_data, f, indent=4)
+            self._save_batch_settings()
+            self.job_store.save_as(file_path)
             self._log(f"Session saved successfully to {file_path}")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Could not save session: {e}")
 
     def load_session(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Load Session", "", "JSON Files (*.json)")
+        if self._ingest_busy(): return
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Session", "", "Session Files (*.db);;Legacy JSON Sessions (*.json)")
         if not file_path: return
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-            self.clear_queue()
-            self.output_entry.setText(session_data.get("batch_settings", {}).get("output_folder", ""))
-            self.title_entry.setText(session_data.get("batch_settings", {}).get("title_template", ""))
-            for task_data in session_data.get("queue", []):
-                self._add_item_to_model(task_data["video_path"])
-                new_row_index = self.queue_model.rowCount() - 1
-                preset_combo = self.queue_view.indexWidget(self.queue_model.index(new_row_index, 2))
-                if preset_combo:
-                    index = preset_combo.findText(task_data["selected_preset"])
-                    if index != -1: preset_combo.setCurrentIndex(index)
-                channel_combo = self.queue_view.indexWidget(self.queue_model.index(new_row_index, 3))
-                if channel_combo:
-                    index = channel_combo.findData(task_data["selected_token_file"])
-                    if index != -1: channel_combo.setCurrentIndex(index)
-            self._log(f"Session loaded successfully from {file_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Could not load session: {e}")
+        # The file is read on a worker thread; the store is only replaced once it has been read completely.
+        reader = SessionReader(file_path)
+        reader.loaded.connect(self._on_session_read)
+        reader.failed.connect(self._on_session_failed)
+        reader.finished.connect(self._on_session_reader_finished)
+        self._start_ingest(reader, file_path, f"Reading session {os.path.basename(file_path)}...")
+
+    def _on_session_read(self, jobs, settings):
+        if self._ingest_cancelled: return
+        self.job_store.replace_contents(jobs, settings)
+        self._restore_jobs()
+        self._log(f"Session loaded successfully from {self._ingest_source}")
+
+    def _on_session_failed(self, error):
+        QMessageBox.critical(self, "Error", f"Could not load session: {error}")
+
+    def _on_session_reader_finished(self, count, cancelled):
+        if cancelled or self._ingest_cancelled:
+            self._log("Loading the session was cancelled; the queue is unchanged.")
+        self._end_ingest()
+
+    def _save_batch_settings(self):
+        self.job_store.set_setting("output_folder", self.output_entry.text())
+        self.job_store.set_setting("title_template", self.title_entry.text())
+
+    def _restore_jobs(self):
+        """
+        Rebuilds the queue table from the job store, e.g. after a restart or a session load.
+
+        Rows are added RESTORE_CHUNK_SIZE at a time from the event loop, so a large queue fills in
+        progressively instead of freezing the window.
+        """
+        self.queue_model.clear()
+        self.output_entry.setText(self.job_store.get_setting("output_folder", self.output_entry.text()))
+        self.title_entry.setText(self.job_store.get_setting("title_template", self.title_entry.text()))
+        jobs = self.job_store.list_jobs()
+        self._pending_records = [
+            QueueRecord(job['id'], job['input_path'], STATE_LABELS[job['state']], job['preset_name'], job['token_file'])
+            for job in jobs
+        ]
+        self._pending_position = 0
+        # Unfinished inputs are probed again in case they changed; most come straight from the probe cache.
+        self.media_prober.submit([record for record, job in zip(self._pending_records, jobs) if job['state'] != "done"])
+        self._refresh_ingest_ui("Loading queue...")
+        self._restore_next_chunk()
+        unfinished = sum(1 for job in jobs if job['state'] != "done")
+        if unfinished:
+            self._log(f"Restored {len(jobs)} jobs from the job store ({unfinished} not finished yet).")
+
+    def _restore_next_chunk(self):
+        if self._pending_records is None: return
+        end = self._pending_position + RESTORE_CHUNK_SIZE
+        self.queue_model.append_records(self._pending_records[self._pending_position:end])
+        self._pending_position = min(end, len(self._pending_records))
+        self.ingest_progress.setRange(0, len(self._pending_records)); self.ingest_progress.setValue(self._pending_position)
+        if self._pending_position < len(self._pending_records):
+            QTimer.singleShot(0, self._restore_next_chunk)
+        else:
+            self._pending_records = None
+            self._refresh_ingest_ui()
+
+    # --- Background ingest (Add Folder, Load Session) ---
+    def _ingest_busy(self):
+        return self.ingest_thread is not None or self._pending_records is not None
+
+    def _start_ingest(self, worker, source, label):
+        """Runs a FolderScanner or SessionReader on its own thread; queue edits are disabled until it is done."""
+        self._ingest_cancelled, self._ingest_source, self._ingest_added = False, source, 0
+        self.ingest_worker, self.ingest_thread = worker, QThread()
+        worker.moveToThread(self.ingest_thread)
+        self.ingest_thread.started.connect(worker.run)
+        self._refresh_ingest_ui(label)
+        self.ingest_thread.start()
+
+    def _end_ingest(self):
+        if self.ingest_thread: self.ingest_thread.quit(); self.ingest_thread.wait()
+        self.ingest_thread, self.ingest_worker = None, None
+        self._refresh_ingest_ui()
+
+    def _refresh_ingest_ui(self, label=None):
+        busy = self._ingest_busy()
+        for widget in self.queue_buttons: widget.setEnabled(not busy)
+        self.load_action.setEnabled(not busy)
+        if label is not None:
+            self.ingest_label.setText(label); self.ingest_progress.setRange(0, 0)
+        # Only a running scan or read can be cancelled; a restore is already committed to the store.
+        self.ingest_cancel_btn.setEnabled(self.ingest_thread is not None and not self._ingest_cancelled)
+        for widget in (self.ingest_label, self.ingest_progress, self.ingest_cancel_btn): widget.setVisible(busy)
+
+    def cancel_ingest(self):
+        if self.ingest_worker: self.ingest_worker.stop()
+        # Batches already waiting in the event queue are dropped as well.
+        self._ingest_cancelled = True
+        self.ingest_label.setText("Cancelling..."); self._refresh_ingest_ui()
 
     def _create_queue_controls_section(self):
         layout = self._create_section("1. Queue Management")
@@ -256,9 +332,15 @@ class AutoVideoTool(QMainWindow):
         add_folder_btn.clicked.connect(self.add_folder_to_queue)
         remove_btn.clicked.connect(self.remove_selected_from_queue)
         clear_btn.clicked.connect(self.clear_queue)
+        self.queue_buttons = (add_videos_btn, add_folder_btn, remove_btn, clear_btn)
         btn_layout1 = QHBoxLayout(); btn_layout1.addWidget(add_videos_btn); btn_layout1.addWidget(add_folder_btn)
         btn_layout2 = QHBoxLayout(); btn_layout2.addWidget(remove_btn); btn_layout2.addWidget(clear_btn)
         layout.addLayout(btn_layout1); layout.addLayout(btn_layout2)
+        self.ingest_label = QLabel(); self.ingest_progress = QProgressBar()
+        self.ingest_cancel_btn = QPushButton("Cancel"); self.ingest_cancel_btn.clicked.connect(self.cancel_ingest)
+        ingest_layout = QHBoxLayout(); ingest_layout.addWidget(self.ingest_progress); ingest_layout.addWidget(self.ingest_cancel_btn)
+        layout.addWidget(self.ingest_label); layout.addLayout(ingest_layout)
+        for widget in (self.ingest_label, self.ingest_progress, self.ingest_cancel_btn): widget.setVisible(False)
 
     def _create_watched_folder_section(self):
         layout = self._create_section("2. Watched Folder (Auto-Add)")
@@ -267,6 +349,20 @@ class AutoVideoTool(QMainWindow):
         browse_btn.clicked.connect(self.select_watched_folder)
         folder_layout = QHBoxLayout(); folder_layout.addWidget(self.watched_folder_entry); folder_layout.addWidget(browse_btn)
         layout.addLayout(folder_layout)
+        self.watch_stable_spin = QSpinBox(); self.watch_stable_spin.setRange(1, 3600); self.watch_stable_spin.setSuffix(" s")
+        self.watch_stable_spin.setValue(int(self.job_store.get_setting("watch_stable_seconds", str(int(DEFAULT_STABLE_SECONDS)))))
+        self.watch_stable_spin.setToolTip("A new video is added once its size and modification time have not changed for this long, "
+                                          "so files still being copied in are not queued half-written.")
+        stable_layout = QHBoxLayout(); stable_layout.addWidget(QLabel("Wait Until Unchanged For:")); stable_layout.addWidget(self.watch_stable_spin)
+        layout.addLayout(stable_layout)
+        self.watch_recursive_check = QCheckBox("Include subfolders")
+        self.watch_recursive_check.setChecked(self.job_store.get_setting("watch_recursive", "0") == "1")
+        self.watch_polling_check = QCheckBox("Polling mode (network shares)")
+        self.watch_polling_check.setChecked(self.job_store.get_setting("watch_polling", "0") == "1")
+        self.watch_polling_check.setToolTip("Checks the folder every few seconds instead of relying on change notifications, "
+                                            "which network drives often do not deliver.")
+        watch_options_layout = QHBoxLayout(); watch_options_layout.addWidget(self.watch_recursive_check); watch_options_layout.addWidget(self.watch_polling_check)
+        layout.addLayout(watch_options_layout)
         self.watch_toggle_btn = QPushButton("Start Watching"); self.watch_toggle_btn.setCheckable(True)
         self.watch_toggle_btn.toggled.connect(self.toggle_watching)
         layout.addWidget(self.watch_toggle_btn)
@@ -286,6 +382,59 @@ class AutoVideoTool(QMainWindow):
         self.btn_cancel.clicked.connect(self.cancel_processing)
         btn_layout = QHBoxLayout(); btn_layout.addWidget(self.btn_start); btn_layout.addWidget(self.btn_cancel)
         layout.addLayout(btn_layout)
+        self.render_workers_spin = QSpinBox(); self.render_workers_spin.setRange(1, os.cpu_count() or 1)
+        self.render_workers_spin.setValue(default_render_workers())
+        self.render_workers_spin.setToolTip("Number of videos rendered at the same time, each in its own process.")
+        workers_layout = QHBoxLayout(); workers_layout.addWidget(QLabel("Parallel Renders:")); workers_layout.addWidget(self.render_workers_spin)
+        self.upload_workers_spin = QSpinBox(); self.upload_workers_spin.setRange(1, 16); self.upload_workers_spin.setValue(2)
+        self.upload_workers_spin.setToolTip("Total number of uploads running at once, across all channels.")
+        workers_layout.addWidget(QLabel("Parallel Uploads:")); workers_layout.addWidget(self.upload_workers_spin)
+        layout.addLayout(workers_layout)
+        self.render_memory_spin = QSpinBox(); self.render_memory_spin.setRange(0, 1024); self.render_memory_spin.setSuffix(" GB")
+        self.render_memory_spin.setValue(int(self.job_store.get_setting("render_memory_limit_gb", "0")))
+        self.render_memory_spin.setToolTip("Hard memory ceiling for each render process; a render that needs more fails instead of "
+                                           "swapping. 0 means no ceiling. Fewer renders run at once when their measured peaks "
+                                           "would not fit in memory together.")
+        self.render_memory_spin.valueChanged.connect(lambda value: self.job_store.set_setting("render_memory_limit_gb", str(value)))
+        memory_layout = QHBoxLayout(); memory_layout.addWidget(QLabel("Memory Per Render:")); memory_layout.addWidget(self.render_memory_spin)
+        layout.addLayout(memory_layout)
+        self.channel_uploads_spin = QSpinBox(); self.channel_uploads_spin.setRange(1, 16); self.channel_uploads_spin.setValue(1)
+        self.channel_uploads_spin.setToolTip("Uploads running at once to the same channel. Channels take turns, so a long queue for one channel does not hold up the others.")
+        channel_layout = QHBoxLayout(); channel_layout.addWidget(QLabel("Uploads Per Channel:")); channel_layout.addWidget(self.channel_uploads_spin)
+        layout.addLayout(channel_layout)
+        self.pending_uploads_spin = QSpinBox(); self.pending_uploads_spin.setRange(1, 100)
+        self.pending_uploads_spin.setValue(default_render_workers() * 2)
+        self.pending_uploads_spin.setToolTip("Rendering pauses while this many rendered files are waiting for upload (renders in progress included).")
+        pending_layout = QHBoxLayout(); pending_layout.addWidget(QLabel("Max Files Waiting For Upload:")); pending_layout.addWidget(self.pending_uploads_spin)
+        layout.addLayout(pending_layout)
+        self.chunk_size_spin = QSpinBox(); self.chunk_size_spin.setRange(1, 1024); self.chunk_size_spin.setSuffix(" MB")
+        self.chunk_size_spin.setValue(DEFAULT_CHUNK_SIZE // (1024 * 1024))
+        self.chunk_size_spin.setToolTip("Size of each resumable upload request. An interrupted upload resumes from the last confirmed chunk.")
+        chunk_layout = QHBoxLayout(); chunk_layout.addWidget(QLabel("Upload Chunk Size:")); chunk_layout.addWidget(self.chunk_size_spin)
+        layout.addLayout(chunk_layout)
+        self.stream_check = QCheckBox("Stream renders straight into the upload (FFmpeg presets)")
+        self.stream_check.setToolTip("Encodes as fragmented MP4 and uploads while rendering, without writing the whole file first. "
+                                     "Memory use is bounded; a slow connection spills to a temporary file and then pauses the encoder.")
+        self.local_copy_check = QCheckBox("Keep a local copy of streamed renders")
+        self.local_copy_check.setEnabled(False)
+        self.stream_check.toggled.connect(self.local_copy_check.setEnabled)
+        stream_layout = QHBoxLayout(); stream_layout.addWidget(self.stream_check); stream_layout.addWidget(self.local_copy_check)
+        layout.addLayout(stream_layout)
+        self.cache_size_spin = QSpinBox(); self.cache_size_spin.setRange(0, 10000); self.cache_size_spin.setSuffix(" GB")
+        self.cache_size_spin.setValue(self.render_cache.max_bytes // 1024 ** 3)
+        self.cache_size_spin.setToolTip("Renders are kept and reused when the same source is queued again with the same preset. "
+                                        "Least recently used renders are removed above this size; 0 disables the cache.")
+        self.cache_size_spin.valueChanged.connect(self.on_cache_size_changed)
+        cache_layout = QHBoxLayout(); cache_layout.addWidget(QLabel("Render Cache Size:")); cache_layout.addWidget(self.cache_size_spin)
+        layout.addLayout(cache_layout)
+        self.quota_spin = QSpinBox(); self.quota_spin.setRange(1600, 10_000_000); self.quota_spin.setSingleStep(1600)
+        self.quota_spin.setValue(self.quota_tracker.daily_limit)
+        self.quota_spin.setToolTip("Daily YouTube Data API quota of your Google Cloud project. Each upload costs 1600 units; uploads beyond it wait for the next quota day.")
+        self.quota_spin.valueChanged.connect(self.on_quota_limit_changed)
+        quota_layout = QHBoxLayout(); quota_layout.addWidget(QLabel("Daily API Quota (units):")); quota_layout.addWidget(self.quota_spin)
+        layout.addLayout(quota_layout)
+        self.quota_label = QLabel(self.quota_tracker.summary()); self.quota_label.setWordWrap(True)
+        layout.addWidget(self.quota_label)
         self.overall_progress_label = QLabel("Ready")
         self.overall_progress_bar = QProgressBar()
         self.task_progress_bar = QProgressBar()
@@ -311,60 +460,72 @@ class AutoVideoTool(QMainWindow):
         return entry
     
     def refresh_preset_combos(self):
-        presets = ["None (No Effects)"] + list(self.preset_manager.get_presets().keys())
-        for row in range(self.queue_model.rowCount()):
-            combo = self.queue_view.indexWidget(self.queue_model.index(row, 2))
-            if isinstance(combo, QComboBox):
-                current_selection = combo.currentText()
-                combo.clear()
-                combo.addItems(presets)
-                index = combo.findText(current_selection)
-                if index != -1: combo.setCurrentIndex(index)
+        self.queue_model.set_presets(list(self.preset_manager.get_presets().keys()))
 
     def refresh_channel_combos(self):
-        accounts = self.account_manager.get_accounts()
-        for row in range(self.queue_model.rowCount()):
-            combo = self.queue_view.indexWidget(self.queue_model.index(row, 3))
-            if isinstance(combo, QComboBox):
-                current_selection = combo.currentData()
-                combo.clear()
-                for acc in accounts: combo.addItem(acc['name'], acc['token_file'])
-                index = combo.findData(current_selection)
-                if index != -1: combo.setCurrentIndex(index)
-    
+        self.queue_model.set_accounts(self.account_manager.get_accounts())
+
     def _add_item_to_model(self, file_path):
-        row_count = self.queue_model.rowCount()
-        status_item = QStandardItem("Queued"); filename_item = QStandardItem(os.path.basename(file_path))
-        filename_item.setData(file_path, Qt.UserRole)
-        self.queue_model.appendRow([status_item, filename_item, QStandardItem(), QStandardItem()])
-        
-        preset_combo = QComboBox()
-        preset_combo.addItem("None (No Effects)")
-        for name in self.preset_manager.get_presets().keys():
-            preset_combo.addItem(name)
-        self.queue_view.setIndexWidget(self.queue_model.index(row_count, 2), preset_combo)
-        
-        channel_combo = QComboBox()
-        for acc in self.account_manager.get_accounts():
-            channel_combo.addItem(acc['name'], acc['token_file'])
-        self.queue_view.setIndexWidget(self.queue_model.index(row_count, 3), channel_combo)
+        self._add_paths([file_path])
+
+    def _add_paths(self, paths):
+        """Queues new videos with the default preset and channel: one transaction and one model insert."""
+        if not paths: return
+        token_file = self.queue_model.default_token_file()
+        job_ids = self.job_store.add_jobs(paths, NO_PRESET, token_file)
+        self.file_index.record_many(list(zip(paths, job_ids)), "queued")
+        records = [QueueRecord(job_id, path, preset_name=NO_PRESET, token_file=token_file)
+                   for job_id, path in zip(job_ids, paths)]
+        self.queue_model.append_records(records)
+        self.media_prober.submit(records)
+
+    def _job_id(self, row):
+        return self.queue_model.record(row).job_id
+
+    def _input_path(self, row):
+        return self.queue_model.record(row).path
 
     def add_videos_to_queue(self):
-        files, _ = QFileDialog.getOpenFileNames(self, "Select Videos", "", "Video Files (*.mp4 *.mkv *.avi *.mov)")
-        for file in files: self._add_item_to_model(file)
+        patterns = " ".join(f"*{ext}" for ext in sorted(VIDEO_EXTENSIONS))
+        files, _ = QFileDialog.getOpenFileNames(self, "Select Videos", "", f"Video Files ({patterns})")
+        self._add_paths(files)
 
     def add_folder_to_queue(self):
+        if self._ingest_busy(): return
         folder = QFileDialog.getExistingDirectory(self, "Select Folder")
         if folder:
-            for root, _, files in os.walk(folder):
-                for file in files:
-                    if file.lower().endswith(('.mp4','.mkv','.avi','.mov')): self._add_item_to_model(os.path.join(root, file))
+            # Listed on a worker thread; videos already queued or uploaded are known to the file index and skipped.
+            scanner = FolderScanner(folder, self.file_index)
+            scanner.batch_found.connect(self._on_scan_batch)
+            scanner.finished.connect(self._on_scan_finished)
+            self._start_ingest(scanner, folder, f"Scanning {folder}...")
+
+    def _on_scan_batch(self, paths):
+        if self._ingest_cancelled: return
+        self._add_paths(paths)
+        self._ingest_added += len(paths)
+        self.ingest_label.setText(f"Scanning {self._ingest_source}... {self._ingest_added} videos added")
+
+    def _on_scan_finished(self, found, cancelled):
+        suffix = " (cancelled)" if cancelled or self._ingest_cancelled else ""
+        self._log(f"Added {self._ingest_added} videos from {self._ingest_source}{suffix}.")
+        self._end_ingest()
 
     def remove_selected_from_queue(self):
-        indexes = self.queue_view.selectionModel().selectedRows()
-        for index in sorted(indexes, reverse=True): self.queue_model.removeRow(index.row())
+        rows = [index.row() for index in self.queue_view.selectionModel().selectedRows()]
+        removed = self.queue_model.remove_rows(rows)
+        self._forget_queued_files(removed)
+        self.job_store.remove_jobs([record.job_id for record in removed])
+
+    def _forget_queued_files(self, records):
+        for record in records:
+            if self.file_index.outcome(record.path) == "queued":
+                self.file_index.set_outcome(record.path, "removed")
 
-    def clear_queue(self): self.queue_model.removeRows(0, self.queue_model.rowCount())
+    def clear_queue(self):
+        self._forget_queued_files(self.queue_model.records())
+        self.job_store.clear()
+        self.queue_model.clear()
 
     def select_watched_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder to Watch")
@@ -375,61 +536,85 @@ class AutoVideoTool(QMainWindow):
             folder = self.watched_folder_entry.text()
             if not os.path.isdir(folder):
                 QMessageBox.warning(self, "Error", "Invalid folder."); self.watch_toggle_btn.setChecked(False); return
-            self.watcher_thread = QThread(); self.folder_watcher = FolderWatcher(folder)
+            stable_seconds = self.watch_stable_spin.value()
+            recursive, polling = self.watch_recursive_check.isChecked(), self.watch_polling_check.isChecked()
+            self.job_store.set_setting("watch_stable_seconds", str(stable_seconds))
+            self.job_store.set_setting("watch_recursive", "1" if recursive else "0")
+            self.job_store.set_setting("watch_polling", "1" if polling else "0")
+            self.watcher_thread = QThread()
+            self.folder_watcher = FolderWatcher(folder, stable_seconds, recursive, polling, file_index=self.file_index)
             self.folder_watcher.moveToThread(self.watcher_thread)
             self.folder_watcher.file_found.connect(self._add_item_to_model)
             self.watcher_thread.started.connect(self.folder_watcher.run)
-            self.watcher_thread.start(); self.watch_toggle_btn.setText("Stop Watching"); self._log(f"Watching: {folder}")
+            self.watcher_thread.start(); self.watch_toggle_btn.setText("Stop Watching")
+            for widget in (self.watch_stable_spin, self.watch_recursive_check, self.watch_polling_check): widget.setEnabled(False)
+            mode = "polling" if polling else "notifications"
+            self._log(f"Watching: {folder} ({'with' if recursive else 'without'} subfolders, {mode}, files added after {stable_seconds}s unchanged)")
         else:
             if self.folder_watcher: self.folder_watcher.stop()
             if self.watcher_thread: self.watcher_thread.quit(); self.watcher_thread.wait()
+            self.watcher_thread, self.folder_watcher = None, None
+            for widget in (self.watch_stable_spin, self.watch_recursive_check, self.watch_polling_check): widget.setEnabled(True)
             self.watch_toggle_btn.setText("Start Watching"); self._log("Stopped watching.")
     
     def start_processing(self):
         if self.is_processing: return
+        if self._ingest_busy(): return QMessageBox.information(self, "Info", "Wait until the queue has finished loading.")
         if self.queue_model.rowCount() == 0: return QMessageBox.information(self, "Info", "Queue is empty.")
         output_folder = self.output_entry.text()
         if not output_folder or not os.path.isdir(output_folder): return QMessageBox.critical(self, "Error", "Invalid output folder.")
         
-        tasks = []
-        for row in range(self.queue_model.rowCount()):
-            channel_combo = self.queue_view.indexWidget(self.queue_model.index(row, 3))
-            preset_combo = self.queue_view.indexWidget(self.queue_model.index(row, 2))
-            if not channel_combo or channel_combo.currentIndex() == -1:
+        self._save_batch_settings()
+        for row, record in enumerate(self.queue_model.records()):
+            if not record.token_file:
                 return QMessageBox.critical(self, "Error", f"Select upload channel for row {row + 1}.")
-            
-            preset_name = preset_combo.currentText()
-            settings = self.preset_manager.get_preset(preset_name) if preset_name != "None (No Effects)" else {}
-            video_config = VideoConfig(**settings)
-            
-            tasks.append({
-                'row': row, 'path': self.queue_model.item(row, 1).data(Qt.UserRole),
-                'yt_config': YouTubeConfig(title=self.title_entry.text()),
-                'token_file': channel_combo.currentData(), 'output_folder': output_folder,
-                'video_config': video_config
-            })
+        # The row decides the preset and channel; the model also writes its changes through to the store.
+        jobs = {job['id']: job for job in self.job_store.list_jobs()}
+        tasks, skipped = build_tasks(self.job_store, self.preset_manager,
+                                     [(row, dict(jobs[record.job_id], preset_name=record.preset_name, token_file=record.token_file))
+                                      for row, record in enumerate(self.queue_model.records())],
+                                     output_folder, self.title_entry.text())
+
+        if skipped: self._log(f"Skipping {skipped} jobs that were already completed.")
+        if not tasks: return QMessageBox.information(self, "Info", "All jobs in the queue are already completed.")
         
         self.is_processing = True; self.btn_start.setEnabled(False); self.btn_cancel.setEnabled(True)
         self.processing_thread = QThread()
-        self.processing_worker = ProcessingWorker(tasks, self.processor, self.uploader)
+        self.processing_worker = ProcessingWorker(
+            tasks, self.job_store, render_workers=self.render_workers_spin.value(),
+            upload_workers=self.upload_workers_spin.value(), max_pending_uploads=self.pending_uploads_spin.value(),
+            upload_chunk_size=self.chunk_size_spin.value() * 1024 * 1024,
+            per_channel_uploads=self.channel_uploads_spin.value(), quota_tracker=self.quota_tracker,
+            stream_uploads=self.stream_check.isChecked(), keep_local_copy=self.local_copy_check.isChecked(),
+            render_cache=self.render_cache if self.cache_size_spin.value() else None,
+            render_memory_limit=self.render_memory_spin.value() * 1024 ** 3 or None, file_index=self.file_index,
+            media_probe=self.media_probe
+        )
         self.processing_worker.moveToThread(self.processing_thread)
         self.processing_thread.started.connect(self.processing_worker.run)
         self.processing_worker.log_updated.connect(self._log)
         self.processing_worker.overall_progress_updated.connect(lambda val, txt: (self.overall_progress_bar.setValue(val), self.overall_progress_label.setText(txt)))
         self.processing_worker.task_status_updated.connect(self.update_task_status)
-        self.processing_worker.task_progress_updated.connect(self.task_progress_bar.setValue)
+        self.processing_worker.task_progress_updated.connect(self.update_task_progress)
         self.processing_worker.task_finished.connect(self.on_task_finished)
+        self.processing_worker.quota_updated.connect(self.quota_label.setText)
         self.processing_thread.start()
 
+    def on_cache_size_changed(self, value):
+        self.render_cache.max_bytes = value * 1024 ** 3
+        self.job_store.set_setting("render_cache_gb", str(value))
+
+    def on_quota_limit_changed(self, value):
+        self.quota_tracker.daily_limit = value
+        self.job_store.set_setting("quota_daily_limit", str(value))
+        self.quota_label.setText(self.quota_tracker.summary())
+
     def update_task_status(self, row, status):
-        item = self.queue_model.item(row, 0)
-        item.setText(status)
-        color = QColor("white")
-        if "Completed" in status: color = QColor("#d4edda")
-        elif "Error" in status: color = QColor("#f8d7da")
-        elif "ing" in status: color = QColor("#fff3cd")
-        for col in range(self.queue_model.columnCount()):
-            self.queue_model.item(row, col).setBackground(color)
+        self.queue_model.set_status(row, status)
+
+    def update_task_progress(self, row, value):
+        self.queue_model.set_progress(row, value)
+        self.task_progress_bar.setValue(value)
 
     def on_task_finished(self, message, is_error):
         if is_error: QMessageBox.critical(self, "Error", message)
@@ -442,7 +627,9 @@ class AutoVideoTool(QMainWindow):
     
     def closeEvent(self, event):
         if self.folder_watcher: self.folder_watcher.stop()
+        if self.ingest_worker: self.ingest_worker.stop()
         if self.processing_worker: self.processing_worker.stop()
+        self.media_prober.stop()
         event.accept()
         
     def _apply_stylesheet(self):
@@ -464,6 +651,8 @@ class AutoVideoTool(QMainWindow):
         """)
 
 if __name__ == "__main__":
+    # Render workers are spawned processes; needed when running from a frozen executable.
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     window = AutoVideoTool()
     window.show()
@@ -0,0 +1,124 @@
+"""
+Compares the fused uint8 colour kernel with the float pipeline MoviePy used before.
+
+The "before" path reproduces what vfx.colorx and a full-frame ColorClip composite do per frame
+(float64 copies of the frame, a blend against a black frame, a clamp), plus float contrast and
+saturation so both sides do the same work.
+
+    python benchmarks/bench_effects.py --frames 60 --width 1920 --height 1080 --batch 8
+
+It then checks that AffineWarp renders flips and quarter turns exactly like np.flip/np.rot90, at
+even and odd frame sizes, and exits with status 1 if one differs.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import VideoConfig  # noqa: E402
+from effects import AffineWarp, ColorKernel  # noqa: E402
+
+LUMA = np.array([0.299, 0.587, 0.114])
+
+
+def float_pipeline(frame: np.ndarray, brightness: float, contrast: float, saturation: float, opacity: float) -> np.ndarray:
+    black = np.zeros(frame.shape, dtype=np.float64)
+    mask = np.full(frame.shape[:2], opacity)[..., None]
+    blended = (1 - mask) * frame + mask * black              # CompositeVideoClip blit
+    lit = np.minimum(255, blended * brightness)              # vfx.colorx
+    stretched = np.clip((lit - 128.0) * contrast + 128.0, 0, 255)
+    gray = (stretched @ LUMA)[..., None]
+    return np.clip(gray + (stretched - gray) * saturation, 0, 255).astype(np.uint8)
+
+
+def check_geometry() -> bool:
+    """
+    Compares AffineWarp with array flips and rotations for every flip mode and quarter turn.
+
+    The expected frame is trimmed to even dimensions from the bottom right after a rotation, as
+    the FFmpeg backend's crop does. The same warp through PIL's affine path (nearest neighbour,
+    which is exact on a pixel permutation) must agree, so the fast path and the matrix cannot drift.
+    """
+    ok = True
+    rng = np.random.default_rng(1)
+    for width, height in ((64, 36), (65, 37), (64, 37)):
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        for flip_mode in ("None", "Horizontal", "Vertical"):
+            for angle in (0, 90, 180, 270, -90, -180, 540):
+                expected = {"Horizontal": np.flip(frame, 1), "Vertical": np.flip(frame, 0)}.get(flip_mode, frame)
+                expected = np.rot90(expected, (angle // 90) % 4)
+                if angle != 0:
+                    expected = expected[:expected.shape[0] - expected.shape[0] % 2, :expected.shape[1] - expected.shape[1] % 2]
+                warp = AffineWarp(VideoConfig(flip_mode=flip_mode, rotation_angle=angle), (width, height))
+                result = warp(frame)
+                resampled = np.asarray(Image.fromarray(frame).transform(
+                    warp.output_size, Image.AFFINE, warp._coefficients, resample=Image.NEAREST))
+                if result.shape != expected.shape or not np.array_equal(result, expected) \
+                        or not np.array_equal(resampled, expected):
+                    print(f"geometry mismatch: {width}x{height} flip={flip_mode} rotation={angle}")
+                    ok = False
+        if AffineWarp(VideoConfig(), (width, height)).output_size != (width, height):
+            print(f"geometry mismatch: identity changes the size of {width}x{height}")
+            ok = False
+    print(f"geometry check: {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def timed(label: str, run, frames: int) -> float:
+    """Runs `run` once and returns seconds per frame."""
+    start = time.perf_counter()
+    run()
+    per_frame = (time.perf_counter() - start) / frames
+    print(f"{label:<28} {per_frame * 1000:8.2f} ms/frame  {1 / per_frame:8.1f} fps")
+    return per_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--batch", type=int, default=8, help="Frames per call in batch mode.")
+    parser.add_argument("--brightness", type=float, default=1.15)
+    parser.add_argument("--contrast", type=float, default=1.1)
+    parser.add_argument("--saturation", type=float, default=1.2)
+    parser.add_argument("--overlay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    source = rng.integers(0, 256, (args.batch, args.height, args.width, 3), dtype=np.uint8)
+    settings = (args.brightness, args.contrast, args.saturation, args.overlay)
+    kernel = ColorKernel(*settings)
+    print(f"{args.frames} frames of {args.width}x{args.height}, brightness={args.brightness} contrast={args.contrast} "
+          f"saturation={args.saturation} overlay={args.overlay}")
+
+    def run_float():
+        for index in range(args.frames):
+            float_pipeline(source[index % args.batch], *settings)
+
+    def run_fused():
+        for index in range(args.frames):
+            kernel(source[index % args.batch].copy())  # The copy stands in for a fresh decoded frame.
+
+    def run_batched():
+        for _ in range(0, args.frames, args.batch):
+            kernel.apply(source.copy())
+
+    before = timed("float pipeline (before)", run_float, args.frames)
+    after = timed("fused kernel, per frame", run_fused, args.frames)
+    batched = timed(f"fused kernel, batch of {args.batch}", run_batched, -(-args.frames // args.batch) * args.batch)
+    print(f"speed-up: {before / after:.1f}x per frame, {before / batched:.1f}x batched")
+
+    reference = float_pipeline(source[0], *settings)
+    fused = kernel.apply(source[0].copy())
+    print(f"max difference from float pipeline: {int(np.abs(reference.astype(int) - fused).max())} (8-bit levels)")
+    if not check_geometry():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Throughput and latency of the render and upload paths, written to a JSON report that can be
+compared with the report of another commit.
+
+Suites:
+    render  VideoProcessor.process_video on synthetic clips, for every preset in presets.json
+            (and the no-effects case) at each resolution and duration.
+    upload  YouTubeUploader.upload_video against a local StubUploadServer, for each payload size,
+            chunk size, latency and bandwidth.
+    queue   ProcessingEngine runs over a queue of clips, rendering in the pool and uploading to
+            the stub server, from start to the last upload.
+
+Clips are generated with ffmpeg's test sources and kept in --work-dir between runs. Without
+ffmpeg the render and queue suites are skipped. Every measurement is repeated --repeat times and
+the fastest run is kept.
+
+    python benchmarks/bench_pipeline.py --output before.json
+    python benchmarks/bench_pipeline.py --suites upload --latency-ms 0 50 --bandwidth-mbps 0 100
+    python benchmarks/bench_pipeline.py --output after.json --compare before.json --threshold 0.1
+
+With --compare, each result's time is checked against the result of the same name in the
+baseline; the exit status is 1 when one is slower by more than --threshold.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import VideoConfig, YouTubeConfig  # noqa: E402
+from ffmpeg_backend import find_ffmpeg  # noqa: E402
+from preset_manager import PresetManager, NO_PRESET  # noqa: E402
+from resumable_upload import align_chunk_size  # noqa: E402
+from upload_stub_server import StubUploadServer  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_SCHEMA = 1
+MB = 1024 ** 2
+
+
+class _BenchCredentials:
+    """Stands in for CredentialCache: the stub server accepts any token."""
+    def credentials(self, token_file, force_refresh=False):
+        return SimpleNamespace(token="bench-token", client_id="bench-project")
+
+    def stats(self):
+        return {}
+
+
+def best_of(repeat, run):
+    """Calls `run` `repeat` times; returns the metrics of the fastest run (by its "seconds")."""
+    runs = [run() for _ in range(max(1, repeat))]
+    return min(runs, key=lambda metrics: metrics.get("seconds", float("inf")))
+
+
+def make_clip(ffmpeg_path, clip_dir, width, height, duration, fps):
+    """An H.264/AAC test clip with moving content and a tone, reused when it already exists."""
+    path = os.path.join(clip_dir, f"clip_{width}x{height}_{duration:g}s_{fps}fps.mp4")
+    if not os.path.exists(path):
+        tmp_path = path + ".part.mp4"
+        subprocess.run([ffmpeg_path, "-y", "-v", "error",
+                        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+                        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+                        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-g", str(fps * 2),
+                        "-c:a", "aac", "-shortest", tmp_path], check=True)
+        os.replace(tmp_path, path)
+    return path
+
+
+def make_payload(work_dir, size_mb):
+    path = os.path.join(work_dir, f"payload_{size_mb:g}mb.bin")
+    if not os.path.exists(path) or os.path.getsize(path) != int(size_mb * MB):
+        with open(path, "wb") as f:
+            remaining = int(size_mb * MB)
+            while remaining:
+                block = os.urandom(min(MB, remaining))
+                f.write(block)
+                remaining -= len(block)
+    return path
+
+
+def load_presets(path):
+    with open(path, "r", encoding="utf-8") as f:
+        presets = json.load(f)
+    return {NO_PRESET: {}, **presets}
+
+
+def bench_render(args, clips, presets):
+    from video_processor import VideoProcessor  # Loads moviepy; only the render suite needs it.
+    processor = VideoProcessor()
+    results = []
+    for (width, height, duration, clip), (preset_name, settings) in itertools.product(clips, presets.items()):
+        backends = args.backends or [VideoConfig(**settings).render_backend]
+        for backend in backends:
+            video_config = VideoConfig(**{**settings, "render_backend": backend})
+            output_path = os.path.join(args.work_dir, "render_output.mp4")
+
+            def run():
+                start = time.perf_counter()
+                ok, message = processor.process_video(clip, output_path, video_config, False)
+                seconds = time.perf_counter() - start
+                metrics = {"seconds": seconds, "realtime_factor": duration / seconds,
+                           "fps": duration * args.fps / seconds, "ok": ok}
+                if ok and os.path.exists(output_path):
+                    metrics["output_bytes"] = os.path.getsize(output_path)
+                else:
+                    metrics["error"] = message
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                return metrics
+
+            results.append({
+                "suite": "render", "name": f"{preset_name} | {backend} | {width}x{height} | {duration:g}s",
+                "params": {"preset": preset_name, "backend": backend, "plan": video_config.render_plan(),
+                           "width": width, "height": height, "duration": duration, "fps": args.fps},
+                "metrics": best_of(args.repeat, run),
+            })
+            report_line(results[-1])
+    return results
+
+
+def bench_upload(args):
+    from youtube_uploader import YouTubeUploader
+    results = []
+    for size_mb, chunk_mb, latency_ms, bandwidth_mbps in itertools.product(
+            args.upload_sizes_mb, args.chunk_sizes_mb, args.latency_ms, args.bandwidth_mbps):
+        payload = make_payload(args.work_dir, size_mb)
+        chunk_size = align_chunk_size(int(chunk_mb * MB))
+
+        def run():
+            with StubUploadServer(latency=latency_ms / 1000, bandwidth=bandwidth_mbps * MB / 8) as stub:
+                uploader = YouTubeUploader(chunk_size, upload_url=stub.upload_url, cache=_BenchCredentials())
+                start = time.perf_counter()
+                ok, message = uploader.upload_video(payload, YouTubeConfig(title="bench"), "bench-token")
+                seconds = time.perf_counter() - start
+            metrics = {"seconds": seconds, "mb_per_s": size_mb / seconds,
+                       "chunks": -(-int(size_mb * MB) // chunk_size), "ok": ok}
+            if not ok:
+                metrics["error"] = message
+            return metrics
+
+        results.append({
+            "suite": "upload",
+            "name": f"{size_mb:g} MB | chunk {chunk_mb:g} MB | {latency_ms:g} ms | {bandwidth_mbps:g} Mbit/s",
+            "params": {"size_mb": size_mb, "chunk_mb": chunk_mb, "latency_ms": latency_ms,
+                       "bandwidth_mbps": bandwidth_mbps},
+            "metrics": best_of(args.repeat, run),
+        })
+        report_line(results[-1])
+    return results
+
+
+def bench_queue(args, clips, presets):
+    from engine import ProcessingEngine, EngineEvents, build_tasks
+    from job_store import JobStore
+    from media_probe import MediaProbeCache
+
+    class TimingEvents(EngineEvents):
+        def __init__(self):
+            self.start = time.perf_counter()
+            self.first_seen, self.done_at = {}, {}
+            self.lock = threading.Lock()
+
+        def task_status(self, row, status):
+            now = time.perf_counter() - self.start
+            with self.lock:
+                self.first_seen.setdefault(status, now)
+                if status in ("Completed", "Error", "Cancelled"):
+                    self.done_at[row] = now
+
+    preset_names = list(presets)
+    latency_ms, bandwidth_mbps = args.latency_ms[0], args.bandwidth_mbps[0]
+
+    def run():
+        run_dir = tempfile.mkdtemp(prefix="queue_", dir=args.work_dir)
+        job_store = JobStore(os.path.join(run_dir, "jobs.db"))
+        preset_manager = PresetManager()
+        preset_manager.presets = presets
+        for index in range(args.queue_jobs):
+            clip = clips[index % len(clips)][3]
+            # One file per job: outputs are named after the input, and jobs must not share one.
+            job_input = os.path.join(run_dir, f"job{index}_{os.path.basename(clip)}")
+            try:
+                os.link(clip, job_input)
+            except OSError:
+                shutil.copyfile(clip, job_input)
+            job_store.add_job(job_input, preset_names[index % len(preset_names)], "bench-token")
+        tasks, _ = build_tasks(job_store, preset_manager, enumerate(job_store.list_jobs()), run_dir, "{filename}")
+        events = TimingEvents()
+        with StubUploadServer(latency=latency_ms / 1000, bandwidth=bandwidth_mbps * MB / 8) as stub:
+            engine = ProcessingEngine(tasks, job_store, render_workers=args.render_workers,
+                                      upload_workers=args.upload_workers, events=events,
+                                      media_probe=MediaProbeCache(os.path.join(run_dir, "probes.db")))
+            # Uploads go to the stub server, with tokens it accepts.
+            engine.uploader.upload_url, engine.uploader.cache = stub.upload_url, _BenchCredentials()
+            events.start = time.perf_counter()
+            counts = engine.run()
+            seconds = time.perf_counter() - events.start
+        job_store.close()
+        shutil.rmtree(run_dir, ignore_errors=True)
+        latencies = sorted(events.done_at.values())
+        return {"seconds": seconds, "jobs_per_minute": 60 * len(tasks) / seconds,
+                "first_render_s": events.first_seen.get("Rendering..."),
+                "first_upload_s": events.first_seen.get("Uploading..."),
+                "median_job_s": latencies[len(latencies) // 2] if latencies else None,
+                "completed": counts.get("Completed", 0), "failed": counts.get("Error", 0)}
+
+    results = [{
+        "suite": "queue", "name": f"{args.queue_jobs} jobs | {args.render_workers} render | {args.upload_workers} upload",
+        "params": {"jobs": args.queue_jobs, "render_workers": args.render_workers, "upload_workers": args.upload_workers,
+                   "presets": preset_names, "clips": [os.path.basename(clip[3]) for clip in clips],
+                   "latency_ms": latency_ms, "bandwidth_mbps": bandwidth_mbps},
+        "metrics": best_of(args.repeat, run),
+    }]
+    report_line(results[-1])
+    return results
+
+
+def report_line(result):
+    metrics = result["metrics"]
+    extra = {"render": "realtime_factor", "upload": "mb_per_s", "queue": "jobs_per_minute"}[result["suite"]]
+    status = "ok" if metrics.get("ok", not metrics.get("failed")) else f"FAILED: {metrics.get('error', 'see report')}"
+    print(f"{result['suite']:<7} {result['name']:<52} {metrics['seconds']:>9.2f} s  "
+          f"{extra} {metrics[extra]:>8.2f}  {status}", flush=True)
+
+
+def environment(ffmpeg_path):
+    def git(*command):
+        try:
+            return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        except OSError:
+            return ""
+    ffmpeg_version = ""
+    if ffmpeg_path:
+        ffmpeg_version = subprocess.run([ffmpeg_path, "-version"], capture_output=True, text=True).stdout.split("\n", 1)[0]
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "ffmpeg": ffmpeg_version}
+
+
+def compare(report, baseline_path, threshold):
+    """Prints the change in time for results present in both reports. Returns True when one regressed."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(result["suite"], result["name"]): result for result in json.load(f)["results"]}
+    regressed = False
+    print(f"\nCompared with {baseline_path}:")
+    for result in report["results"]:
+        before = baseline.get((result["suite"], result["name"]))
+        if not before:
+            continue
+        old, new = before["metrics"]["seconds"], result["metrics"]["seconds"]
+        change = (new - old) / old if old else 0.0
+        worse = change > threshold
+        regressed = regressed or worse
+        print(f"{result['suite']:<7} {result['name']:<52} {old:>9.2f} s -> {new:>9.2f} s  {change:+7.1%}"
+              f"{'  REGRESSION' if worse else ''}")
+    return regressed
+
+
+def parse_resolution(value):
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", nargs="+", choices=("render", "upload", "queue"), default=["render", "upload", "queue"])
+    parser.add_argument("--resolutions", nargs="+", type=parse_resolution, default=[(640, 360), (1280, 720), (1920, 1080)],
+                        metavar="WxH")
+    parser.add_argument("--durations", nargs="+", type=float, default=[5.0, 30.0], help="Clip lengths in seconds.")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--presets-file", default=os.path.join(ROOT, PresetManager.PRESETS_FILE))
+    parser.add_argument("--backends", nargs="+", choices=("MoviePy", "FFmpeg"),
+                        help="Render every preset with these backends instead of the preset's own.")
+    parser.add_argument("--upload-sizes-mb", nargs="+", type=float, default=[16.0, 64.0])
+    parser.add_argument("--chunk-sizes-mb", nargs="+", type=float, default=[1.0, 8.0])
+    parser.add_argument("--latency-ms", nargs="+", type=float, default=[0.0, 50.0],
+                        help="Stub server response delay; the queue suite uses the first value.")
+    parser.add_argument("--bandwidth-mbps", nargs="+", type=float, default=[0.0, 100.0],
+                        help="Stub server upload bandwidth, 0 for unlimited; the queue suite uses the first value.")
+    parser.add_argument("--queue-jobs", type=int, default=8)
+    parser.add_argument("--render-workers", type=int, default=2)
+    parser.add_argument("--upload-workers", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per measurement; the fastest counts.")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "auto_tool_bench"),
+                        help="Generated clips and payloads are kept here between runs.")
+    parser.add_argument("--output", default="benchmark-report.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="Report of an earlier run to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slow-down before a result counts as a regression.")
+    args = parser.parse_args()
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    ffmpeg_path = find_ffmpeg()
+    presets = load_presets(args.presets_file)
+    report = {"schema": REPORT_SCHEMA, "created": datetime.now().isoformat(timespec="seconds"),
+              "environment": environment(ffmpeg_path), "arguments": vars(args), "results": [], "skipped": {}}
+
+    clips = []
+    if {"render", "queue"} & set(args.suites):
+        if ffmpeg_path:
+            clips = [(width, height, duration, make_clip(ffmpeg_path, args.work_dir, width, height, duration, args.fps))
+                     for (width, height), duration in itertools.product(args.resolutions, args.durations)]
+        else:
+            for suite in {"render", "queue"} & set(args.suites):
+                report["skipped"][suite] = "ffmpeg not found; test clips cannot be generated"
+
+    for suite in args.suites:
+        if suite in report["skipped"]:
+            print(f"{suite:<7} skipped: {report['skipped'][suite]}")
+        elif suite == "render":
+            report["results"] += bench_render(args, clips, presets)
+        elif suite == "upload":
+            report["results"] += bench_upload(args)
+        else:
+            report["results"] += bench_queue(args, clips, presets)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    if args.compare and compare(report, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Measures how long the entry modules take to import in a fresh interpreter, and which heavy
+dependencies they load before they are needed.
+
+Each module is imported in its own `python -X importtime` process, several times, and the fastest
+run is kept. A module fails the check when it takes longer than --budget-ms or loads one of the
+deferred packages (moviepy, numpy, Pillow, the Google client libraries) at import time; the
+exit status is 1 in that case, so the check can run in CI.
+
+    python benchmarks/bench_startup.py --repeat 5 --budget-ms 400
+    python benchmarks/bench_startup.py --modules engine cli
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a user or a render worker waits for before anything happens.
+DEFAULT_MODULES = ("auto_tool_pro", "cli", "engine", "render_pool", "youtube_uploader", "account_manager")
+# Only needed once a render, a logo or an account link actually happens.
+DEFERRED = ("moviepy", "imageio", "numpy", "PIL", "googleapiclient", "google_auth_oauthlib", "google.auth")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S.*)$")
+_PROBE = ("import sys, json; import {module}; "
+          "print(json.dumps([name for name in {deferred!r} if name in sys.modules]))")
+
+
+def measure(module: str) -> dict:
+    """Imports `module` once in a child interpreter. Returns its cumulative import time and the deferred packages it loaded."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, deferred=DEFERRED)],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+        return {"error": error}
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match and match.group(3) == module:
+            cumulative_us = int(match.group(2))
+    return {"ms": (cumulative_us or 0) / 1000, "loaded": json.loads(result.stdout.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=list(DEFAULT_MODULES))
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per module; the fastest counts.")
+    parser.add_argument("--budget-ms", type=float, default=400.0, help="Import-time budget per module.")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<20} {'import ms':>10}  result")
+    for module in args.modules:
+        runs = [measure(module) for _ in range(max(1, args.repeat))]
+        if "error" in runs[0]:
+            # A missing optional dependency (e.g. PyQt5 on a server) is reported, not counted as a failure.
+            print(f"{module:<20} {'-':>10}  skipped: {runs[0]['error']}")
+            continue
+        best = min(runs, key=lambda run: run["ms"])
+        problems = []
+        if best["ms"] > args.budget_ms:
+            problems.append(f"over the {args.budget_ms:.0f} ms budget")
+        if best["loaded"]:
+            problems.append(f"loads {', '.join(best['loaded'])} at import")
+        failed = failed or bool(problems)
+        print(f"{module:<20} {best['ms']:>10.1f}  {'; '.join(problems) or 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Qt wrappers that feed the GUI queue from worker threads: folder scans, session files, watched
+folders and media probes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+from file_index import FileIndex, ADDABLE_OUTCOMES, DEFAULT_BATCH_SIZE
+from folder_watcher import DirectoryWatcher, DEFAULT_STABLE_SECONDS, DEFAULT_POLL_INTERVAL
+from job_store import JobStore
+from media_probe import MediaProbeCache
+
+
+class FolderScanner(QObject):
+    """
+    Lists a folder through the file index on a worker thread and emits the videos to queue in batches.
+
+    Each batch is committed to the index before it is emitted, and nothing is marked as queued
+    until the GUI adds it, so a cancelled scan leaves the remaining videos addable.
+    """
+    batch_found = pyqtSignal(list)
+    finished = pyqtSignal(int, bool)  # videos found, cancelled
+
+    def __init__(self, folder: str, file_index: FileIndex, recursive: bool = True,
+                 outcomes: Sequence[str] = ADDABLE_OUTCOMES, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__()
+        self.folder, self.file_index = folder, file_index
+        self.recursive, self.outcomes, self.batch_size = recursive, outcomes, batch_size
+        self._stopped = threading.Event()
+
+    def run(self):
+        found = 0
+        try:
+            for batch in self.file_index.scan(self.folder, self.recursive, self.outcomes, self.batch_size):
+                if self._stopped.is_set():
+                    break
+                found += len(batch)
+                self.batch_found.emit(batch)
+        finally:
+            self.finished.emit(found, self._stopped.is_set())
+
+    def stop(self):
+        self._stopped.set()
+
+
+class FolderWatcher(QObject):
+    """
+    Runs a DirectoryWatcher in a separate thread and emits `file_found` for each settled video.
+    """
+    file_found = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, path_to_watch, stable_seconds=DEFAULT_STABLE_SECONDS, recursive=False, polling=False,
+                 poll_interval=DEFAULT_POLL_INTERVAL, file_index=None):
+        super().__init__()
+        self.path_to_watch = path_to_watch
+        # The signal is thread-safe, so the watcher thread can emit it directly.
+        self.watcher = DirectoryWatcher(path_to_watch, self.file_found.emit, stable_seconds, recursive,
+                                        polling, poll_interval, file_index)
+
+    def run(self):
+        try:
+            self.watcher.run()
+        finally:
+            self.finished.emit()
+
+    def stop(self):
+        self.watcher.stop()
+
+
+class SessionReader(QObject):
+    """
+    Reads a saved session (.db or legacy .json) on a worker thread.
+
+    `loaded` carries the jobs and settings; the store is only replaced by whoever receives it,
+    so a cancelled read changes nothing.
+    """
+    loaded = pyqtSignal(list, list)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal(int, bool)  # jobs read, cancelled
+
+    def __init__(self, file_path: str):
+        super().__init__()
+        self.file_path = file_path
+        self._stopped = threading.Event()
+
+    def run(self):
+        jobs = []
+        try:
+            jobs, settings = JobStore.read_session(self.file_path)
+            if not self._stopped.is_set():
+                self.loaded.emit(jobs, settings)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            self.finished.emit(len(jobs), self._stopped.is_set())
+
+    def stop(self):
+        self._stopped.set()
+
+
+class MediaProber(QObject):
+    """
+    Probes queued videos on a thread pool and emits `probed(record, info)` as each result arrives.
+
+    Needs no QThread of its own: submitting only hands the records to the pool, and results
+    already in the cache come back almost at once.
+    """
+    probed = pyqtSignal(object, object)  # QueueRecord, MediaInfo or None
+
+    def __init__(self, media_probe: MediaProbeCache):
+        super().__init__()
+        self.media_probe = media_probe
+        self._executor = ThreadPoolExecutor(max_workers=media_probe.max_workers, thread_name_prefix="probe")
+        self._stopped = threading.Event()
+
+    def submit(self, records: Sequence):
+        for record in records:
+            self._executor.submit(self._probe, record)
+
+    def _probe(self, record):
+        if self._stopped.is_set():
+            return
+        self.probed.emit(record, self.media_probe.probe(record.path))
+
+    def stop(self):
+        self._stopped.set()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,220 @@
+"""
+Runs the queue without a window, e.g. on a headless render server.
+
+    python cli.py batch session.db --output /renders
+    python cli.py watch /incoming --output /renders --channel "My Channel" --preset "Zoom 1.2" --recursive
+
+Batch mode processes every unfinished job of a session file and exits; a .db session is used as
+the job store in place, so running it again after an interruption resumes where it stopped.
+Watch mode queues videos as they settle in the given folders and processes them until it is
+stopped with Ctrl+C or SIGTERM.
+
+Progress goes to stdout as one JSON object per line, e.g.
+    {"time": "2024-05-01T10:00:00", "event": "status", "job_id": 3, "path": "/in/a.mp4", "status": "Rendering..."}
+Events: started, log, progress, status, task_progress, quota, finished, error.
+
+Exit status: 0 when every job completed, 1 when a job failed or was cancelled (in watch mode, any
+job since the start), 2 on bad arguments.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from engine import EngineEvents, QueueRunner
+from job_store import JobStore
+from file_index import FileIndex
+from preset_manager import PresetManager, NO_PRESET
+from account_manager import AccountManager
+from quota_tracker import QuotaTracker, DEFAULT_DAILY_LIMIT
+from render_cache import RenderCache
+from media_probe import MediaProbeCache
+from resumable_upload import DEFAULT_CHUNK_SIZE
+from render_pool import default_render_workers
+from folder_watcher import DEFAULT_STABLE_SECONDS, DEFAULT_POLL_INTERVAL
+
+
+class JsonLinesEvents(EngineEvents):
+    """Writes engine events to a stream as JSON lines. Task events carry the job id and input path."""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._tasks: Dict[int, Dict] = {}
+        self._last_progress: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        line = json.dumps({"time": datetime.now().isoformat(timespec='seconds'), "event": event, **fields})
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def _job(self, row: int) -> Dict:
+        task_info = self._tasks.get(row)
+        return {"job_id": task_info['job_id'], "path": task_info['path']} if task_info else {"row": row}
+
+    def started(self, tasks: List[Dict]):
+        self._tasks = {task_info['row']: task_info for task_info in tasks}
+        self._last_progress.clear()
+        self.emit("started", jobs=[self._job(task_info['row']) for task_info in tasks])
+
+    def log(self, message: str):
+        self.emit("log", message=message)
+
+    def overall_progress(self, percent: int, text: str):
+        self.emit("progress", percent=percent, text=text)
+
+    def task_status(self, row: int, status: str):
+        self.emit("status", **self._job(row), status=status)
+
+    def task_progress(self, row: int, percent: int):
+        # Renderers report several times per percent; only whole-percent changes are written.
+        if self._last_progress.get(row) == percent:
+            return
+        self._last_progress[row] = percent
+        self.emit("task_progress", **self._job(row), percent=percent)
+
+    def quota(self, summary: str):
+        self.emit("quota", summary=summary)
+
+    def finished(self, message: str, is_error: bool):
+        self.emit("finished", message=message, error=is_error)
+
+
+def resolve_channel(channel: Optional[str]) -> Optional[str]:
+    """Accepts an account name from the accounts list or the path of a token file."""
+    if not channel:
+        return None
+    for account in AccountManager().get_accounts():
+        if channel in (account['name'], account['token_file']):
+            return account['token_file']
+    if os.path.exists(channel):
+        return channel
+    raise ValueError(f"Unknown channel: {channel}")
+
+
+def open_session(path: str) -> JobStore:
+    """A .db session is opened as the job store; a legacy .json session is imported into a .db next to it once."""
+    if not path.lower().endswith('.json'):
+        if not os.path.exists(path):
+            raise ValueError(f"Session file not found: {path}")
+        return JobStore(path)
+    job_store = JobStore(os.path.splitext(path)[0] + '.db')
+    if not job_store.list_jobs():
+        job_store.load_from(path)
+    return job_store
+
+
+def engine_options(args) -> Dict:
+    quota_tracker = QuotaTracker(daily_limit=args.quota_limit)
+    render_cache = RenderCache(max_bytes=int(args.render_cache_gb * 1024 ** 3)) if args.render_cache_gb else None
+    return dict(render_workers=args.render_workers, upload_workers=args.upload_workers,
+                max_pending_uploads=args.max_pending_uploads, upload_chunk_size=args.chunk_size * 1024 * 1024,
+                per_channel_uploads=args.uploads_per_channel, quota_tracker=quota_tracker,
+                stream_uploads=args.stream, keep_local_copy=args.keep_local_copy, render_cache=render_cache,
+                render_memory_limit=int(args.memory_limit_gb * 1024 ** 3) or None,
+                media_probe=MediaProbeCache(args.probe_db) if args.probe_db else None)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--output", help="Folder for rendered videos (batch mode defaults to the session's).")
+    common.add_argument("--title", help="YouTube title template; {filename} is replaced by the input name.")
+    common.add_argument("--channel", help="Account name or token file for jobs without a channel.")
+    common.add_argument("--index-db", default=FileIndex.INDEX_FILE, help="File index recording finished inputs.")
+    common.add_argument("--render-workers", type=int, default=default_render_workers())
+    common.add_argument("--upload-workers", type=int, default=2)
+    common.add_argument("--uploads-per-channel", type=int, default=1)
+    common.add_argument("--max-pending-uploads", type=int, default=None)
+    common.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE // (1024 * 1024), metavar="MB")
+    common.add_argument("--stream", action="store_true", help="Stream FFmpeg renders straight into the upload.")
+    common.add_argument("--keep-local-copy", action="store_true", help="Keep a local copy of streamed renders.")
+    common.add_argument("--render-cache-gb", type=float, default=20, help="0 disables the render cache.")
+    common.add_argument("--memory-limit-gb", type=float, default=0, help="Memory ceiling per render; 0 for none.")
+    common.add_argument("--probe-db", default=MediaProbeCache.CACHE_FILE,
+                        help="Cache of input probes; an empty value disables probing.")
+    common.add_argument("--quota-limit", type=int, default=DEFAULT_DAILY_LIMIT, help="Daily API quota in units.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", parents=[common], help="Process a session file and exit.")
+    batch.add_argument("session", help="Session saved from the window (.db, or legacy .json).")
+
+    watch = commands.add_parser("watch", parents=[common], help="Watch folders and process new videos until stopped.")
+    watch.add_argument("folders", nargs="+")
+    watch.add_argument("--jobs-db", default=JobStore.JOBS_FILE, help="Job store for the watched videos.")
+    watch.add_argument("--preset", default=NO_PRESET, help="Editing preset applied to new videos.")
+    watch.add_argument("--stable-seconds", type=float, default=DEFAULT_STABLE_SECONDS,
+                       help="Seconds a new file must stay unchanged before it is queued.")
+    watch.add_argument("--recursive", action="store_true", help="Include subfolders.")
+    watch.add_argument("--polling", action="store_true", help="Poll instead of using OS notifications (network shares).")
+    watch.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    events = JsonLinesEvents()
+    try:
+        token_file = resolve_channel(args.channel)
+        if args.command == "batch":
+            job_store = open_session(args.session)
+            output_folder = args.output or job_store.get_setting("output_folder")
+            title = args.title if args.title is not None else job_store.get_setting("title_template", "{filename}")
+        else:
+            missing = [folder for folder in args.folders if not os.path.isdir(folder)]
+            if missing:
+                raise ValueError(f"Not a folder: {', '.join(missing)}")
+            if not token_file:
+                raise ValueError("Watch mode needs --channel for the videos it queues.")
+            if args.preset != NO_PRESET and args.preset not in PresetManager().get_presets():
+                raise ValueError(f"Unknown preset: {args.preset}")
+            job_store = JobStore(args.jobs_db)
+            output_folder = args.output
+            title = args.title if args.title is not None else "{filename}"
+        if not output_folder or not os.path.isdir(output_folder):
+            raise ValueError(f"Invalid output folder: {output_folder or '(none)'}")
+    except (ValueError, OSError) as e:
+        events.emit("error", message=str(e))
+        return 2
+
+    runner = QueueRunner(job_store, PresetManager(), output_folder, title, events, FileIndex(args.index_db),
+                         token_file, engine_options(args))
+    counts: Dict[str, int] = {}
+    failure: List[str] = []
+
+    def run():
+        try:
+            if args.command == "batch":
+                counts.update(runner.process(runner.unfinished_jobs()))
+            else:
+                counts.update(runner.watch(args.folders, args.preset, args.stable_seconds, args.recursive, args.polling,
+                                           args.poll_interval))
+        except Exception as e:
+            failure.append(str(e))
+
+    def on_signal(signum, frame):
+        events.emit("log", message="Stopping; unfinished jobs resume on the next run.")
+        runner.stop()
+
+    signal.signal(signal.SIGINT, on_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, on_signal)
+    # The pipeline runs on a worker thread so the main thread stays free to handle signals.
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    while worker.is_alive():
+        worker.join(0.5)
+
+    if failure:
+        events.emit("error", message=failure[0])
+        return 1
+    return 1 if counts.get("Error") or counts.get("Cancelled") else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
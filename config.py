@@ -3,6 +3,9 @@ from typing import Optional, List, Dict
 import os
 import json
 
+# Input files the tool picks up from folders.
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.flv', '.wmv'}
+
 @dataclass
 class VideoConfig:
     speed: float = 1.0
@@ -18,6 +21,39 @@ class VideoConfig:
     zoom_factor: float = 1.0      # e.g., 1.2 for 20% zoom
     rotation_angle: float = 0.0   # in degrees
     overlay_opacity: float = 0.0  # 0.0 to 1.0
+    render_backend: str = "MoviePy"  # MoviePy, FFmpeg
+    parallel_segments: int = 1       # >1 encodes one long video as keyframe-aligned parts in parallel (FFmpeg)
+    logo_position: str = "Bottom Right"  # Top Left, Top Right, Bottom Left, Bottom Right
+    logo_scale: float = 0.12         # logo width as a fraction of the frame width
+    logo_opacity: float = 1.0
+    normalize_audio: bool = True     # loudness-normalise replacement tracks (measured once per track)
+
+    def video_is_identity(self) -> bool:
+        """True when no setting changes the picture, so the video track can be copied as is."""
+        return (self.speed == 1.0 and self.brightness == 1.0 and self.contrast == 1.0 and self.saturation == 1.0
+                and self.flip_mode == "None" and self.zoom_factor <= 1.0 and self.rotation_angle % 360 == 0
+                and self.overlay_opacity == 0.0 and not self.logo_path)
+
+    def render_plan(self) -> str:
+        """
+        How much work this config needs: "skip" (the source can be used unchanged), "remux" (copy the
+        video track, rewrite only the audio) or "render" (full re-encode).
+        """
+        if not self.video_is_identity():
+            return "render"
+        if self.audio_mode == "Remove" or (self.audio_mode == "Replace" and self.audio_path):
+            return "remux"
+        return "skip"
+
+# Corners a logo watermark can be placed in (VideoConfig.logo_position).
+LOGO_POSITIONS = ("Top Left", "Top Right", "Bottom Left", "Bottom Right")
+
+# Task log wording for each render plan.
+RENDER_PLAN_LABELS = {
+    "skip": "no effects, the source is uploaded without rendering",
+    "remux": "video stream copied, only the audio is remuxed",
+    "render": "full re-encode",
+}
 
 @dataclass
 class YouTubeConfig:
@@ -0,0 +1,89 @@
+"""
+API discovery documents kept on disk and parsed once per process.
+
+googleapiclient's build() locates, reads and parses the discovery document on every call, and
+falls back to fetching it over the network. Services here are built from a document that is
+read from DISCOVERY_DIR (filled once from the client library's bundled copy, or from the
+discovery endpoint) and parsed a single time per process.
+"""
+from typing import Dict, Optional, Tuple
+import json
+import os
+import tempfile
+import threading
+import time
+
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest"
+# Fetched documents are refreshed after this long; bundled ones change with the library version.
+MAX_AGE_SECONDS = 30 * 24 * 3600
+
+
+class DiscoveryCache:
+    """
+    Discovery documents by (api, version): parsed in memory, stored as `<api>.<version>.json` in CACHE_DIR.
+    """
+    CACHE_DIR = 'discovery_cache'
+
+    def __init__(self, cache_dir: Optional[str] = None, max_age: float = MAX_AGE_SECONDS):
+        self.cache_dir = cache_dir or self.CACHE_DIR
+        self.max_age = max_age
+        self._documents: Dict[Tuple[str, str], Dict] = {}
+        self._lock = threading.Lock()
+
+    def document(self, api: str, version: str) -> Dict:
+        key = (api, version)
+        with self._lock:
+            if key not in self._documents:
+                self._documents[key] = json.loads(self._load_text(api, version))
+            return self._documents[key]
+
+    def build(self, api: str, version: str, credentials):
+        """Same as googleapiclient.discovery.build(api, version, credentials=...), without the per-call lookup."""
+        from googleapiclient.discovery import build_from_document
+        document = self.document(api, version)
+        # build_from_document fills in defaults on the document it is given; builds are serialised
+        # so two threads never do that to the shared copy at the same time.
+        with self._lock:
+            return build_from_document(document, credentials=credentials)
+
+    def _path(self, api: str, version: str) -> str:
+        return os.path.join(self.cache_dir, f"{api}.{version}.json")
+
+    def _load_text(self, api: str, version: str) -> str:
+        path = self._path(api, version)
+        try:
+            if time.time() - os.stat(path).st_mtime < self.max_age:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return f.read()
+        except OSError:
+            pass
+        text = self._bundled(api, version) or self._fetch(api, version)
+        self._store(path, text)
+        return text
+
+    @staticmethod
+    def _bundled(api: str, version: str) -> Optional[str]:
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+        except ImportError:  # google-api-python-client < 2.0 ships no documents
+            return None
+        return get_static_doc(api, version)
+
+    @staticmethod
+    def _fetch(api: str, version: str) -> str:
+        import urllib.request
+        with urllib.request.urlopen(DISCOVERY_URL.format(api=api, version=version), timeout=30) as response:
+            return response.read().decode('utf-8')
+
+    def _store(self, path: str, text: str):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.discovery_', dir=self.cache_dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+                tmp.write(text)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # A read-only working directory only costs the disk cache.
+
+
+discovery_cache = DiscoveryCache()
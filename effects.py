@@ -0,0 +1,226 @@
+from typing import Dict, Optional, Tuple
+import math
+import numpy as np
+from PIL import Image
+from config import VideoConfig
+
+# Rec.601 luma weights in 8.8 fixed point; they add up to 256.
+_LUMA_WEIGHTS = (77, 150, 29)
+# Saturation is applied this many pixel rows at a time to keep the int32 scratch buffer small.
+_BLOCK_ROWS = 16
+
+
+class FramePool:
+    """
+    A fixed ring of reusable frame buffers.
+
+    Frame filters that need a writable copy take the next buffer of the ring instead of
+    allocating a new full-resolution array for every frame. MoviePy hands each frame to the
+    encoder before asking for the next one, so a ring of two is enough for a filter chain.
+    """
+    def __init__(self, count: int = 2):
+        self.count = max(1, count)
+        self._buffers: Dict[Tuple[int, ...], list] = {}
+        self._next: Dict[Tuple[int, ...], int] = {}
+
+    def take(self, shape: Tuple[int, ...]) -> np.ndarray:
+        shape = tuple(shape)
+        ring = self._buffers.setdefault(shape, [])
+        index = self._next.get(shape, 0)
+        if index == len(ring) and len(ring) < self.count:
+            ring.append(np.empty(shape, dtype=np.uint8))
+        self._next[shape] = (index + 1) % self.count
+        return ring[index]
+
+    def copy(self, frame: np.ndarray) -> np.ndarray:
+        """Returns a writable, C-contiguous uint8 copy of `frame` held in a pooled buffer."""
+        buffer = self.take(frame.shape)
+        if frame.dtype != np.uint8:
+            frame = np.clip(frame, 0, 255)
+        np.copyto(buffer, frame, casting='unsafe')
+        return buffer
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buffer.nbytes for ring in self._buffers.values() for buffer in ring)
+
+
+def build_tone_lut(gain: float = 1.0, contrast: float = 1.0) -> np.ndarray:
+    """
+    256-entry table for the per-channel part of the colour pipeline.
+
+    `gain` is brightness times the remaining light after the black overlay, then contrast
+    stretches around mid-grey, matching the order of the FFmpeg filter graph.
+    """
+    values = np.clip(np.arange(256, dtype=np.float64) * gain, 0, 255)
+    values = (values - 128.0) * contrast + 128.0
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+class ColorKernel:
+    """
+    Fused brightness, contrast, saturation and overlay-opacity kernel for uint8 RGB frames.
+
+    Brightness, overlay and contrast act on each channel alone, so they collapse into one lookup
+    table applied in place. Saturation mixes channels, so it runs in integer fixed point over small
+    row blocks. Works on a single (H, W, 3) frame or a batch shaped (N, H, W, 3).
+
+    With a `frame_pool`, frames that must be copied first are copied into its reusable buffers.
+    """
+    def __init__(self, brightness: float = 1.0, contrast: float = 1.0, saturation: float = 1.0,
+                 overlay_opacity: float = 0.0, frame_pool: Optional[FramePool] = None):
+        self.frame_pool = frame_pool
+        gain = brightness * (1.0 - overlay_opacity)
+        self._lut: Optional[np.ndarray] = None
+        self._pair_lut: Optional[np.ndarray] = None
+        if gain != 1.0 or contrast != 1.0:
+            self._lut = build_tone_lut(gain, contrast)
+            # The same table applied to two bytes at once: half the lookups for a 128 KiB table
+            # that still fits in cache. Each byte is mapped on its own, so byte order does not matter.
+            index = np.arange(65536, dtype=np.uint32)
+            self._pair_lut = (self._lut[index & 0xFF].astype(np.uint16)
+                              | (self._lut[index >> 8].astype(np.uint16) << 8))
+        self._saturation: Optional[int] = None
+        if saturation != 1.0:
+            self._saturation = int(round(max(0.0, saturation) * 256))
+
+    @classmethod
+    def from_config(cls, video_config: VideoConfig, frame_pool: Optional[FramePool] = None) -> "ColorKernel":
+        return cls(video_config.brightness, video_config.contrast, video_config.saturation,
+                   video_config.overlay_opacity, frame_pool)
+
+    @property
+    def is_identity(self) -> bool:
+        return self._lut is None and self._saturation is None
+
+    def apply(self, frames: np.ndarray) -> np.ndarray:
+        """Adjusts a writable, C-contiguous uint8 frame or batch in place and returns it."""
+        if frames.dtype != np.uint8 or frames.shape[-1] != 3 or not frames.flags.c_contiguous:
+            raise ValueError(f"Expected contiguous uint8 RGB frames, got {frames.dtype} with shape {frames.shape}.")
+        if self._lut is not None:
+            # Unbuffered take: each output element only depends on the input element it replaces.
+            if frames.nbytes % 2 == 0:
+                pairs = frames.reshape(-1).view(np.uint16)
+                np.take(self._pair_lut, pairs, out=pairs, mode='clip')
+            else:
+                np.take(self._lut, frames, out=frames, mode='clip')
+        if self._saturation is not None:
+            self._saturate(frames)
+        return frames
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        """For clip.fl_image: frames decoded by MoviePy may be read-only views, so those get one copy."""
+        if self.is_identity:
+            return frame
+        if self.frame_pool is not None:
+            if frame.dtype != np.uint8 or not frame.flags.writeable or not frame.flags.c_contiguous:
+                frame = self.frame_pool.copy(frame)
+        elif frame.dtype != np.uint8:
+            frame = np.ascontiguousarray(np.clip(frame, 0, 255), dtype=np.uint8)
+        elif not frame.flags.writeable or not frame.flags.c_contiguous:
+            frame = np.array(frame, dtype=np.uint8, order='C')
+        return self.apply(frame)
+
+    def _saturate(self, frames: np.ndarray):
+        rows = frames.reshape(-1, frames.shape[-2], 3)
+        weights = np.array(_LUMA_WEIGHTS, dtype=np.int32)
+        for start in range(0, rows.shape[0], _BLOCK_ROWS):
+            block = rows[start:start + _BLOCK_ROWS]
+            mixed = block.astype(np.int32)
+            gray = mixed @ weights
+            gray += 128
+            gray >>= 8
+            gray = gray[..., None]
+            mixed -= gray
+            mixed *= self._saturation
+            mixed += 128
+            mixed >>= 8
+            mixed += gray
+            np.clip(mixed, 0, 255, out=mixed)
+            block[...] = mixed
+
+
+def compose_geometry(video_config: VideoConfig, size: Tuple[int, int]) -> Tuple[Tuple[int, int], np.ndarray]:
+    """
+    Composes flip, rotation and crop-zoom into one 3x3 forward matrix (input -> output pixels).
+
+    The steps and output size match the FFmpeg filter graph: flip, rotate counter-clockwise onto
+    an expanded canvas, then either crop the canvas to even dimensions or, when zooming, take a
+    centre crop of size/zoom and scale it back to the source size.
+
+    Returns:
+        Tuple[Tuple[int, int], np.ndarray]: The output (width, height) and the forward matrix.
+    """
+    w, h = size
+    matrix = np.eye(3)
+    if video_config.flip_mode == "Horizontal":
+        matrix = np.array([[-1.0, 0, w], [0, 1, 0], [0, 0, 1]]) @ matrix
+    elif video_config.flip_mode == "Vertical":
+        matrix = np.array([[1.0, 0, 0], [0, -1, h], [0, 0, 1]]) @ matrix
+
+    canvas_w, canvas_h = w, h
+    output_size = (w, h)
+    if video_config.rotation_angle != 0:
+        theta = math.radians(video_config.rotation_angle)
+        cos, sin = math.cos(theta), math.sin(theta)
+        canvas_w = int(round(abs(w * cos) + abs(h * sin)))
+        canvas_h = int(round(abs(w * sin) + abs(h * cos)))
+        # Image y points down, so a visually counter-clockwise turn has +sin in the x row.
+        to_origin = np.array([[1.0, 0, -w / 2], [0, 1, -h / 2], [0, 0, 1]])
+        rotate = np.array([[cos, sin, 0], [-sin, cos, 0], [0, 0, 1]])
+        to_canvas = np.array([[1.0, 0, canvas_w / 2], [0, 1, canvas_h / 2], [0, 0, 1]])
+        matrix = to_canvas @ rotate @ to_origin @ matrix
+        if video_config.zoom_factor <= 1.0:
+            # libx264 needs even dimensions. Like the FFmpeg crop after rotate, this drops the last
+            # row or column: ffmpeg truncates the half-pixel centring offset to 0.
+            output_size = (canvas_w - canvas_w % 2, canvas_h - canvas_h % 2)
+
+    if video_config.zoom_factor > 1.0:
+        crop_w, crop_h = int(w / video_config.zoom_factor), int(h / video_config.zoom_factor)
+        crop = np.array([[1.0, 0, -(canvas_w - crop_w) / 2], [0, 1, -(canvas_h - crop_h) / 2], [0, 0, 1]])
+        scale = np.array([[w / crop_w, 0, 0], [0, h / crop_h, 0], [0, 0, 1]])
+        matrix = scale @ crop @ matrix
+    return output_size, matrix
+
+
+class AffineWarp:
+    """
+    Flip, rotation and zoom applied to a frame in one resampling pass.
+
+    The matrix is composed and inverted once per clip; each frame then costs a single PIL affine
+    transform instead of a rotate, crop and resize pass, each interpolating the previous result.
+    Flips and quarter turns need no interpolation at all and are done by reversing and
+    transposing the array.
+    """
+    def __init__(self, video_config: VideoConfig, size: Tuple[int, int], resample: int = Image.BICUBIC):
+        self.input_size = tuple(size)
+        self.output_size, self.matrix = compose_geometry(video_config, self.input_size)
+        self.resample = resample
+        inverse = np.linalg.inv(self.matrix)
+        # PIL maps each output pixel back into the input: (a, b, c, d, e, f) from the inverse matrix.
+        self._coefficients = tuple(float(value) for value in inverse[:2].reshape(-1))
+        # Counter-clockwise quarter turns after the flip, when the warp is a pure pixel permutation.
+        self._quarter_turns: Optional[int] = None
+        self.flip_mode = video_config.flip_mode
+        if video_config.zoom_factor <= 1.0 and video_config.rotation_angle % 90 == 0:
+            self._quarter_turns = int(video_config.rotation_angle // 90) % 4
+
+    @property
+    def is_identity(self) -> bool:
+        return (self._quarter_turns == 0 and self.flip_mode not in ("Horizontal", "Vertical")
+                and self.output_size == self.input_size)
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        if self._quarter_turns is not None:
+            if self.flip_mode == "Horizontal":
+                frame = frame[:, ::-1]
+            elif self.flip_mode == "Vertical":
+                frame = frame[::-1]
+            if self._quarter_turns:
+                frame = np.rot90(frame, self._quarter_turns)
+            # Trimmed to even dimensions from the bottom right, as compose_geometry does.
+            return frame[:self.output_size[1], :self.output_size[0]]
+        image = Image.fromarray(frame)
+        warped = image.transform(self.output_size, Image.AFFINE, self._coefficients,
+                                 resample=self.resample, fillcolor=(0,) * len(image.getbands()))
+        return np.asarray(warped)
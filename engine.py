@@ -0,0 +1,609 @@
+"""
+The processing core shared by the window (auto_tool_pro.py) and the command line (cli.py).
+
+Nothing here imports Qt: ProcessingEngine reports through an EngineEvents object, which the GUI
+turns into signals and the CLI into JSON lines.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime
+import json
+import os
+import threading
+import time
+from config import VideoConfig, YouTubeConfig, RENDER_PLAN_LABELS
+from youtube_uploader import YouTubeUploader, credential_cache
+from resumable_upload import DEFAULT_CHUNK_SIZE
+from upload_scheduler import UploadScheduler
+from quota_tracker import QuotaTracker, QuotaExceededError
+from job_store import JobStore
+from render_pool import RenderPool
+from memory_budget import format_bytes
+from ffmpeg_backend import FFmpegRenderer
+from stream_buffer import SpillBuffer
+from render_cache import short_key
+from audio_cache import audio_cache
+from folder_watcher import DirectoryWatcher, DEFAULT_STABLE_SECONDS, DEFAULT_POLL_INTERVAL
+from file_index import FileIndex
+from preset_manager import PresetManager, NO_PRESET
+from media_probe import MediaProbeCache, estimate_work, format_duration
+
+
+class EngineEvents:
+    """
+    Receives progress from a ProcessingEngine. Every method is a no-op here; front ends override
+    the ones they show. Called from the engine's thread and from upload threads.
+    """
+    def started(self, tasks: List[Dict]):
+        pass
+
+    def log(self, message: str):
+        pass
+
+    def overall_progress(self, percent: int, text: str):
+        pass
+
+    def task_status(self, row: int, status: str):
+        pass
+
+    def task_progress(self, row: int, percent: int):
+        pass
+
+    def quota(self, summary: str):
+        pass
+
+    def finished(self, message: str, is_error: bool):
+        pass
+
+
+def build_tasks(job_store: JobStore, preset_manager: PresetManager, jobs: Iterable[Tuple[int, Dict]],
+                output_folder: str, title_template: str) -> Tuple[List[Dict], int]:
+    """
+    Turns (row, job) pairs into engine tasks, resolving each job's preset and snapshotting its
+    configs in the store. Jobs that are already done are left out.
+
+    Returns:
+        Tuple[List[Dict], int]: The tasks and the number of jobs skipped as already completed.
+    """
+    tasks, skipped = [], 0
+    for row, job in jobs:
+        stage = job_store.resume_stage(job)
+        if stage == "done":
+            skipped += 1
+            continue
+
+        preset_name = job['preset_name']
+        settings = preset_manager.get_preset(preset_name) if preset_name != NO_PRESET else {}
+        video_config = VideoConfig(**settings)
+        # A job resuming at the upload stage keeps the metadata it was rendered for.
+        if stage == "upload" and job['yt_config']:
+            yt_config = YouTubeConfig(**json.loads(job['yt_config']))
+        else:
+            yt_config = YouTubeConfig(title=title_template)
+            job_store.prepare_job(job['id'], video_config, yt_config, output_folder)
+
+        tasks.append({
+            'row': row, 'job_id': job['id'], 'stage': stage, 'path': job['input_path'],
+            'yt_config': yt_config, 'token_file': job['token_file'], 'output_folder': output_folder,
+            'output_path': job['output_path'], 'video_config': video_config
+        })
+    return tasks, skipped
+
+
+class ProcessingEngine:
+    """
+    Runs the queue as a two-stage pipeline: a process pool renders videos and an UploadScheduler
+    drains the finished files, round-robin across channels. Renders in flight count against
+    `max_pending_uploads`, so at most that many rendered files can be waiting on disk at once.
+
+    Progress is reported to `events` (see EngineEvents) from the thread calling `run` and from the
+    upload threads. With a `file_index`, finished inputs are recorded there as done or failed.
+
+    With a `media_probe` (MediaProbeCache), inputs are probed before anything renders: files that
+    cannot be read or have no video are failed without taking a render slot, renders are started
+    longest first so a long video does not end up alone at the tail of the run, and the progress
+    text carries an estimate of the time left, weighted by each job's expected work.
+    """
+    def __init__(self, tasks, job_store, render_workers=None, upload_workers=2, max_pending_uploads=None,
+                 upload_chunk_size=DEFAULT_CHUNK_SIZE, per_channel_uploads=1, quota_tracker=None,
+                 stream_uploads=False, keep_local_copy=False, render_cache=None, render_memory_limit=None,
+                 events=None, file_index=None, media_probe: Optional[MediaProbeCache] = None):
+        self.tasks, self.job_store, self.quota_tracker = tasks, job_store, quota_tracker
+        self.events = events or EngineEvents()
+        self.file_index = file_index
+        self.media_probe = media_probe
+        self._tasks_by_row = {task_info['row']: task_info for task_info in tasks}
+        self.render_cache = render_cache
+        self.render_pool = RenderPool(render_workers, memory_limit=render_memory_limit)
+        self.uploader = YouTubeUploader(upload_chunk_size, session_store=job_store, quota_tracker=quota_tracker)
+        self._projects = []
+        self.ffmpeg_renderer = FFmpegRenderer()
+        self.stream_uploads = stream_uploads and self.ffmpeg_renderer.is_available()
+        self.keep_local_copy = keep_local_copy
+        self.upload_scheduler = UploadScheduler(self._upload_task, upload_workers, per_channel_uploads)
+        self.max_pending_uploads = max(1, max_pending_uploads or self.render_pool.max_workers * 2)
+        self.is_cancelled = False
+        self._disk_slots = threading.Semaphore(self.max_pending_uploads)
+        self._finished_count = 0
+        self._finished_lock = threading.Lock()
+        self._work_total = self._work_done = 0.0
+        self._started_at = None
+        self.status_counts: Dict[str, int] = {}
+
+    def run(self) -> Dict[str, int]:
+        """Processes every task and returns how many ended in each final status ("Completed", "Error", "Cancelled")."""
+        total_tasks = len(self.tasks)
+        self._started_at = time.monotonic()
+        self.events.started(self.tasks)
+        self.events.overall_progress(0, f"Processing 0/{total_tasks}")
+        self.events.log(f"Pipeline: {self.render_pool.max_workers} render processes, "
+                              f"{self.upload_scheduler.max_concurrent} uploads ({self.upload_scheduler.per_account_limit} per channel), "
+                              f"at most {self.max_pending_uploads} files pending upload.")
+        if self.render_pool.memory_budget:
+            limit = format_bytes(self.render_pool.memory_limit) if self.render_pool.memory_limit else "no limit"
+            self.events.log(f"Render memory: {format_bytes(self.render_pool.memory_budget)} budget shared by renders, "
+                                  f"{limit} per render.")
+        self._report_quota_forecast()
+        self._probe_inputs()
+        for task_info in self.tasks:
+            if task_info['stage'] == "render" and task_info['video_config'].render_plan() == "skip":
+                # Nothing to change: the source itself is uploaded.
+                task_info['stage'], task_info['output_path'] = "upload", task_info['path']
+                self.job_store.set_state(task_info['job_id'], "rendered", output_path=task_info['path'])
+                self.events.log(f"{os.path.basename(task_info['path'])}: {RENDER_PLAN_LABELS['skip']}.")
+        if self.render_cache:
+            self._apply_render_cache([task_info for task_info in self.tasks if task_info['stage'] == "render"])
+        self._prepare_audio_tracks([task_info for task_info in self.tasks if task_info['stage'] == "render"])
+        self.upload_scheduler.start()
+
+        # Jobs rendered before a restart, or found in the render cache, go straight to the uploaders. They already
+        # exist on disk, so they do not take a disk slot.
+        for task_info in self.tasks:
+            if task_info['stage'] == "upload":
+                task_info['holds_slot'] = False
+                self.events.task_status(task_info['row'], "Rendered (waiting for upload)")
+                self.upload_scheduler.submit(task_info['token_file'], task_info)
+        # In streaming mode FFmpeg-backend jobs render straight into their upload, so they skip
+        # the render pool and the disk slots and run in an upload slot instead.
+        for task_info in self.tasks:
+            video_config = task_info['video_config']
+            if (task_info['stage'] == "render" and self.stream_uploads and video_config.render_backend == "FFmpeg"
+                    and video_config.render_plan() == "render"):
+                task_info['stage'] = "stream"
+                self.upload_scheduler.submit(task_info['token_file'], task_info)
+        render_tasks = [task_info for task_info in self.tasks if task_info['stage'] == "render"]
+        followers = self._group_duplicate_renders(render_tasks)
+        render_tasks = [task_info for task_info in render_tasks if task_info['stage'] == "render"]
+        # Longest first: short renders fill the gaps at the end instead of one long render running alone.
+        render_tasks.sort(key=lambda task_info: task_info['work'], reverse=True)
+
+        def on_started(row):
+            self.events.task_status(row, "Rendering...")
+            self.events.log(f"Rendering: {os.path.basename(self._tasks_by_row[row]['path'])}")
+
+        def on_memory(row, peak):
+            self.events.log(f"Peak memory for {os.path.basename(self._tasks_by_row[row]['path'])}: {format_bytes(peak)}")
+
+        def on_done(row, process_ok, process_msg):
+            task_info = self._tasks_by_row[row]
+            if process_ok and not self.is_cancelled:
+                self._store_render(task_info)
+            # Tasks waiting on an identical render share its outcome and its output file.
+            for member in [task_info] + followers.pop(row, []):
+                if self.is_cancelled:
+                    self.job_store.set_state(member['job_id'], "queued")
+                    self._release_task(member, "Cancelled")
+                elif not process_ok:
+                    self.events.log(f"Error with {os.path.basename(member['path'])}: {process_msg}")
+                    self.job_store.set_state(member['job_id'], "failed", output_path=None, error=process_msg)
+                    self._release_task(member, "Error")
+                else:
+                    member['output_path'] = task_info['output_path']
+                    self.job_store.set_state(member['job_id'], "rendered", output_path=member['output_path'])
+                    self.events.task_status(member['row'], "Rendered (waiting for upload)")
+                    self.upload_scheduler.submit(member['token_file'], member)
+
+        next_index = 0
+        try:
+            while not self.is_cancelled or self.render_pool.has_work():
+                # A task only goes to the pool once it holds a disk slot, so rendering pauses
+                # whenever the uploaders fall behind.
+                while next_index < len(render_tasks) and not self.is_cancelled:
+                    blocking = not self.render_pool.has_work()
+                    if not self._disk_slots.acquire(blocking, 0.2 if blocking else None):
+                        break
+                    self._submit_render(render_tasks[next_index])
+                    next_index += 1
+                if self.render_pool.has_work():
+                    self.render_pool.poll(on_started, self.events.task_progress, on_done, on_memory=on_memory)
+                elif next_index >= len(render_tasks):
+                    break
+        finally:
+            self.render_pool.shutdown()
+            self.upload_scheduler.close()
+            self.upload_scheduler.join()
+
+        if self.render_cache:
+            stats = self.render_cache.stats()
+            self.events.log(f"Render cache: {stats['hits']} hits, {stats['misses']} misses, "
+                                  f"{stats['entries']} entries using {stats['bytes'] / 1024 ** 3:.2f} GB.")
+        stats = credential_cache.stats()
+        self.events.log(f"Credential cache: {stats['hits']} hits, {stats['misses']} misses, "
+                              f"{stats['refreshes']} refreshes, {stats['token_writes']} token writes.")
+        if self.is_cancelled:
+            self.events.log("Processing cancelled by user.")
+        self.events.finished("Queue processing finished!", False)
+        return dict(self.status_counts)
+
+    def _report_quota_forecast(self):
+        if not self.quota_tracker: return
+        uploads_per_project = {}
+        for task_info in self.tasks:
+            try:
+                project = self.uploader.project_for(task_info['token_file'])
+            except Exception:
+                continue  # Reported as an authentication error when the upload is attempted.
+            uploads_per_project[project] = uploads_per_project.get(project, 0) + 1
+        next_window = QuotaTracker.next_window_start().astimezone().strftime('%d/%m %H:%M')
+        for project, count in uploads_per_project.items():
+            fit, deferred = self.quota_tracker.predict(project, count)
+            if deferred:
+                self.events.log(f"Quota forecast: {fit} of {count} uploads fit in today's quota for project {project}; "
+                                      f"the other {deferred} will be deferred until {next_window}.")
+        self._projects = list(uploads_per_project)
+        self.events.quota(self.quota_tracker.summary(self._projects))
+
+    def _probe_inputs(self):
+        """
+        Probes every input still to be rendered, fails the unusable ones and sets each task's
+        expected 'work' (see media_probe.estimate_work).
+        """
+        results = {}
+        if self.media_probe:
+            paths = [task_info['path'] for task_info in self.tasks if task_info['stage'] == "render"]
+            if paths:
+                self.events.log(f"Probing {len(paths)} inputs...")
+                results = self.media_probe.probe_many(paths)
+        for task_info in self.tasks:
+            info = results.get(task_info['path'])
+            plan = task_info['video_config'].render_plan() if task_info['stage'] == "render" else "skip"
+            task_info['media'], task_info['work'] = info, estimate_work(info, plan)
+            self._work_total += task_info['work']
+        for task_info in self.tasks:
+            problem = task_info['media'].problem() if task_info['media'] else None
+            if problem and task_info['stage'] == "render":
+                error = f"Invalid input: {problem}"
+                self.events.log(f"Error with {os.path.basename(task_info['path'])}: {error}")
+                self.job_store.set_state(task_info['job_id'], "failed", output_path=None, error=error)
+                task_info['stage'] = "rejected"
+                self._mark_finished(task_info['row'], "Error")
+
+    def _output_path_for(self, task_info):
+        base_name, _ = os.path.splitext(os.path.basename(task_info['path']))
+        # Named after the cache key when there is one, so the same render always lands at the same path.
+        tag = short_key(task_info['cache_key']) if task_info.get('cache_key') else int(datetime.now().timestamp())
+        return os.path.join(task_info['output_folder'], f"{base_name}_processed_{tag}.mp4")
+
+    def _apply_render_cache(self, render_tasks):
+        for task_info in render_tasks:
+            try:
+                task_info['cache_key'] = self.render_cache.key_for(task_info['path'], task_info['video_config'])
+            except OSError as e:
+                self.events.log(f"Render cache skipped for {os.path.basename(task_info['path'])}: {e}")
+                continue
+            output_path = self._output_path_for(task_info)
+            if self.render_cache.materialize(task_info['cache_key'], output_path):
+                task_info['stage'], task_info['output_path'] = "upload", output_path
+                self.job_store.set_state(task_info['job_id'], "rendered", output_path=output_path)
+                self.events.log(f"Reusing cached render for {os.path.basename(task_info['path'])}.")
+
+    def _prepare_audio_tracks(self, render_tasks):
+        """Decodes and normalises each replacement track once, before the render processes need it."""
+        tracks = {}
+        for task_info in render_tasks:
+            video_config = task_info['video_config']
+            if video_config.audio_mode == "Replace" and video_config.audio_path:
+                key = (video_config.audio_path, video_config.normalize_audio)
+                tracks[key] = tracks.get(key, 0) + 1
+        for (audio_path, normalize), count in tracks.items():
+            if self.is_cancelled:
+                return
+            if audio_cache.lookup(audio_path, normalize):
+                continue
+            self.events.log(f"Preparing soundtrack {os.path.basename(audio_path)} for {count} videos...")
+            ok, result = audio_cache.prepare(audio_path, normalize)
+            if not ok:
+                self.events.log(f"Soundtrack {os.path.basename(audio_path)} is used as is: {result}")
+
+    def _group_duplicate_renders(self, render_tasks):
+        """Keeps one render per cache key; the others wait for it. Returns {rendering row: waiting tasks}."""
+        followers, leaders = {}, {}
+        for task_info in render_tasks:
+            cache_key = task_info.get('cache_key')
+            if not cache_key:
+                continue
+            if cache_key in leaders:
+                task_info['stage'] = "follow"
+                followers.setdefault(leaders[cache_key]['row'], []).append(task_info)
+            else:
+                leaders[cache_key] = task_info
+        return followers
+
+    def _store_render(self, task_info):
+        if not self.render_cache or not task_info.get('cache_key'):
+            return
+        try:
+            self.render_cache.store(task_info['cache_key'], task_info['output_path'], task_info['path'])
+        except Exception as e:
+            self.events.log(f"Could not add {os.path.basename(task_info['output_path'])} to the render cache: {e}")
+
+    def _submit_render(self, task_info):
+        task_info['output_path'] = self._output_path_for(task_info)
+        video_config = task_info['video_config']
+        plan = video_config.render_plan()
+        if plan == "render":
+            backend = "FFmpeg" if video_config.render_backend == "FFmpeg" and self.ffmpeg_renderer.is_available() else "MoviePy"
+            description = f"{RENDER_PLAN_LABELS[plan]} ({backend})"
+        elif self.ffmpeg_renderer.is_available():
+            description = RENDER_PLAN_LABELS[plan]
+        else:
+            description = f"{RENDER_PLAN_LABELS['render']} (MoviePy, ffmpeg not found for a stream copy)"
+        self.events.log(f"Render path for {os.path.basename(task_info['path'])}: {description}.")
+        task_info['holds_slot'] = True
+        self.job_store.set_state(task_info['job_id'], "rendering", output_path=task_info['output_path'])
+        self.render_pool.submit(task_info['row'], task_info['path'], task_info['output_path'], task_info['video_config'])
+
+    def _release_task(self, task_info, status):
+        # A rendered task holds one disk slot from render submission until it is picked up for upload or fails.
+        if task_info.pop('holds_slot', False):
+            self._disk_slots.release()
+        self._mark_finished(task_info['row'], status)
+
+    def _mark_finished(self, row, status):
+        if self.file_index and status in ("Completed", "Error"):
+            self.file_index.set_outcome(self._tasks_by_row[row]['path'], "done" if status == "Completed" else "failed")
+        self.events.task_status(row, status)
+        with self._finished_lock:
+            self._finished_count += 1
+            finished_count = self._finished_count
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if self._tasks_by_row[row]['stage'] == "rejected":
+                # Never rendered or uploaded: its work leaves the total instead of counting as done.
+                self._work_total -= self._tasks_by_row[row].get('work', 0.0)
+            else:
+                self._work_done += self._tasks_by_row[row].get('work', 0.0)
+            work_done, work_left = self._work_done, self._work_total - self._work_done
+        total_tasks = len(self.tasks)
+        text = f"Processing {finished_count}/{total_tasks}"
+        if work_done > 0 and work_left > 0 and not self.is_cancelled:
+            eta = (time.monotonic() - self._started_at) * work_left / work_done
+            text += f", about {format_duration(eta)} left"
+        self.events.overall_progress(int((finished_count / total_tasks) * 100), text)
+
+    def _upload_task(self, task_info):
+        if task_info['stage'] == "stream":
+            return self._stream_task(task_info)
+        if task_info.pop('holds_slot', False):
+            self._disk_slots.release()
+        row, input_path, output_path = task_info['row'], task_info['path'], task_info['output_path']
+        yt_config, token_file, job_id = task_info['yt_config'], task_info['token_file'], task_info['job_id']
+        if self.is_cancelled:
+            self._mark_finished(row, "Cancelled")
+            return
+        try:
+            self.job_store.set_state(job_id, "uploading")
+            self.events.task_status(row, "Uploading...")
+            self.events.log(f"Uploading: {os.path.basename(output_path)}")
+            self.events.task_progress(row, 0)
+            base_name, _ = os.path.splitext(os.path.basename(input_path))
+            if "{filename}" in yt_config.title:
+                yt_config.title = yt_config.title.replace("{filename}", base_name)
+
+            upload_ok, upload_msg = self.uploader.upload_video(
+                output_path, yt_config, token_file, lambda value: self.events.task_progress(row, int(value)),
+                lambda: self.is_cancelled
+            )
+            if not upload_ok and self.is_cancelled:
+                # The upload session is kept, so the next run resumes from the confirmed offset.
+                self.job_store.set_state(job_id, "rendered")
+                self._mark_finished(row, "Cancelled")
+                return
+            if not upload_ok: raise RuntimeError(upload_msg)
+
+            self.job_store.set_state(job_id, "done", video_url=upload_msg, error=None)
+            self._mark_finished(row, "Completed")
+        except QuotaExceededError as e:
+            # Not a failure: the job waits in the scheduler until the quota window resets.
+            retry_at = e.retry_at.astimezone().strftime('%d/%m %H:%M')
+            self.events.log(f"Deferred {os.path.basename(input_path)}: {e}")
+            self.job_store.set_state(job_id, "rendered", error=str(e))
+            self.events.task_status(row, f"Deferred (quota) until {retry_at}")
+            self.upload_scheduler.submit(token_file, task_info, e.retry_at.timestamp())
+        except Exception as e:
+            self.events.log(f"Error with {os.path.basename(input_path)}: {e}")
+            self.job_store.set_state(job_id, "failed", error=str(e))
+            self._mark_finished(row, "Error")
+        finally:
+            if self.quota_tracker and self._projects:
+                self.events.quota(self.quota_tracker.summary(self._projects))
+
+    def _stream_task(self, task_info):
+        row, input_path, job_id = task_info['row'], task_info['path'], task_info['job_id']
+        yt_config, token_file = task_info['yt_config'], task_info['token_file']
+        if self.is_cancelled:
+            self._mark_finished(row, "Cancelled")
+            return
+        base_name, _ = os.path.splitext(os.path.basename(input_path))
+        copy_path = None
+        if self.keep_local_copy:
+            copy_path = os.path.join(task_info['output_folder'], f"{base_name}_processed_{int(datetime.now().timestamp())}.mp4")
+        if "{filename}" in yt_config.title:
+            yt_config.title = yt_config.title.replace("{filename}", base_name)
+
+        stream = SpillBuffer(spill_dir=task_info['output_folder'] or None)
+        render_result = [(False, "Render was not started.")]
+        def render():
+            render_result[0] = self.ffmpeg_renderer.render_to_stream(
+                input_path, stream, task_info['video_config'],
+                lambda value: self.events.task_progress(row, int(value)), lambda: self.is_cancelled, copy_path
+            )
+        render_thread = threading.Thread(target=render, daemon=True)
+        def start_render():
+            self.job_store.set_state(job_id, "rendering", output_path=copy_path)
+            self.events.task_status(row, "Rendering + uploading...")
+            self.events.log(f"Streaming: {os.path.basename(input_path)}")
+            self.events.task_progress(row, 0)
+            render_thread.start()
+
+        try:
+            upload_ok, upload_msg = self.uploader.upload_stream(
+                stream, yt_config, token_file, None, lambda: self.is_cancelled, start_render
+            )
+        except QuotaExceededError as e:
+            stream.abort()
+            retry_at = e.retry_at.astimezone().strftime('%d/%m %H:%M')
+            self.events.log(f"Deferred {os.path.basename(input_path)}: {e}")
+            self.job_store.set_state(job_id, "queued", error=str(e))
+            self.events.task_status(row, f"Deferred (quota) until {retry_at}")
+            self.upload_scheduler.submit(token_file, task_info, e.retry_at.timestamp())
+            return
+        finally:
+            if self.quota_tracker and self._projects:
+                self.events.quota(self.quota_tracker.summary(self._projects))
+
+        if not upload_ok:
+            stream.abort()  # Stops ffmpeg if the upload gave up first.
+        if render_thread.ident:
+            render_thread.join()
+        render_ok, render_msg = render_result[0]
+        if self.is_cancelled:
+            # Nothing on disk to resume from (unless a local copy was kept), so the job renders again.
+            self.job_store.set_state(job_id, "queued", output_path=None)
+            self._mark_finished(row, "Cancelled")
+        elif upload_ok:
+            self.events.log(f"Streamed {os.path.basename(input_path)} ({stream.bytes_written / 1048576:.1f} MB, "
+                                  f"peak buffer {stream.peak_buffered / 1048576:.1f} MB, {stream.bytes_spilled / 1048576:.1f} MB spilled to disk).")
+            self.job_store.set_state(job_id, "done", video_url=upload_msg, error=None)
+            self._mark_finished(row, "Completed")
+        else:
+            error = render_msg if not render_ok and render_thread.ident else upload_msg
+            self.events.log(f"Error with {os.path.basename(input_path)}: {error}")
+            self.job_store.set_state(job_id, "failed", output_path=None, error=error)
+            self._mark_finished(row, "Error")
+
+    def stop(self):
+        self.is_cancelled = True
+        self.render_pool.cancel()
+        # Uploads waiting in the scheduler (including quota-deferred ones) are dropped; their
+        # jobs stay "rendered" in the store and resume on the next run.
+        for task_info in self.upload_scheduler.cancel():
+            self._release_task(task_info, "Cancelled")
+
+
+class QueueRunner:
+    """
+    Processes the jobs of a JobStore without a window: once (batch mode) or in rounds as videos
+    settle in watched folders (daemon mode).
+
+    `engine_options` are passed to each ProcessingEngine. Jobs without a channel use
+    `default_token_file`.
+    """
+    def __init__(self, job_store: JobStore, preset_manager: PresetManager, output_folder: str, title_template: str = "",
+                 events: Optional[EngineEvents] = None, file_index: Optional[FileIndex] = None,
+                 default_token_file: Optional[str] = None, engine_options: Optional[Dict] = None):
+        self.job_store, self.preset_manager = job_store, preset_manager
+        self.output_folder, self.title_template = output_folder, title_template
+        self.events = events or EngineEvents()
+        self.file_index = file_index
+        self.default_token_file = default_token_file
+        self.engine_options = engine_options or {}
+        self.engine: Optional[ProcessingEngine] = None
+        self._stopped = threading.Event()
+        self._arrived = threading.Event()
+        self._new_job_ids: List[int] = []
+        self._new_jobs_lock = threading.Lock()
+
+    def unfinished_jobs(self) -> List[Dict]:
+        return [job for job in self.job_store.list_jobs() if job['state'] != "done"]
+
+    def process(self, jobs: Sequence[Dict]) -> Dict[str, int]:
+        """
+        Runs one engine over `jobs` and returns the count of each final status.
+
+        Raises:
+            ValueError: A job has no upload channel and there is no default one.
+        """
+        for job in jobs:
+            if not job['token_file']:
+                if not self.default_token_file:
+                    raise ValueError(f"Job {job['id']} ({job['input_path']}) has no upload channel.")
+                self.job_store.update_selection(job['id'], token_file=self.default_token_file)
+                job['token_file'] = self.default_token_file
+        tasks, skipped = build_tasks(self.job_store, self.preset_manager, enumerate(jobs),
+                                     self.output_folder, self.title_template)
+        if skipped:
+            self.events.log(f"Skipping {skipped} jobs that were already completed.")
+        if not tasks or self._stopped.is_set():
+            return {}
+        self.engine = ProcessingEngine(tasks, self.job_store, events=self.events, file_index=self.file_index,
+                                       **self.engine_options)
+        try:
+            return self.engine.run()
+        finally:
+            self.engine = None
+
+    def watch(self, folders: Sequence[str], preset_name: str = NO_PRESET,
+              stable_seconds: float = DEFAULT_STABLE_SECONDS, recursive: bool = False, polling: bool = False,
+              poll_interval: float = DEFAULT_POLL_INTERVAL) -> Dict[str, int]:
+        """
+        Watches `folders` until `stop()`. Unfinished jobs already in the store run first; after that
+        each round processes the videos queued since the previous round started. Videos that
+        settle while a round is running wait for the next one.
+
+        Returns the count of each final status over all rounds.
+        """
+        watchers = [DirectoryWatcher(folder, self._on_file, stable_seconds, recursive, polling, poll_interval,
+                                     self.file_index) for folder in folders]
+        self._preset_name = preset_name
+        threads = [threading.Thread(target=watcher.run, daemon=True) for watcher in watchers]
+        for thread in threads:
+            thread.start()
+        for folder in folders:
+            self.events.log(f"Watching: {folder}")
+        counts: Dict[str, int] = {}
+        try:
+            jobs = self.unfinished_jobs()
+            while not self._stopped.is_set():
+                if jobs:
+                    for status, count in self.process(jobs).items():
+                        counts[status] = counts.get(status, 0) + count
+                self._arrived.wait()
+                self._arrived.clear()
+                with self._new_jobs_lock:
+                    job_ids, self._new_job_ids = self._new_job_ids, []
+                jobs = [job for job in (self.job_store.get_job(job_id) for job_id in job_ids) if job]
+        finally:
+            for watcher in watchers:
+                watcher.stop()
+            for thread in threads:
+                thread.join()
+        return counts
+
+    def _on_file(self, path: str):
+        job_id = self.job_store.add_job(path, self._preset_name, self.default_token_file)
+        if self.file_index:
+            self.file_index.record(path, "queued", job_id)
+        self.events.log(f"Queued: {path}")
+        media_probe = self.engine_options.get('media_probe')
+        if media_probe:
+            # Probed as it arrives, so the round that picks it up finds the result cached.
+            media_probe.probe(path)
+        with self._new_jobs_lock:
+            self._new_job_ids.append(job_id)
+        self._arrived.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._arrived.set()
+        engine = self.engine
+        if engine:
+            engine.stop()
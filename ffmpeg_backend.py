@@ -0,0 +1,377 @@
+from typing import Callable, List, Optional, Tuple
+import math
+import os
+import re
+import shutil
+import subprocess
+import threading
+from config import VideoConfig
+from audio_cache import audio_cache
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_SIZE_RE = re.compile(r"Stream #\d+:\d+.*?: Video: .*?(\d{2,5})x(\d{2,5})")
+_AUDIO_RE = re.compile(r"Stream #\d+:\d+.*?: Audio:")
+
+
+def find_ffmpeg() -> Optional[str]:
+    """Returns the ffmpeg executable, preferring the system one over the copy bundled with imageio."""
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+def probe_media(input_path: str, ffmpeg_path: Optional[str] = None) -> Tuple[float, Tuple[int, int], bool]:
+    """
+    Reads duration, frame size and audio presence from the ffmpeg banner.
+
+    Returns:
+        Tuple[float, Tuple[int, int], bool]: (duration in seconds, (width, height), has_audio).
+    """
+    ffmpeg_path = ffmpeg_path or find_ffmpeg()
+    if not ffmpeg_path:
+        raise RuntimeError("ffmpeg executable not found.")
+    result = subprocess.run([ffmpeg_path, "-hide_banner", "-i", input_path],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True, errors="replace")
+    info = result.stderr
+    duration_match, size_match = _DURATION_RE.search(info), _VIDEO_SIZE_RE.search(info)
+    if not duration_match or not size_match:
+        raise RuntimeError(f"Could not read media info for {input_path}")
+    h, m, s = duration_match.groups()
+    duration = int(h) * 3600 + int(m) * 60 + float(s)
+    size = (int(size_match.group(1)), int(size_match.group(2)))
+    return duration, size, bool(_AUDIO_RE.search(info))
+
+
+def _atempo_chain(speed: float) -> List[str]:
+    # atempo only accepts factors in [0.5, 2.0], so larger changes are split into several stages.
+    stages = []
+    while speed > 2.0:
+        stages.append("atempo=2.0"); speed /= 2.0
+    while speed < 0.5:
+        stages.append("atempo=0.5"); speed /= 0.5
+    stages.append(f"atempo={speed:.6f}")
+    return stages
+
+
+def build_filter_graph(video_config: VideoConfig, size: Tuple[int, int], has_audio: bool,
+                       logo: Optional[Tuple[int, int, int]] = None) -> Tuple[str, bool]:
+    """
+    Compiles a VideoConfig into a single -filter_complex string.
+
+    The steps mirror the MoviePy pipeline in VideoProcessor: flip, rotate (expanding the canvas),
+    centre crop-zoom back to the source size, darkening overlay, colour adjustments, logo and speed.
+    `logo` is (input index, x, y) of a prescaled logo image to overlay after the colour steps.
+
+    Returns:
+        Tuple[str, bool]: The filter graph and whether it produces an [aout] label.
+    """
+    w, h = size
+    video_steps = []
+    if video_config.flip_mode == "Horizontal":
+        video_steps.append("hflip")
+    elif video_config.flip_mode == "Vertical":
+        video_steps.append("vflip")
+
+    if video_config.rotation_angle != 0:
+        # MoviePy rotates counter-clockwise, ffmpeg clockwise.
+        angle = -math.radians(video_config.rotation_angle)
+        video_steps.append(f"rotate={angle:.6f}:ow=rotw({angle:.6f}):oh=roth({angle:.6f}):fillcolor=black")
+        if video_config.zoom_factor <= 1.0:
+            # libx264 needs even dimensions and the expanded canvas may not have them.
+            video_steps.append("crop=trunc(iw/2)*2:trunc(ih/2)*2")
+
+    if video_config.zoom_factor > 1.0:
+        crop_w, crop_h = int(w / video_config.zoom_factor), int(h / video_config.zoom_factor)
+        video_steps.append(f"crop={crop_w}:{crop_h}")
+        video_steps.append(f"scale={w}:{h}")
+
+    # The black overlay at a given opacity and colorx brightness are both per-channel gains,
+    # so they collapse into one colorchannelmixer pass.
+    gain = (1.0 - video_config.overlay_opacity) * video_config.brightness
+    if gain != 1.0:
+        video_steps.append(f"colorchannelmixer=rr={gain:.6f}:gg={gain:.6f}:bb={gain:.6f}")
+
+    if video_config.contrast != 1.0 or video_config.saturation != 1.0:
+        video_steps.append(f"eq=contrast={video_config.contrast:.6f}:saturation={video_config.saturation:.6f}")
+
+    final_steps = []
+    if video_config.speed != 1.0:
+        final_steps.append(f"setpts=PTS/{video_config.speed:.6f}")
+    final_steps.append("format=yuv420p")
+
+    if logo is None:
+        graph = f"[0:v]{','.join(video_steps + final_steps)}[vout]"
+    else:
+        logo_input, x, y = logo
+        graph = (f"[0:v]{','.join(video_steps) or 'null'}[base];"
+                 f"[base][{logo_input}:v]overlay={x}:{y},{','.join(final_steps)}[vout]")
+
+    has_aout = False
+    if video_config.audio_mode == "Keep Original" and has_audio and video_config.speed != 1.0:
+        graph += f";[0:a]{','.join(_atempo_chain(video_config.speed))}[aout]"
+        has_aout = True
+    return graph, has_aout
+
+
+class FFmpegRenderer:
+    """Renders a VideoConfig with a single ffmpeg subprocess instead of per-frame Python callbacks."""
+
+    def __init__(self, ffmpeg_path: Optional[str] = None):
+        self.ffmpeg_path = ffmpeg_path or find_ffmpeg()
+
+    def is_available(self) -> bool:
+        return bool(self.ffmpeg_path)
+
+    def build_command(self, input_path: str, output_path: str, video_config: VideoConfig,
+                      size: Tuple[int, int], has_audio: bool, output_duration: float,
+                      streaming: bool = False) -> List[str]:
+        cmd = [self.ffmpeg_path, "-hide_banner", "-nostdin", "-y", "-i", input_path]
+        logo = None
+        if video_config.logo_path:
+            # The logo is scaled and placed once in Python, so ffmpeg only overlays a ready-made PNG.
+            # numpy and Pillow are imported here, not at module load, since most renders have no logo.
+            from effects import compose_geometry
+            from logo_overlay import logo_position, logo_sprite, logo_width_for
+            frame_size = compose_geometry(video_config, size)[0]
+            sprite = logo_sprite(video_config.logo_path, logo_width_for(video_config, frame_size[0]), video_config.logo_opacity)
+            cmd += ["-i", sprite.png_path]
+            logo = (1, *logo_position(frame_size, (sprite.width, sprite.height), video_config.logo_position))
+        graph, has_aout = build_filter_graph(video_config, size, has_audio, logo)
+
+        replace_audio = video_config.audio_mode == "Replace" and video_config.audio_path
+        audio_input = 2 if logo else 1
+        if replace_audio:
+            track = audio_cache.track_for(video_config.audio_path, video_config.normalize_audio)
+            cmd += ["-stream_loop", "-1", "-i", track]
+
+        cmd += ["-filter_complex", graph, "-map", "[vout]"]
+        if has_aout:
+            cmd += ["-map", "[aout]"]
+        elif replace_audio:
+            cmd += ["-map", f"{audio_input}:a:0", "-t", f"{output_duration:.3f}"]
+        elif video_config.audio_mode == "Keep Original":
+            cmd += ["-map", "0:a?"]
+
+        cmd += ["-c:v", "libx264", "-preset", "medium"]
+        if video_config.audio_mode != "Remove":
+            # A prepared soundtrack is already AAC, so it is looped and trimmed without re-encoding.
+            cmd += ["-c:a", "copy" if replace_audio and audio_cache.is_prepared(track) else "aac"]
+        if streaming:
+            # Fragmented MP4 needs no seek back to the header, so it can be written to a pipe;
+            # progress then goes to stderr because stdout carries the video.
+            cmd += ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4",
+                    "-progress", "pipe:2", "-nostats", "pipe:1"]
+        else:
+            cmd += ["-movflags", "+faststart", "-progress", "pipe:1", "-nostats", output_path]
+        return cmd
+
+    def _prepare(self, input_path: str, video_config: VideoConfig) -> Tuple[float, Tuple[int, int], bool, float]:
+        duration, size, has_audio = probe_media(input_path, self.ffmpeg_path)
+        output_duration = duration / video_config.speed if video_config.speed > 0 else duration
+        return duration, size, has_audio, output_duration
+
+    @staticmethod
+    def _report_progress(line: str, output_duration: float, progress_callback: Optional[Callable[[float], None]]):
+        key, _, value = line.strip().partition("=")
+        if key == "out_time_us" and progress_callback and output_duration > 0:
+            try:
+                progress_callback(min(99.0, int(value) / 1_000_000 / output_duration * 100))
+            except ValueError:
+                pass
+        elif key == "progress" and value == "end" and progress_callback:
+            progress_callback(100)
+
+    def render(self, input_path: str, output_path: str, video_config: VideoConfig,
+               progress_callback: Optional[Callable[[float], None]] = None,
+               cancel_check: Optional[Callable[[], bool]] = None
+              ) -> Tuple[bool, str]:
+        """
+        Runs the compiled filter graph and reports progress parsed from ffmpeg's -progress output.
+
+        Returns:
+            Tuple[bool, str]: A success flag and the output path or an error message.
+        """
+        if not self.ffmpeg_path:
+            return (False, "ffmpeg executable not found.")
+        try:
+            _, size, has_audio, output_duration = self._prepare(input_path, video_config)
+        except Exception as e:
+            return (False, f"Video probe error: {e}")
+
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        cmd = self.build_command(input_path, output_path, video_config, size, has_audio, output_duration)
+
+        returncode, stderr_tail = self.run_with_progress(cmd, output_duration, progress_callback, cancel_check)
+        if returncode is None:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return (True, "Processing cancelled by user.")
+        if returncode != 0:
+            return (False, f"ffmpeg exited with code {returncode}: {stderr_tail}")
+        return (True, output_path)
+
+    def run_with_progress(self, cmd: List[str], output_duration: float,
+                          progress_callback: Optional[Callable[[float], None]] = None,
+                          cancel_check: Optional[Callable[[], bool]] = None
+                         ) -> Tuple[Optional[int], str]:
+        """
+        Runs an ffmpeg command that writes -progress to stdout.
+
+        Returns:
+            Tuple[Optional[int], str]: The exit code (None if cancelled) and the tail of stderr.
+        """
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True, errors="replace")
+        # stderr is drained on a helper thread so a chatty ffmpeg cannot block on a full pipe.
+        stderr_tail: List[str] = []
+        def drain_stderr():
+            for line in proc.stderr:
+                stderr_tail.append(line)
+                del stderr_tail[:-20]
+        stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+        stderr_thread.start()
+
+        cancelled = False
+        for line in proc.stdout:
+            if cancel_check and cancel_check():
+                cancelled = True
+                proc.terminate()
+                break
+            self._report_progress(line, output_duration, progress_callback)
+
+        proc.wait()
+        stderr_thread.join(timeout=5)
+        return (None if cancelled else proc.returncode), ''.join(stderr_tail).strip()
+
+    def render_to_stream(self, input_path: str, sink, video_config: VideoConfig,
+                         progress_callback: Optional[Callable[[float], None]] = None,
+                         cancel_check: Optional[Callable[[], bool]] = None,
+                         copy_path: Optional[str] = None, block_size: int = 1024 * 1024
+                        ) -> Tuple[bool, str]:
+        """
+        Renders into `sink` (write/close/fail, e.g. a SpillBuffer) as fragmented MP4 instead of a file.
+
+        Args:
+            copy_path (Optional[str]): Also write the stream to this file, for users who want a local copy.
+
+        Returns:
+            Tuple[bool, str]: A success flag and a message; on success the sink has been closed,
+            otherwise it has been failed so the reader stops too.
+        """
+        if not self.ffmpeg_path:
+            sink.fail(RuntimeError("ffmpeg executable not found."))
+            return (False, "ffmpeg executable not found.")
+        try:
+            _, size, has_audio, output_duration = self._prepare(input_path, video_config)
+        except Exception as e:
+            sink.fail(RuntimeError(f"Video probe error: {e}"))
+            return (False, f"Video probe error: {e}")
+
+        cmd = self.build_command(input_path, "pipe:1", video_config, size, has_audio, output_duration, streaming=True)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stderr_tail: List[str] = []
+        def drain_stderr():
+            for raw_line in proc.stderr:
+                line = raw_line.decode("utf-8", "replace")
+                self._report_progress(line, output_duration, progress_callback)
+                stderr_tail.append(line)
+                del stderr_tail[:-20]
+        stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+        stderr_thread.start()
+
+        copy_file = None
+        if copy_path:
+            os.makedirs(os.path.dirname(copy_path), exist_ok=True)
+            copy_file = open(copy_path, "wb")
+        stopped = None
+        try:
+            while True:
+                if cancel_check and cancel_check():
+                    stopped = "Processing cancelled by user."
+                    break
+                data = proc.stdout.read1(block_size)
+                if not data:
+                    break
+                if copy_file:
+                    copy_file.write(data)
+                sink.write(data)  # Blocks while the uploader is behind; raises if it gave up.
+        except Exception as e:
+            stopped = f"Stream stopped: {str(e) or type(e).__name__}"
+        finally:
+            if copy_file:
+                copy_file.close()
+            if stopped:
+                proc.terminate()
+            proc.wait()
+            stderr_thread.join(timeout=5)
+
+        if stopped or proc.returncode != 0:
+            message = stopped or f"ffmpeg exited with code {proc.returncode}: {''.join(stderr_tail).strip()}"
+            sink.fail(RuntimeError(message))
+            if copy_path and os.path.exists(copy_path):
+                os.remove(copy_path)
+            return (False, message)
+        sink.close()
+        return (True, copy_path or "stream")
+
+    def remux(self, input_path: str, output_path: str, video_config: VideoConfig,
+              cancel_check: Optional[Callable[[], bool]] = None) -> Tuple[bool, str]:
+        """
+        Copies the video stream without re-encoding and only rewrites the audio track.
+
+        Used for configs whose render plan is "remux" or "skip". Fails (so the caller can fall back
+        to a full render) when the source codec cannot be stored in MP4.
+
+        Returns:
+            Tuple[bool, str]: A success flag and the output path or an error message.
+        """
+        if not self.ffmpeg_path:
+            return (False, "ffmpeg executable not found.")
+        cmd = [self.ffmpeg_path, "-hide_banner", "-nostdin", "-y", "-i", input_path]
+        if video_config.audio_mode == "Replace" and video_config.audio_path:
+            try:
+                duration, _, _ = probe_media(input_path, self.ffmpeg_path)
+            except Exception as e:
+                return (False, f"Video probe error: {e}")
+            track = audio_cache.track_for(video_config.audio_path, video_config.normalize_audio)
+            cmd += ["-stream_loop", "-1", "-i", track, "-map", "0:v:0", "-map", "1:a:0", "-t", f"{duration:.3f}",
+                    "-c:v", "copy", "-c:a", "copy" if audio_cache.is_prepared(track) else "aac"]
+        elif video_config.audio_mode == "Remove":
+            cmd += ["-map", "0:v:0", "-c:v", "copy", "-an"]
+        else:
+            cmd += ["-map", "0:v:0", "-map", "0:a?", "-c", "copy"]
+        cmd += ["-movflags", "+faststart", output_path]
+
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+        stderr_tail: List[str] = []
+        def drain_stderr():
+            for line in proc.stderr:
+                stderr_tail.append(line)
+                del stderr_tail[:-20]
+        stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+        stderr_thread.start()
+        while True:
+            try:
+                proc.wait(timeout=0.2)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel_check and cancel_check():
+                    proc.terminate()
+                    proc.wait()
+                    stderr_thread.join(timeout=5)
+                    if os.path.exists(output_path):
+                        os.remove(output_path)
+                    return (True, "Processing cancelled by user.")
+        stderr_thread.join(timeout=5)
+        if proc.returncode != 0:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return (False, f"Stream copy failed (ffmpeg exited with code {proc.returncode}): {''.join(stderr_tail).strip()}")
+        return (True, output_path)
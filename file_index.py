@@ -0,0 +1,291 @@
+"""
+Persistent index of the input videos the tool has seen, and what became of them.
+
+Watched folders are diffed against it when watching starts, so videos that arrived while the
+tool was closed are picked up, and "Add Folder" skips videos that were already queued or
+uploaded. Directories whose modification time has not changed since the last scan are not
+listed again, which keeps rescans of folders with tens of thousands of files cheap.
+"""
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import os
+import sqlite3
+import threading
+from config import VIDEO_EXTENSIONS
+from render_cache import fingerprint_file
+
+# What the index knows about a file:
+#   baseline  already in the folder when it was first watched; never queued automatically
+#   new       seen by a scan but not queued yet
+#   queued    added to the job queue
+#   done      uploaded
+#   failed    processing or upload failed
+#   removed   taken off the queue by the user
+FILE_OUTCOMES = ("baseline", "new", "queued", "done", "failed", "removed")
+
+# Outcomes that "Add Folder" queues again; a watcher only queues "new" files.
+ADDABLE_OUTCOMES = ("new", "baseline", "failed", "removed")
+
+DEFAULT_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    fingerprint TEXT,
+    outcome TEXT NOT NULL,
+    job_id INTEGER,
+    first_seen TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE INDEX IF NOT EXISTS files_size ON files (size);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY,
+    first_scanned TEXT NOT NULL
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _normalize(path: str) -> str:
+    return os.path.abspath(path)
+
+
+class FileIndex:
+    """
+    SQLite index of input files keyed by path, with size, mtime, a content fingerprint and the
+    processing outcome.
+
+    The fingerprint samples the file's content (see render_cache.fingerprint_file) and is only
+    computed when a file finishes processing, or when a new path has the same size as a finished
+    file, so a renamed or moved video is recognised without hashing every file in a large folder.
+    """
+    INDEX_FILE = 'file_index.db'
+
+    def __init__(self, db_path: Optional[str] = None, video_extensions: Set[str] = VIDEO_EXTENSIONS):
+        self.db_path = db_path or self.INDEX_FILE
+        self.video_extensions = {ext.lower() for ext in video_extensions}
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- Outcomes ---
+    def record(self, path: str, outcome: str, job_id: Optional[int] = None):
+        """Stores `path` with its current size and mtime and the given outcome."""
+        self.record_many([(path, job_id)], outcome)
+
+    def record_many(self, entries: Sequence[Tuple[str, Optional[int]]], outcome: str):
+        """Stores several (path, job_id) pairs with one outcome in a single transaction."""
+        if outcome not in FILE_OUTCOMES:
+            raise ValueError(f"Unknown file outcome: {outcome}")
+        now, rows = _now(), []
+        for path, job_id in entries:
+            key = _normalize(path)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            rows.append((key, os.path.dirname(key), stat.st_size, stat.st_mtime_ns, outcome, job_id, now, now))
+        with self._lock, self._conn:
+            # A changed file loses its fingerprint; it is taken again when the file finishes processing.
+            self._conn.executemany(
+                "INSERT INTO files (path, dir, size, mtime_ns, outcome, job_id, first_seen, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET "
+                "fingerprint = CASE WHEN files.size = excluded.size AND files.mtime_ns = excluded.mtime_ns "
+                "THEN files.fingerprint END, size = excluded.size, mtime_ns = excluded.mtime_ns, "
+                "outcome = excluded.outcome, job_id = COALESCE(excluded.job_id, files.job_id), "
+                "updated_at = excluded.updated_at", rows)
+
+    def set_outcome(self, path: str, outcome: str):
+        """
+        Updates the outcome of a file; unknown files are recorded first. Finished files ("done",
+        "failed") are fingerprinted so they are still recognised after a move or rename.
+        """
+        if outcome not in FILE_OUTCOMES:
+            raise ValueError(f"Unknown file outcome: {outcome}")
+        with self._lock, self._conn:
+            updated = self._conn.execute("UPDATE files SET outcome = ?, updated_at = ? WHERE path = ?",
+                                         (outcome, _now(), _normalize(path))).rowcount
+        if not updated:
+            self.record(path, outcome)
+        if outcome in ("done", "failed"):
+            try:
+                fingerprint = fingerprint_file(path, include_mtime=False)
+            except OSError:
+                return
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE files SET fingerprint = ? WHERE path = ?", (fingerprint, _normalize(path)))
+
+    def outcome(self, path: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT outcome FROM files WHERE path = ?", (_normalize(path),)).fetchone()
+        return row['outcome'] if row else None
+
+    def is_handled(self, path: str) -> bool:
+        """True when `path` was queued, uploaded or removed and has not changed since."""
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, outcome FROM files WHERE path = ?", (_normalize(path),)).fetchone()
+        if not row or row['outcome'] not in ("queued", "done", "removed"):
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (row['size'], row['mtime_ns'])
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {row['outcome']: row['n'] for row in
+                    self._conn.execute("SELECT outcome, COUNT(*) AS n FROM files GROUP BY outcome")}
+
+    # --- Scanning ---
+    @staticmethod
+    def _root_key(root: str, recursive: bool) -> str:
+        # A folder watched with subfolders for the first time gets its own baseline.
+        return _normalize(root) + (os.sep + "**" if recursive else "")
+
+    def is_known_root(self, root: str, recursive: bool = False) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM roots WHERE path = ?",
+                                      (self._root_key(root, recursive),)).fetchone() is not None
+
+    def scan(self, root: str, recursive: bool = False, outcomes: Sequence[str] = ("new",),
+             batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[str]]:
+        """
+        Diffs `root` against the index and yields, in batches, the videos whose outcome is in `outcomes`.
+
+        The first scan of a root records its existing videos as "baseline" rather than "new", so
+        watching a folder for the first time does not queue its whole history. Each batch is
+        committed before it is yielded, so a scan can be stopped between batches and resumed later.
+        """
+        root_key = _normalize(root)
+        first_scan = not self.is_known_root(root, recursive)
+        found_state = "baseline" if first_scan else "new"
+        batch: List[str] = []
+        pending = [root_key]
+        while pending:
+            directory = pending.pop()
+            try:
+                dir_mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._forget_dir(directory)
+                continue
+            with self._lock:
+                row = self._conn.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (directory,)).fetchone()
+            if row and row['mtime_ns'] == dir_mtime:
+                # Listing unchanged since the last scan: only the index needs to be consulted.
+                if recursive:
+                    with self._lock:
+                        pending.extend(r['path'] for r in self._conn.execute("SELECT path FROM dirs WHERE parent = ?", (directory,)))
+            else:
+                subdirs = self._rescan_dir(directory, dir_mtime, found_state)
+                if recursive:
+                    pending.extend(subdirs)
+            with self._lock:
+                placeholders = ', '.join('?' for _ in outcomes)
+                paths = [r['path'] for r in self._conn.execute(
+                    f"SELECT path FROM files WHERE dir = ? AND outcome IN ({placeholders}) ORDER BY path",
+                    (directory, *outcomes))]
+            for path in paths:
+                batch.append(path)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+        if first_scan:
+            with self._lock, self._conn:
+                self._conn.execute("INSERT OR IGNORE INTO roots (path, first_scanned) VALUES (?, ?)",
+                                   (self._root_key(root, recursive), _now()))
+
+    def _rescan_dir(self, directory: str, dir_mtime: int, found_state: str) -> List[str]:
+        """Lists one directory, adds unseen videos and drops vanished ones. Returns its subdirectories."""
+        subdirs, listed = [], {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(_normalize(entry.path))
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in self.video_extensions:
+                            listed[_normalize(entry.path)] = entry
+                    except OSError:
+                        continue
+        except OSError:
+            return []
+
+        with self._lock:
+            known = {r['path'] for r in self._conn.execute("SELECT path FROM files WHERE dir = ?", (directory,))}
+        now = _now()
+        rows = []
+        for path in listed.keys() - known:
+            try:
+                stat = listed[path].stat()
+            except OSError:
+                continue
+            if self._adopt_moved(path, directory, stat):
+                continue
+            rows.append((path, directory, stat.st_size, stat.st_mtime_ns, found_state, now, now))
+        vanished = [path for path in known - listed.keys()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO files (path, dir, size, mtime_ns, outcome, first_seen, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            # Finished files are kept after they disappear, so a move elsewhere is still recognised.
+            self._conn.executemany("DELETE FROM files WHERE path = ? AND outcome IN ('baseline', 'new')",
+                                   [(path,) for path in vanished])
+            self._conn.execute("INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                               (directory, os.path.dirname(directory), dir_mtime))
+            # Subfolders are remembered unscanned (-1), so a later recursive scan finds them even
+            # when this folder's listing has not changed.
+            self._conn.executemany("INSERT OR IGNORE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, -1)",
+                                   [(subdir, directory) for subdir in subdirs])
+            known_subdirs = {r['path'] for r in self._conn.execute("SELECT path FROM dirs WHERE parent = ?", (directory,))}
+        for gone in known_subdirs - set(subdirs):
+            self._forget_dir(gone)
+        return subdirs
+
+    def _adopt_moved(self, path: str, directory: str, stat: os.stat_result) -> bool:
+        """Moves the record of a vanished file with the same size and content to `path`."""
+        with self._lock:
+            candidates = [dict(r) for r in self._conn.execute(
+                "SELECT path, fingerprint FROM files WHERE size = ? AND fingerprint IS NOT NULL AND path != ?",
+                (stat.st_size, path))]
+        candidates = [c for c in candidates if not os.path.exists(c['path'])]
+        if not candidates:
+            return False
+        try:
+            fingerprint = fingerprint_file(path, include_mtime=False)
+        except OSError:
+            return False
+        for candidate in candidates:
+            if candidate['fingerprint'] == fingerprint:
+                with self._lock, self._conn:
+                    self._conn.execute("UPDATE files SET path = ?, dir = ?, mtime_ns = ?, updated_at = ? WHERE path = ?",
+                                       (path, directory, stat.st_mtime_ns, _now(), candidate['path']))
+                return True
+        return False
+
+    def _forget_dir(self, directory: str):
+        with self._lock, self._conn:
+            prefix = directory.rstrip(os.sep) + os.sep
+            self._conn.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?", (directory, len(prefix), prefix))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,46 +1,166 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import threading
 import time
-from PyQt5.QtCore import QObject, pyqtSignal
 from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
 from watchdog.events import FileSystemEventHandler
+from config import VIDEO_EXTENSIONS
+from file_index import FileIndex
+
+DEFAULT_STABLE_SECONDS = 5.0
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+def is_video_file(path: str) -> bool:
+    return os.path.splitext(path.lower())[1] in VIDEO_EXTENSIONS
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class StabilityTracker:
+    """
+    Holds back files until their size and modification time stop changing.
+
+    `touch` records a file that an event mentioned; `check` reports the files whose signature
+    has not changed for `stable_seconds`. A file that was already reported is only reported
+    again if its content changes afterwards.
+    """
+    def __init__(self, stable_seconds: float = DEFAULT_STABLE_SECONDS):
+        self.stable_seconds = stable_seconds
+        self._pending: Dict[str, Tuple[Optional[Tuple[int, int]], float]] = {}
+        self._reported: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, path: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # Every event restarts the window; a burst of writes during a copy collapses into one entry.
+            self._pending[path] = (_signature(path), now)
+
+    def forget(self, path: str):
+        with self._lock:
+            self._pending.pop(path, None)
+            self._reported.pop(path, None)
+
+    def next_due(self) -> Optional[float]:
+        """Monotonic time of the next check, or None when nothing is pending."""
+        with self._lock:
+            if not self._pending:
+                return None
+            return min(changed_at for _, changed_at in self._pending.values()) + self.stable_seconds
+
+    def check(self, now: Optional[float] = None) -> List[str]:
+        """Returns the paths that became stable, in the order their windows ended."""
+        now = time.monotonic() if now is None else now
+        stable = []
+        with self._lock:
+            for path, (signature, changed_at) in list(self._pending.items()):
+                if now - changed_at < self.stable_seconds:
+                    continue
+                current = _signature(path)
+                if current is None:
+                    del self._pending[path]  # Deleted or moved away before it settled.
+                elif current != signature:
+                    self._pending[path] = (current, now)
+                else:
+                    del self._pending[path]
+                    if self._reported.get(path) != current:
+                        self._reported[path] = current
+                        stable.append((changed_at, path))
+        return [path for _, path in sorted(stable)]
 
-VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.flv', '.wmv'}
 
 class VideoFileEventHandler(FileSystemEventHandler):
-    """Handles file system events and emits a signal when a video is created."""
-    file_found = pyqtSignal(str)
+    """Forwards create, modify and move events for video files to a callback."""
+    def __init__(self, on_event: Callable[[str], None], on_removed: Optional[Callable[[str], None]] = None):
+        super().__init__()
+        self.on_event, self.on_removed = on_event, on_removed
 
     def on_created(self, event):
-        if not event.is_directory:
-            _, ext = os.path.splitext(event.src_path.lower())
-            if ext in VIDEO_EXTENSIONS:
-                self.file_found.emit(event.src_path)
+        if not event.is_directory and is_video_file(event.src_path):
+            self.on_event(event.src_path)
+
+    def on_modified(self, event):
+        self.on_created(event)
+
+    def on_moved(self, event):
+        if event.is_directory:
+            return
+        if self.on_removed and is_video_file(event.src_path):
+            self.on_removed(event.src_path)
+        if is_video_file(event.dest_path):
+            self.on_event(event.dest_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory and self.on_removed and is_video_file(event.src_path):
+            self.on_removed(event.src_path)
 
-class FolderWatcher(QObject):
+
+class DirectoryWatcher:
     """
-    Runs a watchdog observer in a separate thread to monitor a folder.
+    Watches a folder and calls `on_file` once for each video that has finished arriving.
+
+    Events are coalesced per file and a file is only reported after its size and modification
+    time have been unchanged for `stable_seconds`, so videos still being copied in are not queued
+    half-written. `polling` uses periodic directory snapshots instead of OS notifications, for
+    network shares where inotify and similar APIs do not see remote writes.
+
+    With a `file_index`, the folder is diffed against it on start so videos that arrived while
+    nothing was watching are reported too, and files the index already handled are skipped.
+
+    Qt-free; bulk_ingest.FolderWatcher wraps it for the GUI and engine.QueueRunner uses it headless.
     """
-    file_found = pyqtSignal(str)
-    finished = pyqtSignal()
-    
-    def __init__(self, path_to_watch):
-        super().__init__()
+    def __init__(self, path_to_watch: str, on_file: Callable[[str], None],
+                 stable_seconds: float = DEFAULT_STABLE_SECONDS, recursive: bool = False,
+                 polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 file_index: Optional[FileIndex] = None):
         self.path_to_watch = path_to_watch
-        self.event_handler = VideoFileEventHandler()
-        self.observer = Observer()
-        # Connect the handler's signal to this worker's signal
-        self.event_handler.file_found.connect(self.file_found)
-        self._is_running = True
+        self.on_file = on_file
+        self.recursive = recursive
+        self.file_index = file_index
+        self.tracker = StabilityTracker(stable_seconds)
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self.event_handler = VideoFileEventHandler(self._on_event, self.tracker.forget)
+        self.observer = PollingObserver(timeout=poll_interval) if polling else Observer()
+
+    def _on_event(self, path: str):
+        self.tracker.touch(path)
+        self._wake.set()
 
     def run(self):
-        self.observer.schedule(self.event_handler, self.path_to_watch, recursive=False)
+        """Blocks until `stop()`, sleeping until the next stability deadline or the next event."""
+        self.observer.schedule(self.event_handler, self.path_to_watch, recursive=self.recursive)
         self.observer.start()
         try:
-            while self._is_running:
-                time.sleep(1)
+            if self.file_index:
+                # Started after the observer, so nothing arriving during the scan falls in between.
+                for batch in self.file_index.scan(self.path_to_watch, self.recursive):
+                    if self._stopped.is_set():
+                        break
+                    for path in batch:
+                        self.tracker.touch(path)
+            while not self._stopped.is_set():
+                due = self.tracker.next_due()
+                timeout = None if due is None else max(0.0, due - time.monotonic())
+                self._wake.wait(timeout)
+                self._wake.clear()
+                for path in self.tracker.check():
+                    if self._stopped.is_set():
+                        break
+                    if not (self.file_index and self.file_index.is_handled(path)):
+                        self.on_file(path)
         finally:
             self.observer.stop()
             self.observer.join()
-            self.finished.emit()
 
     def stop(self):
-        self._is_running = False
\ No newline at end of file
+        self._stopped.set()
+        self._wake.set()
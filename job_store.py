@@ -0,0 +1,269 @@
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Pipeline stages a job moves through; "rendering" and "uploading" are only left behind by a crash.
+JOB_STATES = ("queued", "rendering", "rendered", "uploading", "done", "failed")
+
+# Status text shown in the queue table for a job loaded from the store.
+STATE_LABELS = {
+    "queued": "Queued",
+    "rendering": "Queued",
+    "rendered": "Rendered (waiting for upload)",
+    "uploading": "Rendered (waiting for upload)",
+    "done": "Completed",
+    "failed": "Error",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input_path TEXT NOT NULL,
+    preset_name TEXT NOT NULL DEFAULT 'None (No Effects)',
+    token_file TEXT,
+    state TEXT NOT NULL DEFAULT 'queued',
+    output_folder TEXT,
+    output_path TEXT,
+    video_url TEXT,
+    video_config TEXT,
+    yt_config TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    session_key TEXT PRIMARY KEY,
+    session_uri TEXT NOT NULL,
+    confirmed_offset INTEGER NOT NULL,
+    total_size INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class JobStore:
+    """
+    SQLite-backed queue of jobs that survives crashes and restarts.
+
+    Every state change is committed immediately, so after a restart each job can resume from
+    the last stage it completed. A single connection is shared between the GUI and the
+    pipeline threads and serialised with a lock.
+    """
+    JOBS_FILE = 'jobs.db'
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or self.JOBS_FILE
+        self._lock = threading.RLock()
+        self._conn = self._connect(self.db_path)
+
+    @staticmethod
+    def _connect(db_path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    # --- Queue contents ---
+    def add_job(self, input_path: str, preset_name: str = "None (No Effects)", token_file: Optional[str] = None) -> int:
+        now = _now()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (input_path, preset_name, token_file, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (input_path, preset_name, token_file, now, now)
+            )
+            return cursor.lastrowid
+
+    def add_jobs(self, input_paths: List[str], preset_name: str = "None (No Effects)",
+                 token_file: Optional[str] = None) -> List[int]:
+        """Adds several jobs in one transaction and returns their ids in order."""
+        now = _now()
+        with self._lock, self._conn:
+            return [self._conn.execute(
+                "INSERT INTO jobs (input_path, preset_name, token_file, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (input_path, preset_name, token_file, now, now)
+            ).lastrowid for input_path in input_paths]
+
+    def update_selection(self, job_id: int, preset_name: Optional[str] = None, token_file: Optional[str] = None):
+        with self._lock, self._conn:
+            if preset_name is not None:
+                self._conn.execute("UPDATE jobs SET preset_name = ?, updated_at = ? WHERE id = ?", (preset_name, _now(), job_id))
+            if token_file is not None:
+                self._conn.execute("UPDATE jobs SET token_file = ?, updated_at = ? WHERE id = ?", (token_file, _now(), job_id))
+
+    def remove_job(self, job_id: int):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def remove_jobs(self, job_ids: List[int]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs")
+
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_jobs(self) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute("SELECT * FROM jobs ORDER BY id")]
+
+    # --- Pipeline state ---
+    def prepare_job(self, job_id: int, video_config, yt_config, output_folder: str):
+        """Snapshots the effective configs at queue start so a resumed job renders and uploads the same way."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET video_config = ?, yt_config = ?, output_folder = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(asdict(video_config)), json.dumps(asdict(yt_config)), output_folder, _now(), job_id)
+            )
+
+    def set_state(self, job_id: int, state: str, **fields):
+        """
+        Moves a job to `state`, optionally updating output_path, video_url or error.
+        Entering "rendering" counts as a new attempt.
+        """
+        if state not in JOB_STATES:
+            raise ValueError(f"Unknown job state: {state}")
+        allowed = {'output_path', 'video_url', 'error'}
+        unknown = set(fields) - allowed
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+
+        assignments = ["state = ?", "updated_at = ?"] + [f"{name} = ?" for name in fields]
+        values = [state, _now()] + list(fields.values())
+        if state == "rendering":
+            assignments.append("attempts = attempts + 1")
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?", values + [job_id])
+
+    def resume_stage(self, job: Dict) -> str:
+        """
+        Returns where a job should pick up: "render", "upload" or "done".
+        A job whose rendered file has disappeared falls back to rendering.
+        """
+        if job['state'] == "done":
+            return "done"
+        # Failed renders clear output_path, so a failed job that still has one failed during upload.
+        if job['state'] in ("rendered", "uploading", "failed") and job['output_path'] and os.path.exists(job['output_path']):
+            return "upload"
+        return "render"
+
+    # --- Batch settings ---
+    def get_setting(self, key: str, default: str = "") -> str:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_setting(self, key: str, value: str):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    # --- Resumable upload sessions (see resumable_upload.ResumableUpload) ---
+    def load_upload_session(self, session_key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_uri, confirmed_offset, total_size FROM upload_sessions WHERE session_key = ?", (session_key,)
+            ).fetchone()
+        if not row:
+            return None
+        return {'session_uri': row['session_uri'], 'offset': row['confirmed_offset'], 'total': row['total_size']}
+
+    def save_upload_session(self, session_key: str, session_uri: str, offset: int, total: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO upload_sessions (session_key, session_uri, confirmed_offset, total_size, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)", (session_key, session_uri, offset, total, _now())
+            )
+
+    def clear_upload_session(self, session_key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM upload_sessions WHERE session_key = ?", (session_key,))
+
+    # --- Sessions ---
+    def save_as(self, file_path: str):
+        """Writes a consistent copy of the whole store (jobs and settings) to `file_path`."""
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        target = sqlite3.connect(file_path)
+        try:
+            with self._lock:
+                self._conn.backup(target)
+        finally:
+            target.close()
+
+    def load_from(self, file_path: str):
+        """Replaces the current jobs and settings with the contents of a saved session file."""
+        self.replace_contents(*self.read_session(file_path))
+
+    @staticmethod
+    def read_session(file_path: str) -> Tuple[List[Dict], List[Tuple[str, str]]]:
+        """
+        Reads the jobs and settings of a saved session without touching the store, so a slow
+        read (e.g. from a network share) can run off the GUI thread and be abandoned.
+
+        Sessions saved before the job store existed were plain JSON and are converted here.
+
+        Returns:
+            Tuple[List[Dict], List[Tuple[str, str]]]: The job rows and the (key, value) settings.
+        """
+        if file_path.lower().endswith('.json'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                session_data = json.load(f)
+            batch_settings = session_data.get("batch_settings", {})
+            settings = [("output_folder", batch_settings.get("output_folder", "")),
+                        ("title_template", batch_settings.get("title_template", ""))]
+            now = _now()
+            jobs = [{"input_path": task_data["video_path"],
+                     "preset_name": task_data.get("selected_preset") or "None (No Effects)",
+                     "token_file": task_data.get("selected_token_file"),
+                     "created_at": now, "updated_at": now}
+                    for task_data in session_data.get("queue", [])]
+            return jobs, settings
+        source = sqlite3.connect(file_path)
+        source.row_factory = sqlite3.Row
+        try:
+            jobs = [dict(row) for row in source.execute("SELECT * FROM jobs ORDER BY id")]
+            settings = [tuple(row) for row in source.execute("SELECT key, value FROM settings")]
+        finally:
+            source.close()
+        return jobs, settings
+
+    def replace_contents(self, jobs: List[Dict], settings: List[Tuple[str, str]]):
+        """
+        Replaces all jobs and settings in one transaction. Upload sessions of the replaced jobs go
+        too, so a loaded job can never resume an upload that belonged to a different queue.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs")
+            self._conn.execute("DELETE FROM settings")
+            self._conn.execute("DELETE FROM upload_sessions")
+            # Rows read from one session share their columns, so they go in with a single executemany.
+            by_columns: Dict[Tuple[str, ...], List[Tuple]] = {}
+            for job in jobs:
+                by_columns.setdefault(tuple(job.keys()), []).append(tuple(job.values()))
+            for columns, rows in by_columns.items():
+                placeholders = ', '.join('?' for _ in columns)
+                self._conn.executemany(f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({placeholders})", rows)
+            self._conn.executemany("INSERT INTO settings (key, value) VALUES (?, ?)", settings)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
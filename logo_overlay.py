@@ -0,0 +1,133 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+import hashlib
+import io
+import os
+import tempfile
+import numpy as np
+from PIL import Image
+from config import VideoConfig
+from effects import FramePool
+
+# Gap between the logo and the frame edge, as a fraction of the frame width.
+MARGIN_FRACTION = 0.02
+
+
+class LogoSprite:
+    """
+    A logo decoded, scaled and premultiplied once, ready to be blended into frames.
+
+    Blending computes premultiplied + frame * (255 - alpha) / 255 on the logo's rectangle only,
+    in 16-bit integers, so the rest of the frame is never read or written.
+    """
+    def __init__(self, premultiplied: np.ndarray, inverse_alpha: np.ndarray, png_path: Optional[str] = None):
+        self.premultiplied = premultiplied    # (h, w, 3) uint16, colour already multiplied by alpha
+        self.inverse_alpha = inverse_alpha    # (h, w, 1) uint16, 255 - alpha
+        self.png_path = png_path              # The same sprite as a straight-alpha PNG, for ffmpeg
+        self.height, self.width = premultiplied.shape[:2]
+
+    def blend(self, frame: np.ndarray, x: int, y: int) -> np.ndarray:
+        """Blends into a writable uint8 RGB frame at (x, y), clipping at the frame edges."""
+        frame_h, frame_w = frame.shape[:2]
+        left, top = max(0, x), max(0, y)
+        right, bottom = min(frame_w, x + self.width), min(frame_h, y + self.height)
+        if left >= right or top >= bottom:
+            return frame
+        roi = frame[top:bottom, left:right]
+        sprite = (slice(top - y, bottom - y), slice(left - x, right - x))
+        mixed = roi.astype(np.uint16)
+        mixed *= self.inverse_alpha[sprite]
+        # x / 255 rounded, without a division: (t + 128 + ((t + 128) >> 8)) >> 8.
+        mixed += 128
+        mixed += mixed >> 8
+        mixed >>= 8
+        mixed += self.premultiplied[sprite]
+        np.minimum(mixed, 255, out=mixed)
+        roi[...] = mixed
+        return frame
+
+
+def logo_position(frame_size: Tuple[int, int], sprite_size: Tuple[int, int], position: str) -> Tuple[int, int]:
+    frame_w, frame_h = frame_size
+    sprite_w, sprite_h = sprite_size
+    margin = int(round(frame_w * MARGIN_FRACTION))
+    x = margin if "Left" in position else frame_w - sprite_w - margin
+    y = margin if "Top" in position else frame_h - sprite_h - margin
+    return x, y
+
+
+def logo_width_for(video_config: VideoConfig, frame_width: int) -> int:
+    return max(1, int(round(frame_width * video_config.logo_scale)))
+
+
+def _cache_name(logo_path: str, width: int, opacity: float) -> str:
+    stat = os.stat(logo_path)
+    key = f"{os.path.abspath(logo_path)}|{stat.st_size}|{stat.st_mtime_ns}|{width}|{opacity:.4f}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes):
+    fd, tmp_path = tempfile.mkstemp(prefix='.logo_', dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _render_sprite(logo_path: str, width: int, opacity: float) -> Tuple[np.ndarray, np.ndarray, Image.Image]:
+    with Image.open(logo_path) as source:
+        logo = source.convert("RGBA")
+    height = max(1, int(round(logo.height * width / logo.width)))
+    logo = logo.resize((width, height), Image.LANCZOS)
+    rgba = np.asarray(logo).astype(np.uint16)
+    alpha = (rgba[..., 3:4] * int(round(opacity * 255)) + 127) // 255
+    premultiplied = (rgba[..., :3] * alpha + 127) // 255
+    straight = np.concatenate([rgba[..., :3], alpha], axis=-1).astype(np.uint8)
+    return premultiplied.astype(np.uint16), (255 - alpha).astype(np.uint16), Image.fromarray(straight, "RGBA")
+
+
+@lru_cache(maxsize=16)
+def _load_sprite(logo_path: str, width: int, opacity: float, cache_dir: str, cache_name: str) -> LogoSprite:
+    # cache_name changes with the logo file's size and mtime, so an edited logo misses this cache.
+    npz_path = os.path.join(cache_dir, f"{cache_name}.npz")
+    png_path = os.path.join(cache_dir, f"{cache_name}.png")
+    if os.path.exists(npz_path) and os.path.exists(png_path):
+        with np.load(npz_path) as data:
+            return LogoSprite(data["premultiplied"], data["inverse_alpha"], png_path)
+
+    premultiplied, inverse_alpha, png = _render_sprite(logo_path, width, opacity)
+    os.makedirs(cache_dir, exist_ok=True)
+    buffer = io.BytesIO()
+    np.savez(buffer, premultiplied=premultiplied, inverse_alpha=inverse_alpha)
+    _write_atomic(npz_path, buffer.getvalue())
+    buffer = io.BytesIO()
+    png.save(buffer, format="PNG")
+    _write_atomic(png_path, buffer.getvalue())
+    return LogoSprite(premultiplied, inverse_alpha, png_path)
+
+
+def logo_sprite(logo_path: str, width: int, opacity: float = 1.0, cache_dir: Optional[str] = None) -> LogoSprite:
+    """
+    Returns the logo scaled to `width` pixels and premultiplied with `opacity`.
+
+    Sprites are cached in memory for the current process and on disk in `cache_dir`, so the render
+    processes of a batch that share a logo and output size decode and resample it only once.
+    """
+    cache_dir = cache_dir or LogoOverlay.CACHE_DIR
+    return _load_sprite(logo_path, width, round(opacity, 4), cache_dir, _cache_name(logo_path, width, opacity))
+
+
+class LogoOverlay:
+    """Per-frame watermark for clip.fl_image; the sprite and its position are fixed per clip."""
+    CACHE_DIR = 'logo_cache'
+
+    def __init__(self, video_config: VideoConfig, frame_size: Tuple[int, int], cache_dir: Optional[str] = None,
+                 frame_pool: Optional[FramePool] = None):
+        self.frame_pool = frame_pool
+        self.sprite = logo_sprite(video_config.logo_path, logo_width_for(video_config, frame_size[0]),
+                                  video_config.logo_opacity, cache_dir)
+        self.x, self.y = logo_position(frame_size, (self.sprite.width, self.sprite.height), video_config.logo_position)
+
+    def __call__(self, frame: np.ndarray) -> np.ndarray:
+        if frame.dtype != np.uint8 or not frame.flags.writeable:
+            frame = self.frame_pool.copy(frame) if self.frame_pool is not None else np.array(frame, dtype=np.uint8)
+        return self.sprite.blend(frame, self.x, self.y)
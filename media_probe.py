@@ -0,0 +1,273 @@
+"""
+Header-only probes of input videos, cached by path, size and modification time.
+
+Files are probed when they are queued, several at a time, so duration, resolution, codecs and
+bitrate are known before anything renders. The engine uses them to reject unreadable inputs
+before they take a render slot, to start the longest renders first and to estimate the time left.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import threading
+
+DEFAULT_PROBE_WORKERS = 8
+PROBE_TIMEOUT = 30.0
+
+# Relative cost of each render plan per second of 1080p input; a full re-encode is the unit.
+PLAN_WEIGHTS = {"skip": 0.0, "remux": 0.05, "render": 1.0}
+# Assumed upload speed when weighing upload time against render time.
+UPLOAD_BYTES_PER_SECOND = 4 * 1024 ** 2
+# Stand-in duration for a file that could not be probed.
+UNKNOWN_DURATION = 60.0
+_REFERENCE_PIXELS = 1920 * 1080
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    info TEXT NOT NULL,
+    probed_at TEXT NOT NULL
+);
+"""
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_BITRATE_RE = re.compile(r"bitrate:\s*(\d+)\s*kb/s")
+_VIDEO_RE = re.compile(r"Stream #\d+:\d+.*?: Video: (\w+).*?(\d{2,5})x(\d{2,5})(?:.*?([\d.]+) fps)?")
+_AUDIO_RE = re.compile(r"Stream #\d+:\d+.*?: Audio: (\w+)")
+
+
+@dataclass
+class MediaInfo:
+    size: int = 0
+    duration: float = 0.0
+    width: int = 0
+    height: int = 0
+    fps: float = 0.0
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    bitrate: int = 0                 # bits per second, whole file
+    format_name: Optional[str] = None
+    error: Optional[str] = None      # set when the file could not be read at all
+
+    def problem(self) -> Optional[str]:
+        """Why the file cannot be processed, or None when it looks usable."""
+        if self.error:
+            return self.error
+        if not self.video_codec or not self.width or not self.height:
+            return "no video stream"
+        if self.duration <= 0:
+            return "unknown or zero duration"
+        return None
+
+    def summary(self) -> str:
+        problem = self.problem()
+        if problem:
+            return problem
+        codecs = self.video_codec + (f"/{self.audio_codec}" if self.audio_codec else "")
+        return f"{format_duration(self.duration)}  {self.width}x{self.height}  {codecs}"
+
+
+def find_ffprobe() -> Optional[str]:
+    """ffprobe from PATH or next to the ffmpeg in use; None when only ffmpeg is available."""
+    path = shutil.which("ffprobe")
+    if path:
+        return path
+    from ffmpeg_backend import find_ffmpeg
+    ffmpeg_path = find_ffmpeg()
+    if ffmpeg_path:
+        sibling = os.path.join(os.path.dirname(ffmpeg_path), "ffprobe" + os.path.splitext(ffmpeg_path)[1])
+        if os.path.exists(sibling):
+            return sibling
+    return None
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def estimate_work(info: Optional[MediaInfo], plan: str) -> float:
+    """
+    Expected processing cost of one job in seconds of 1080p re-encoding: input duration scaled by
+    frame size and by the render `plan` (see PLAN_WEIGHTS), plus the time its upload takes at
+    UPLOAD_BYTES_PER_SECOND. Only the ratios between jobs matter; they weight ETA estimates and
+    scheduling order.
+    """
+    if info is None or info.problem():
+        duration, pixels, size = UNKNOWN_DURATION, _REFERENCE_PIXELS, 0
+    else:
+        duration, pixels, size = info.duration, info.width * info.height, info.size
+    render = duration * PLAN_WEIGHTS[plan] * pixels / _REFERENCE_PIXELS
+    upload = (size or duration * 1024 ** 2) / UPLOAD_BYTES_PER_SECOND
+    return render + upload
+
+
+class MediaProbeCache:
+    """
+    Probe results in SQLite, keyed by absolute path and valid while size and mtime are unchanged.
+
+    `probe` reads the cache first and runs ffprobe (or ffmpeg, when ffprobe is missing) only for
+    new or changed files. `probe_many` does that for several files on a thread pool; the probes
+    are subprocesses, so they run in parallel. Without any ffmpeg binary nothing can be probed and
+    `probe` returns None.
+    """
+    CACHE_FILE = 'media_probe.db'
+
+    def __init__(self, db_path: Optional[str] = None, ffprobe_path: Optional[str] = None,
+                 max_workers: int = DEFAULT_PROBE_WORKERS):
+        self.db_path = db_path or self.CACHE_FILE
+        self.max_workers = max(1, max_workers)
+        self._ffprobe_path, self._ffmpeg_path, self._tools_found = ffprobe_path, None, bool(ffprobe_path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.hits = self.misses = 0
+
+    def lookup(self, path: str) -> Optional[MediaInfo]:
+        """The cached result for the file as it is now, without probing."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, info FROM probes WHERE path = ?",
+                                     (os.path.abspath(path),)).fetchone()
+        if row and row['size'] == stat.st_size and row['mtime_ns'] == stat.st_mtime_ns:
+            return MediaInfo(**json.loads(row['info']))
+        return None
+
+    def probe(self, path: str) -> Optional[MediaInfo]:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            return MediaInfo(error=f"cannot read file: {e.strerror or e}")
+        cached = self.lookup(path)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+            return cached
+        info = self._run_probe(path)
+        if info is None:
+            return None
+        info.size = stat.st_size
+        with self._lock, self._conn:
+            self.misses += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO probes (path, size, mtime_ns, info, probed_at) VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, json.dumps(asdict(info)),
+                 datetime.now().isoformat(timespec='seconds')))
+        return info
+
+    def probe_many(self, paths: Iterable[str],
+                   on_result: Optional[Callable[[str, Optional[MediaInfo]], None]] = None) -> Dict[str, Optional[MediaInfo]]:
+        """Probes `paths` in parallel. `on_result(path, info)` is called from the pool threads as results arrive."""
+        paths = list(dict.fromkeys(paths))
+        results: Dict[str, Optional[MediaInfo]] = {}
+
+        def run(path: str):
+            results[path] = info = self.probe(path)
+            if on_result:
+                on_result(path, info)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(paths)))) as pool:
+            list(pool.map(run, paths))
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def _find_tools(self):
+        with self._lock:
+            if not self._tools_found:
+                from ffmpeg_backend import find_ffmpeg
+                self._ffprobe_path = find_ffprobe()
+                self._ffmpeg_path = None if self._ffprobe_path else find_ffmpeg()
+                self._tools_found = True
+
+    def _run_probe(self, path: str) -> Optional[MediaInfo]:
+        self._find_tools()
+        try:
+            if self._ffprobe_path:
+                return self._ffprobe(path)
+            if self._ffmpeg_path:
+                return self._ffmpeg_banner(path)
+        except subprocess.TimeoutExpired:
+            # A slow share says nothing about the file; it stays unknown rather than rejected.
+            pass
+        return None
+
+    def _ffprobe(self, path: str) -> MediaInfo:
+        # Container and stream headers only; no packets are decoded.
+        result = subprocess.run(
+            [self._ffprobe_path, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace", timeout=PROBE_TIMEOUT)
+        if result.returncode != 0:
+            return MediaInfo(error=(result.stderr.strip().splitlines() or ["not a readable media file"])[-1])
+        data = json.loads(result.stdout or "{}")
+        streams, container = data.get("streams", []), data.get("format", {})
+        video = next((s for s in streams if s.get("codec_type") == "video"
+                      and not s.get("disposition", {}).get("attached_pic")), None)
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+        info = MediaInfo(duration=_float(container.get("duration")), bitrate=int(_float(container.get("bit_rate"))),
+                         format_name=container.get("format_name"))
+        if video:
+            info.video_codec, info.width, info.height = video.get("codec_name"), video.get("width", 0), video.get("height", 0)
+            info.fps = _rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate"))
+            info.duration = info.duration or _float(video.get("duration"))
+        if audio:
+            info.audio_codec = audio.get("codec_name")
+        return info
+
+    def _ffmpeg_banner(self, path: str) -> MediaInfo:
+        # ffmpeg -i without an output reads the headers, prints them and exits with an error.
+        result = subprocess.run([self._ffmpeg_path, "-hide_banner", "-i", path], stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, text=True, errors="replace", timeout=PROBE_TIMEOUT)
+        banner = result.stderr
+        duration, video, audio = _DURATION_RE.search(banner), _VIDEO_RE.search(banner), _AUDIO_RE.search(banner)
+        if not duration and not video:
+            return MediaInfo(error=(banner.strip().splitlines() or ["not a readable media file"])[-1])
+        info = MediaInfo()
+        if duration:
+            h, m, s = duration.groups()
+            info.duration = int(h) * 3600 + int(m) * 60 + float(s)
+        bitrate = _BITRATE_RE.search(banner)
+        if bitrate:
+            info.bitrate = int(bitrate.group(1)) * 1000
+        if video:
+            info.video_codec, info.width, info.height = video.group(1), int(video.group(2)), int(video.group(3))
+            info.fps = float(video.group(4)) if video.group(4) else 0.0
+        if audio:
+            info.audio_codec = audio.group(1)
+        return info
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _rate(value: Optional[str]) -> float:
+    """Parses an ffprobe frame rate such as "30000/1001"."""
+    if not value or "/" not in value:
+        return _float(value)
+    numerator, denominator = value.split("/", 1)
+    return _float(numerator) / _float(denominator) if _float(denominator) else 0.0
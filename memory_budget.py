@@ -0,0 +1,108 @@
+"""
+Memory accounting for render processes.
+
+Each render runs in its own process (see render_pool.py). That process can be given a hard
+memory ceiling, reports its peak resident set size when it finishes, and the pool uses those
+reports to decide how many renders fit in memory at once.
+"""
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import os
+import sys
+from config import VideoConfig
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits or rusage; renders run without a ceiling.
+    resource = None
+
+# Assumed peak of a render before any render with the same settings has reported one.
+DEFAULT_RENDER_ESTIMATE = 1024 ** 3  # 1 GiB
+# Share of physical memory the render pool may plan to use by default.
+DEFAULT_BUDGET_FRACTION = 0.75
+
+
+def format_bytes(value: int) -> str:
+    return f"{value / 1024 ** 3:.2f} GB" if value >= 1024 ** 3 else f"{value / 1024 ** 2:.0f} MB"
+
+
+def physical_memory() -> Optional[int]:
+    """Total physical memory in bytes, or None where sysconf cannot tell."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_memory_budget() -> Optional[int]:
+    total = physical_memory()
+    return int(total * DEFAULT_BUDGET_FRACTION) if total else None
+
+
+def apply_memory_limit(limit_bytes: int) -> bool:
+    """
+    Caps the data segment of the current process and of every process it starts (ffmpeg included).
+
+    Allocations beyond the cap fail with MemoryError instead of pushing the machine into swap.
+    RLIMIT_DATA covers heap and anonymous mappings on Linux; elsewhere the address space limit is used.
+    Returns False when the platform has no such limit.
+    """
+    if resource is None:
+        return False
+    limit_kind = getattr(resource, "RLIMIT_DATA", None) if sys.platform.startswith("linux") else None
+    if limit_kind is None:
+        limit_kind = getattr(resource, "RLIMIT_AS", None)
+    if limit_kind is None:
+        return False
+    _, hard = resource.getrlimit(limit_kind)
+    if hard != resource.RLIM_INFINITY:
+        limit_bytes = min(limit_bytes, hard)
+    try:
+        resource.setrlimit(limit_kind, (limit_bytes, hard))
+    except (ValueError, OSError):
+        return False
+    return True
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Peak resident memory of this process plus the largest of its finished child processes, in bytes.
+
+    Renders run ffmpeg as a child, so both are counted; the sum is an upper bound of what the
+    render needed at one time.
+    """
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is in bytes on macOS, KiB elsewhere
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (own + children) * scale
+
+
+class RenderMemoryModel:
+    """
+    Expected peak memory of a render, learned from the peaks that finished renders report.
+
+    Renders are grouped by the settings that drive their memory use most: the backend and the
+    number of parallel segment encoders. Until a group has reported, the largest peak seen so far
+    (or DEFAULT_RENDER_ESTIMATE) stands in for it.
+    """
+    HISTORY = 5
+
+    def __init__(self, default_estimate: int = DEFAULT_RENDER_ESTIMATE):
+        self.default_estimate = default_estimate
+        self._peaks: Dict[Tuple[str, int], Deque[int]] = {}
+
+    @staticmethod
+    def profile(video_config: VideoConfig) -> Tuple[str, int]:
+        return video_config.render_backend, max(1, video_config.parallel_segments)
+
+    def estimate(self, video_config: VideoConfig) -> int:
+        peaks = self._peaks.get(self.profile(video_config))
+        if peaks:
+            return max(peaks)
+        observed = [peak for history in self._peaks.values() for peak in history]
+        return max(observed) if observed else self.default_estimate
+
+    def record(self, video_config: VideoConfig, peak: int):
+        self._peaks.setdefault(self.profile(video_config), deque(maxlen=self.HISTORY)).append(peak)
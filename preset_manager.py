@@ -1,6 +1,9 @@
 import json
 import os
 
+# Preset name of a job that is uploaded without effects.
+NO_PRESET = "None (No Effects)"
+
 class PresetManager:
     PRESETS_FILE = 'presets.json'
 
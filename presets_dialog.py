@@ -1,7 +1,8 @@
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QListWidget, QPushButton, QMessageBox, 
-    QLabel, QLineEdit, QComboBox, QDoubleSpinBox, QFormLayout
+    QLabel, QLineEdit, QComboBox, QDoubleSpinBox, QSpinBox, QFormLayout, QFileDialog
 )
+from config import LOGO_POSITIONS
 from preset_manager import PresetManager
 
 class PresetsDialog(QDialog):
@@ -30,12 +31,32 @@ class PresetsDialog(QDialog):
         self.zoom_spin = QDoubleSpinBox(); self.zoom_spin.setRange(1.0, 3.0); self.zoom_spin.setSingleStep(0.05); self.zoom_spin.setDecimals(2)
         self.rotate_spin = QDoubleSpinBox(); self.rotate_spin.setRange(-45.0, 45.0); self.rotate_spin.setSingleStep(0.5); self.rotate_spin.setDecimals(1)
         self.overlay_spin = QDoubleSpinBox(); self.overlay_spin.setRange(0.0, 1.0); self.overlay_spin.setSingleStep(0.01); self.overlay_spin.setDecimals(2)
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems(["MoviePy", "FFmpeg"])
+        self.backend_combo.setToolTip("FFmpeg renders the whole preset in one native pass; MoviePy is used as a fallback.")
+        self.segments_spin = QSpinBox(); self.segments_spin.setRange(1, 32)
+        self.segments_spin.setToolTip("FFmpeg backend: split a long video at keyframes and encode this many parts at once. 1 disables splitting.")
+        self.logo_edit = QLineEdit(); self.logo_edit.setPlaceholderText("No logo")
+        logo_browse_btn = QPushButton("Browse...")
+        logo_browse_btn.clicked.connect(self.browse_logo)
+        logo_row = QHBoxLayout(); logo_row.addWidget(self.logo_edit); logo_row.addWidget(logo_browse_btn)
+        self.logo_position_combo = QComboBox()
+        self.logo_position_combo.addItems(LOGO_POSITIONS)
+        self.logo_scale_spin = QDoubleSpinBox(); self.logo_scale_spin.setRange(0.02, 1.0); self.logo_scale_spin.setSingleStep(0.01); self.logo_scale_spin.setDecimals(2)
+        self.logo_scale_spin.setToolTip("Logo width as a fraction of the video width.")
+        self.logo_opacity_spin = QDoubleSpinBox(); self.logo_opacity_spin.setRange(0.0, 1.0); self.logo_opacity_spin.setSingleStep(0.05); self.logo_opacity_spin.setDecimals(2)
         
         form_layout.addRow("Preset Name:", self.name_edit)
         form_layout.addRow("Flip Video:", self.flip_combo)
         form_layout.addRow("Zoom Factor:", self.zoom_spin)
         form_layout.addRow("Rotation Angle:", self.rotate_spin)
         form_layout.addRow("Overlay Opacity:", self.overlay_spin)
+        form_layout.addRow("Render Backend:", self.backend_combo)
+        form_layout.addRow("Parallel Segments:", self.segments_spin)
+        form_layout.addRow("Logo:", logo_row)
+        form_layout.addRow("Logo Position:", self.logo_position_combo)
+        form_layout.addRow("Logo Scale:", self.logo_scale_spin)
+        form_layout.addRow("Logo Opacity:", self.logo_opacity_spin)
         
         right_panel.addLayout(form_layout)
 
@@ -71,6 +92,17 @@ class PresetsDialog(QDialog):
         self.zoom_spin.setValue(settings.get("zoom_factor", 1.0))
         self.rotate_spin.setValue(settings.get("rotation_angle", 0.0))
         self.overlay_spin.setValue(settings.get("overlay_opacity", 0.0))
+        self.backend_combo.setCurrentText(settings.get("render_backend", "MoviePy"))
+        self.segments_spin.setValue(settings.get("parallel_segments", 1))
+        self.logo_edit.setText(settings.get("logo_path") or "")
+        self.logo_position_combo.setCurrentText(settings.get("logo_position", "Bottom Right"))
+        self.logo_scale_spin.setValue(settings.get("logo_scale", 0.12))
+        self.logo_opacity_spin.setValue(settings.get("logo_opacity", 1.0))
+
+    def browse_logo(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Select Logo Image", "", "Images (*.png *.jpg *.jpeg *.webp *.bmp)")
+        if path:
+            self.logo_edit.setText(path)
 
     def save_preset(self):
         name = self.name_edit.text()
@@ -79,6 +111,12 @@ class PresetsDialog(QDialog):
             "zoom_factor": self.zoom_spin.value(),
             "rotation_angle": self.rotate_spin.value(),
             "overlay_opacity": self.overlay_spin.value(),
+            "render_backend": self.backend_combo.currentText(),
+            "parallel_segments": self.segments_spin.value(),
+            "logo_path": self.logo_edit.text().strip() or None,
+            "logo_position": self.logo_position_combo.currentText(),
+            "logo_scale": self.logo_scale_spin.value(),
+            "logo_opacity": self.logo_opacity_spin.value(),
         }
         success, message = self.manager.save_preset(name, settings)
         if success:
@@ -103,4 +141,10 @@ class PresetsDialog(QDialog):
         self.flip_combo.setCurrentIndex(0)
         self.zoom_spin.setValue(1.0)
         self.rotate_spin.setValue(0.0)
-        self.overlay_spin.setValue(0.0)
\ No newline at end of file
+        self.overlay_spin.setValue(0.0)
+        self.backend_combo.setCurrentIndex(0)
+        self.segments_spin.setValue(1)
+        self.logo_edit.clear()
+        self.logo_position_combo.setCurrentText("Bottom Right")
+        self.logo_scale_spin.setValue(0.12)
+        self.logo_opacity_spin.setValue(1.0)
\ No newline at end of file
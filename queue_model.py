@@ -0,0 +1,298 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import os
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QComboBox, QStyledItemDelegate
+from preset_manager import NO_PRESET
+
+COLUMNS = ("Status", "Filename", "Editing Preset", "Upload To Channel", "Media")
+STATUS_COLUMN, FILENAME_COLUMN, PRESET_COLUMN, CHANNEL_COLUMN, MEDIA_COLUMN = range(len(COLUMNS))
+
+# Row colours by status; the first matching fragment wins.
+_STATUS_COLORS = (
+    ("Completed", QColor("#d4edda")),
+    ("Error", QColor("#f8d7da")),
+    ("Rendered", QColor("#d1ecf1")),
+    ("ing", QColor("#fff3cd")),
+)
+
+# How often buffered status and progress changes are pushed to the view.
+STATUS_FLUSH_MS = 100
+
+
+class QueueRecord:
+    """One queued job: everything a table row shows, without any widgets."""
+    __slots__ = ("job_id", "path", "name", "status", "progress", "preset_name", "token_file", "media")
+
+    def __init__(self, job_id: int, path: str, status: str = "Queued", preset_name: str = NO_PRESET,
+                 token_file: Optional[str] = None):
+        self.job_id, self.path, self.name = job_id, path, os.path.basename(path)
+        self.status, self.progress = status, None
+        self.preset_name, self.token_file = preset_name, token_file
+        self.media = None  # MediaInfo once the file has been probed
+
+
+def status_color(status: str) -> Optional[QColor]:
+    for fragment, color in _STATUS_COLORS:
+        if fragment in status:
+            return color
+    return None
+
+
+class QueueTableModel(QAbstractTableModel):
+    """
+    Table model over a plain list of QueueRecord objects.
+
+    The view asks for the rows it paints, so a queue of tens of thousands of jobs costs a few
+    Python objects per row instead of two combo box widgets. Status and progress updates arrive
+    from the worker at a high rate; they are applied to the records at once but reported to the
+    view as one dataChanged per flush interval, covering only the rows that changed.
+
+    `on_selection_changed(job_id, preset_name=..., token_file=...)` is called when the user picks
+    a different preset or channel for a row.
+    """
+    def __init__(self, on_selection_changed: Optional[Callable[..., None]] = None, parent=None):
+        super().__init__(parent)
+        self.on_selection_changed = on_selection_changed
+        self._records: List[QueueRecord] = []
+        self._presets: List[str] = [NO_PRESET]
+        self._accounts: List[Tuple[str, str]] = []  # (name, token_file)
+        self._account_names: Dict[str, str] = {}
+        self._dirty_rows = set()
+        self._media_changed = False
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(STATUS_FLUSH_MS)
+        self._flush_timer.timeout.connect(self.flush)
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record, column = self._records[index.row()], index.column()
+        if role == Qt.DisplayRole:
+            if column == STATUS_COLUMN:
+                return record.status if record.progress is None else f"{record.status} {record.progress}%"
+            if column == FILENAME_COLUMN:
+                return record.name
+            if column == PRESET_COLUMN:
+                return record.preset_name
+            if column == CHANNEL_COLUMN:
+                return self._account_names.get(record.token_file, "")
+            if column == MEDIA_COLUMN:
+                return record.media.summary() if record.media else ""
+        elif role == Qt.EditRole:
+            if column == PRESET_COLUMN:
+                return record.preset_name
+            if column == CHANNEL_COLUMN:
+                return record.token_file
+        elif role == Qt.BackgroundRole:
+            return status_color(record.status)
+        elif role == Qt.ToolTipRole and column == FILENAME_COLUMN:
+            return record.path
+        elif role == Qt.ToolTipRole and column == MEDIA_COLUMN and record.media:
+            media = record.media
+            if media.problem():
+                return f"Invalid input: {media.problem()}"
+            return (f"{media.format_name or 'unknown container'}, {media.fps:.2f} fps, "
+                    f"{media.bitrate // 1000} kb/s, {media.size / 1024 ** 2:.1f} MB")
+        elif role == Qt.UserRole and column == FILENAME_COLUMN:
+            return record.path
+        elif role == Qt.UserRole + 1 and column == FILENAME_COLUMN:
+            return record.job_id
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() in (PRESET_COLUMN, CHANNEL_COLUMN):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole or value is None:
+            return False
+        record, column = self._records[index.row()], index.column()
+        if column == PRESET_COLUMN and value != record.preset_name:
+            record.preset_name = value
+            if self.on_selection_changed: self.on_selection_changed(record.job_id, preset_name=value)
+        elif column == CHANNEL_COLUMN and value != record.token_file:
+            record.token_file = value
+            if self.on_selection_changed: self.on_selection_changed(record.job_id, token_file=value)
+        else:
+            return False
+        self.dataChanged.emit(index, index, [role, Qt.DisplayRole])
+        return True
+
+    # --- Records ---
+    def record(self, row: int) -> QueueRecord:
+        return self._records[row]
+
+    def records(self) -> List[QueueRecord]:
+        return self._records
+
+    def append_records(self, records: Sequence[QueueRecord]):
+        """Adds all records with a single insert notification."""
+        if not records:
+            return
+        # A preset or channel that no longer exists shows the default, like an unmatched combo box did.
+        # The replacement is written through, so the job runs with what its row shows.
+        presets = set(self._presets)
+        default_token_file = self.default_token_file()
+        for record in records:
+            changes = {}
+            if record.preset_name not in presets:
+                record.preset_name = changes['preset_name'] = NO_PRESET
+            if record.token_file not in self._account_names and record.token_file != default_token_file:
+                record.token_file = default_token_file
+                if default_token_file is not None:
+                    changes['token_file'] = default_token_file
+            if changes and self.on_selection_changed:
+                self.on_selection_changed(record.job_id, **changes)
+        first = len(self._records)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        self._records.extend(records)
+        self.endInsertRows()
+
+    def remove_rows(self, rows: Iterable[int]) -> List[QueueRecord]:
+        """Removes the given rows, one notification per contiguous run. Returns the removed records."""
+        removed = []
+        rows = sorted(set(rows), reverse=True)
+        position = 0
+        while position < len(rows):
+            last = first = rows[position]
+            position += 1
+            while position < len(rows) and rows[position] == first - 1:
+                first = rows[position]
+                position += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            removed[:0] = self._records[first:last + 1]
+            del self._records[first:last + 1]
+            self.endRemoveRows()
+        self._dirty_rows.clear()
+        return removed
+
+    def clear(self):
+        self.beginResetModel()
+        self._records.clear()
+        self._dirty_rows.clear()
+        self.endResetModel()
+
+    # --- Batched status updates ---
+    def set_status(self, row: int, status: str):
+        record = self._records[row]
+        record.status, record.progress = status, None
+        self._mark_dirty(row)
+
+    def set_progress(self, row: int, value: int):
+        self._records[row].progress = value
+        self._mark_dirty(row)
+
+    def set_media(self, record: QueueRecord, info):
+        """
+        Attaches a probe result (media_probe.MediaInfo) to a record, which may not be in the table
+        yet. Queued inputs that cannot be processed are marked as errors right away.
+        """
+        record.media = info
+        if info is not None and info.problem() and record.status == "Queued":
+            record.status = "Error (invalid input)"
+        self._media_changed = True
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _mark_dirty(self, row: int):
+        self._dirty_rows.add(row)
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        """Reports buffered status changes, one dataChanged per run of adjacent changed rows."""
+        if self._media_changed and self._records:
+            # Probe results arrive for rows all over the table; the view only repaints the visible ones.
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._records) - 1, len(COLUMNS) - 1),
+                                  [Qt.DisplayRole, Qt.BackgroundRole, Qt.ToolTipRole])
+            self._dirty_rows.clear()
+        self._media_changed = False
+        rows = sorted(row for row in self._dirty_rows if row < len(self._records))
+        self._dirty_rows.clear()
+        last_column = len(COLUMNS) - 1
+        start = previous = None
+        for row in rows + [None]:
+            if start is not None and (row is None or row != previous + 1):
+                self.dataChanged.emit(self.index(start, 0), self.index(previous, last_column),
+                                      [Qt.DisplayRole, Qt.BackgroundRole])
+                start = None
+            if start is None:
+                start = row
+            previous = row
+
+    # --- Choices for the editable columns ---
+    def preset_choices(self) -> List[Tuple[str, str]]:
+        return [(name, name) for name in self._presets]
+
+    def channel_choices(self) -> List[Tuple[str, str]]:
+        return list(self._accounts)
+
+    def default_token_file(self) -> Optional[str]:
+        return self._accounts[0][1] if self._accounts else None
+
+    def set_presets(self, names: Sequence[str]):
+        """Replaces the preset list; rows whose preset no longer exists fall back to NO_PRESET."""
+        self._presets = [NO_PRESET] + [name for name in names if name != NO_PRESET]
+        self._reset_missing(PRESET_COLUMN, set(self._presets), NO_PRESET, "preset_name")
+
+    def set_accounts(self, accounts: Sequence[Dict]):
+        """Replaces the channel list; rows whose channel was removed move to the first channel."""
+        self._accounts = [(account['name'], account['token_file']) for account in accounts]
+        self._account_names = {token_file: name for name, token_file in self._accounts}
+        self._reset_missing(CHANNEL_COLUMN, set(self._account_names), self.default_token_file(), "token_file")
+
+    def _reset_missing(self, column: int, valid: set, fallback, attribute: str):
+        for record in self._records:
+            if getattr(record, attribute) not in valid and getattr(record, attribute) != fallback:
+                setattr(record, attribute, fallback)
+                if self.on_selection_changed and fallback is not None:
+                    self.on_selection_changed(record.job_id, **{attribute: fallback})
+        if self._records:
+            self.dataChanged.emit(self.index(0, column), self.index(len(self._records) - 1, column))
+
+
+class ComboDelegate(QStyledItemDelegate):
+    """
+    Edits a cell with a combo box that exists only while the cell is being edited.
+
+    `choices()` returns (label, value) pairs; the value is what the model stores.
+    """
+    def __init__(self, choices: Callable[[], List[Tuple[str, str]]], parent=None):
+        super().__init__(parent)
+        self.choices = choices
+
+    def createEditor(self, parent, option, index):
+        combo = QComboBox(parent)
+        for label, value in self.choices():
+            combo.addItem(label, value)
+        # Commit as soon as an entry is picked instead of waiting for the editor to lose focus.
+        combo.activated.connect(lambda _: (self.commitData.emit(combo), self.closeEditor.emit(combo)))
+        return combo
+
+    def setEditorData(self, editor, index):
+        position = editor.findData(index.data(Qt.EditRole))
+        if position != -1:
+            editor.setCurrentIndex(position)
+
+    def setModelData(self, editor, model, index):
+        if editor.currentIndex() != -1:
+            model.setData(index, editor.currentData(), Qt.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect)
@@ -0,0 +1,148 @@
+from typing import Dict, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import tempfile
+import threading
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # No tz database available (e.g. Windows without tzdata): fall back to standard Pacific time.
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+UPLOAD_COST = 1600           # Units charged for one videos.insert call.
+DEFAULT_DAILY_LIMIT = 10000  # Default quota for a new Google Cloud project.
+
+# Error reasons that mean "stop for today" rather than "this upload is broken".
+QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded", "uploadLimitExceeded", "userRateLimitExceeded"}
+
+
+class QuotaExceededError(Exception):
+    """Raised when an upload has to wait for the next quota window instead of failing."""
+    def __init__(self, project: str, retry_at: datetime, message: Optional[str] = None):
+        super().__init__(message or f"YouTube API quota exhausted for project {project}; retrying after "
+                                    f"{retry_at.astimezone().strftime('%d/%m/%Y %H:%M')}.")
+        self.project, self.retry_at = project, retry_at
+
+
+def is_quota_error(status: Optional[int], body: bytes) -> bool:
+    """Tells quota/limit rejections (HTTP 403/429 with a quota reason) apart from other failures."""
+    if status not in (403, 429):
+        return False
+    try:
+        error = json.loads(body.decode("utf-8")).get("error", {})
+    except (ValueError, UnicodeDecodeError, AttributeError):
+        return False
+    reasons = {item.get("reason") for item in error.get("errors", []) if isinstance(item, dict)}
+    return bool(reasons & QUOTA_REASONS)
+
+
+class QuotaTracker:
+    """
+    Tracks YouTube Data API units spent per client project and per quota day.
+
+    Quota days start at midnight Pacific time, like Google's own reset. Usage is persisted so that a
+    restart during the day still knows how much has been spent. Units are reserved before an upload
+    session is opened; a project that the server reports as exhausted is marked as used up until the
+    next window.
+    """
+    QUOTA_FILE = 'quota.json'
+
+    def __init__(self, path: Optional[str] = None, daily_limit: int = DEFAULT_DAILY_LIMIT,
+                 project_limits: Optional[Dict[str, int]] = None):
+        self.path = path or self.QUOTA_FILE
+        self.daily_limit = daily_limit
+        self.project_limits = dict(project_limits or {})
+        self._lock = threading.Lock()
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._load()
+
+    # --- Windows ---
+    @staticmethod
+    def window_key(now: Optional[datetime] = None) -> str:
+        now = now or datetime.now(timezone.utc)
+        return now.astimezone(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+    @staticmethod
+    def next_window_start(now: Optional[datetime] = None) -> datetime:
+        now = (now or datetime.now(timezone.utc)).astimezone(QUOTA_TIMEZONE)
+        midnight = datetime(now.year, now.month, now.day, tzinfo=QUOTA_TIMEZONE) + timedelta(days=1)
+        # A couple of minutes of slack: Google's reset is not instantaneous.
+        return (midnight + timedelta(minutes=2)).astimezone(timezone.utc)
+
+    # --- Persistence ---
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._usage = json.load(f)
+            except (OSError, ValueError):
+                self._usage = {}
+        today = self.window_key()
+        # Older days are irrelevant once their window has passed.
+        self._usage = {project: {day: used for day, used in days.items() if day >= today}
+                       for project, days in self._usage.items()}
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.quota_', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._usage, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    # --- Accounting ---
+    def limit_for(self, project: str) -> int:
+        return self.project_limits.get(project, self.daily_limit)
+
+    def used(self, project: str) -> int:
+        with self._lock:
+            return self._usage.get(project, {}).get(self.window_key(), 0)
+
+    def remaining(self, project: str) -> int:
+        return max(0, self.limit_for(project) - self.used(project))
+
+    def try_reserve(self, project: str, cost: int = UPLOAD_COST) -> bool:
+        """Books `cost` units for today if they are available."""
+        with self._lock:
+            day = self.window_key()
+            used = self._usage.get(project, {}).get(day, 0)
+            if used + cost > self.limit_for(project):
+                return False
+            self._usage.setdefault(project, {})[day] = used + cost
+            self._save()
+            return True
+
+    def release(self, project: str, cost: int = UPLOAD_COST):
+        """Returns units reserved for a call that never reached the API."""
+        with self._lock:
+            day = self.window_key()
+            days = self._usage.setdefault(project, {})
+            days[day] = max(0, days.get(day, 0) - cost)
+            self._save()
+
+    def mark_exhausted(self, project: str):
+        """Records that the server rejected a call for quota, whatever our own count says."""
+        with self._lock:
+            self._usage.setdefault(project, {})[self.window_key()] = self.limit_for(project)
+            self._save()
+
+    def uploads_remaining(self, project: str, cost: int = UPLOAD_COST) -> int:
+        return self.remaining(project) // cost
+
+    def predict(self, project: str, pending_uploads: int, cost: int = UPLOAD_COST) -> Tuple[int, int]:
+        """Splits `pending_uploads` into (fit in today's window, deferred to the next one)."""
+        fit = min(pending_uploads, self.uploads_remaining(project, cost))
+        return fit, pending_uploads - fit
+
+    def summary(self, projects=None) -> str:
+        projects = list(projects) if projects is not None else list(self._usage)
+        if not projects:
+            return f"Quota: {self.daily_limit} units/day ({self.daily_limit // UPLOAD_COST} uploads), nothing used yet."
+        parts = []
+        for project in projects:
+            label = project.split('-')[0][:12] if project else "unknown"
+            parts.append(f"{label}: {self.uploads_remaining(project)} uploads left "
+                         f"({self.remaining(project)}/{self.limit_for(project)} units)")
+        return "Quota today - " + "; ".join(parts)
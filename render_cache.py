@@ -0,0 +1,241 @@
+"""
+Content-addressed cache of rendered videos.
+
+A render is identified by a fingerprint of its input file combined with a canonical hash of the
+VideoConfig that produced it, so the same source rendered with the same settings (for another
+channel, or in a re-run session) is reused instead of rendered again.
+
+    python render_cache.py stats
+    python render_cache.py list
+    python render_cache.py purge [--older-than DAYS] [--max-size GB]
+"""
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from config import VideoConfig
+
+SAMPLE_BLOCKS = 8
+SAMPLE_BLOCK_SIZE = 64 * 1024
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3  # 20 GiB
+
+# Fields that are file paths: their content, not their name, decides the output.
+_PATH_FIELDS = ("logo_path", "audio_path")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    source TEXT,
+    created_at TEXT NOT NULL,
+    last_used TEXT NOT NULL
+);
+"""
+
+
+def fingerprint_file(path: str, samples: int = SAMPLE_BLOCKS, block_size: int = SAMPLE_BLOCK_SIZE,
+                     include_mtime: bool = True) -> str:
+    """
+    Fast identity of a media file: size, mtime and a hash of `samples` blocks spread over the file.
+
+    Reading a few blocks instead of the whole file keeps this cheap for multi-gigabyte sources,
+    while still telling apart files that were re-exported under the same name. Without the mtime
+    the fingerprint survives copies that do not preserve timestamps.
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns if include_mtime else ''}".encode())
+    with open(path, "rb") as f:
+        if stat.st_size <= samples * block_size:
+            digest.update(f.read())
+        else:
+            step = (stat.st_size - block_size) // (samples - 1)
+            for index in range(samples):
+                f.seek(index * step)
+                digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+def config_digest(video_config: VideoConfig) -> str:
+    """Canonical hash of a VideoConfig; referenced files contribute their fingerprint, not their path."""
+    settings = asdict(video_config)
+    for field in _PATH_FIELDS:
+        path = settings.get(field)
+        if path:
+            settings[field] = fingerprint_file(path) if os.path.exists(path) else f"missing:{path}"
+    # Fields that do not affect the output are dropped, so e.g. "Keep Original" with no audio file
+    # and one with a stale audio path share a key.
+    if settings.get("audio_mode") != "Replace":
+        settings["audio_path"] = None
+    canonical = json.dumps(settings, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def short_key(cache_key: str) -> str:
+    """A short, stable tag for output file names derived from a cache key."""
+    return hashlib.blake2b(cache_key.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _link_or_copy(source: str, target: str):
+    """Hardlinks when source and target share a filesystem, which costs no extra space; copies otherwise."""
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class RenderCache:
+    """
+    Size-bounded LRU store of rendered outputs, indexed in SQLite.
+
+    Entries live in `cache_dir` as <key>.mp4. Whenever the total exceeds `max_bytes`, the least
+    recently used entries are removed.
+    """
+    CACHE_DIR = 'render_cache'
+    INDEX_FILE = 'index.db'
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or self.CACHE_DIR
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(self.cache_dir, self.INDEX_FILE), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(_SCHEMA)
+        self.hits = self.misses = 0
+
+    def key_for(self, input_path: str, video_config: VideoConfig) -> str:
+        return f"{fingerprint_file(input_path)}-{config_digest(video_config)}"
+
+    def _entry_path(self, file_name: str) -> str:
+        return os.path.join(self.cache_dir, file_name)
+
+    def lookup(self, cache_key: str) -> Optional[str]:
+        """Returns the cached file for `cache_key`, or None. A hit counts as a use for LRU purposes."""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT file_name FROM entries WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row and os.path.exists(self._entry_path(row['file_name'])):
+                self._conn.execute("UPDATE entries SET last_used = ? WHERE cache_key = ?", (_now(), cache_key))
+                self.hits += 1
+                return self._entry_path(row['file_name'])
+            if row:
+                # The file was deleted behind our back.
+                self._conn.execute("DELETE FROM entries WHERE cache_key = ?", (cache_key,))
+            self.misses += 1
+            return None
+
+    def materialize(self, cache_key: str, output_path: str) -> bool:
+        """Places the cached render for `cache_key` at `output_path`. Returns False on a miss."""
+        cached = self.lookup(cache_key)
+        if not cached:
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        if os.path.abspath(cached) != os.path.abspath(output_path):
+            _link_or_copy(cached, output_path)
+        return True
+
+    def store(self, cache_key: str, rendered_path: str, source: Optional[str] = None):
+        """Adds a finished render to the cache and evicts old entries if the cache is over its limit."""
+        file_name = f"{cache_key}.mp4"
+        _link_or_copy(rendered_path, self._entry_path(file_name))
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (cache_key, file_name, size, source, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, file_name, os.path.getsize(rendered_path), source, now, now)
+            )
+        self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Removes least recently used entries until the cache fits `max_bytes`. Returns the bytes freed."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        freed = 0
+        with self._lock, self._conn:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            for row in self._conn.execute("SELECT cache_key, file_name, size FROM entries ORDER BY last_used").fetchall():
+                if total <= limit:
+                    break
+                self._remove(row)
+                total -= row['size']
+                freed += row['size']
+        return freed
+
+    def purge(self, older_than_days: Optional[float] = None) -> int:
+        """Removes every entry, or only those unused for `older_than_days`. Returns the number removed."""
+        with self._lock, self._conn:
+            if older_than_days is None:
+                rows = self._conn.execute("SELECT cache_key, file_name, size FROM entries").fetchall()
+            else:
+                cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat(timespec='seconds')
+                rows = self._conn.execute("SELECT cache_key, file_name, size FROM entries WHERE last_used < ?",
+                                          (cutoff,)).fetchall()
+            for row in rows:
+                self._remove(row)
+        return len(rows)
+
+    def _remove(self, row):
+        path = self._entry_path(row['file_name'])
+        if os.path.exists(path):
+            os.remove(path)
+        self._conn.execute("DELETE FROM entries WHERE cache_key = ?", (row['cache_key'],))
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute("SELECT * FROM entries ORDER BY last_used DESC")]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'entries': count, 'bytes': total, 'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or purge the render cache.")
+    parser.add_argument("--cache-dir", default=RenderCache.CACHE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show the number of entries and total size.")
+    subparsers.add_parser("list", help="List entries, most recently used first.")
+    purge_parser = subparsers.add_parser("purge", help="Remove entries.")
+    purge_parser.add_argument("--older-than", type=float, metavar="DAYS", help="Only remove entries unused for this many days.")
+    purge_parser.add_argument("--max-size", type=float, metavar="GB", help="Evict least recently used entries down to this size.")
+    args = parser.parse_args()
+
+    cache = RenderCache(args.cache_dir)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"{stats['entries']} entries, {_format_size(stats['bytes'])} in {os.path.abspath(cache.cache_dir)}")
+    elif args.command == "list":
+        for entry in cache.entries():
+            print(f"{entry['last_used']}  {_format_size(entry['size']):>10}  {entry['cache_key'][:16]}  {entry['source'] or ''}")
+    elif args.max_size is not None:
+        freed = cache.evict(int(args.max_size * 1024 ** 3))
+        print(f"Freed {_format_size(freed)}.")
+    else:
+        print(f"Removed {cache.purge(args.older_than)} entries.")
+    cache.close()
@@ -0,0 +1,206 @@
+from typing import Callable, Dict, Optional
+from collections import deque
+import multiprocessing
+import os
+import queue
+import time
+from config import VideoConfig
+from memory_budget import RenderMemoryModel, apply_memory_limit, default_memory_budget, format_bytes, peak_rss
+
+
+def default_render_workers() -> int:
+    # Both backends already use a few encoder threads each, so half the cores is a sensible start.
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def _render_context():
+    """
+    Renders run in a fresh interpreter, never a fork of the GUI process with its Qt and network state.
+
+    Where the platform has it, that interpreter is a forkserver which imports the main module and
+    the render stack (moviepy, numpy, Pillow) once; each render is forked from it already warm
+    instead of importing everything again. Elsewhere every render is spawned.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        # "__main__" stays first so children do not re-run the main script on start-up.
+        ctx.set_forkserver_preload(["__main__", "video_processor"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _render_entry(task_id: int, input_path: str, output_path: str, video_config: VideoConfig,
+                  events, cancel_event, memory_limit: Optional[int] = None) -> None:
+    """Child-process entry point: renders one task and reports back through the event queue."""
+    if memory_limit:
+        apply_memory_limit(memory_limit)
+    last_reported = [-1]
+    def report_progress(value: float):
+        value = int(value)
+        if value != last_reported[0]:
+            last_reported[0] = value
+            events.put(("progress", task_id, value))
+
+    try:
+        # Imported in the child only, so the parent never loads moviepy for pooled renders.
+        from video_processor import VideoProcessor
+        ok, msg = VideoProcessor().process_video(
+            input_path, output_path, video_config, False, report_progress, cancel_event.is_set
+        )
+    except MemoryError:
+        ok, msg = False, f"Render exceeded its memory limit of {format_bytes(memory_limit)}." if memory_limit \
+            else "Video processing error: out of memory."
+    except Exception as e:
+        ok, msg = False, f"Video processing error: {e}"
+    peak = peak_rss()
+    if peak is not None:
+        events.put(("memory", task_id, peak))
+    events.put(("done", task_id, ok, msg))
+
+
+class RenderPool:
+    """
+    Renders tasks in separate processes, at most `max_workers` at a time.
+
+    Each task gets its own child process rather than a long-lived executor worker, so a
+    cancelled or hung render can be terminated without tearing down the whole pool.
+
+    `memory_limit` is a hard ceiling for each render process. A task is only started while the
+    expected peaks of the running renders plus its own fit in `memory_budget`; the expectation
+    comes from the peak memory earlier renders reported (see RenderMemoryModel). One render
+    always runs, however large.
+    """
+    def __init__(self, max_workers: Optional[int] = None, cancel_grace: float = 5.0,
+                 memory_limit: Optional[int] = None, memory_budget: Optional[int] = None):
+        self.max_workers = max(1, max_workers or default_render_workers())
+        self.cancel_grace = cancel_grace
+        self.memory_limit = memory_limit or None
+        self.memory_budget = memory_budget or default_memory_budget()
+        self.memory_model = RenderMemoryModel()
+        self._ctx = _render_context()
+        self._events = self._ctx.Queue()
+        self._cancel_event = self._ctx.Event()
+        self._pending = deque()
+        self._running: Dict[int, multiprocessing.Process] = {}
+        self._reserved: Dict[int, int] = {}
+        self._configs: Dict[int, VideoConfig] = {}
+        self._cancelled_at: Optional[float] = None
+
+    def submit(self, task_id: int, input_path: str, output_path: str, video_config: VideoConfig):
+        self._pending.append((task_id, input_path, output_path, video_config))
+
+    def has_work(self) -> bool:
+        return bool(self._pending or self._running)
+
+    def running_count(self) -> int:
+        return len(self._running)
+
+    def reserved_memory(self) -> int:
+        return sum(self._reserved.values())
+
+    def _estimate(self, video_config: VideoConfig) -> int:
+        estimate = self.memory_model.estimate(video_config)
+        return min(estimate, self.memory_limit) if self.memory_limit else estimate
+
+    def _fits(self, estimate: int) -> bool:
+        if not self._running or not self.memory_budget:
+            return True
+        return self.reserved_memory() + estimate <= self.memory_budget
+
+    def cancel(self):
+        """Asks running renders to stop; they are terminated if they ignore the request."""
+        self._pending.clear()
+        self._cancel_event.set()
+        if self._cancelled_at is None:
+            self._cancelled_at = time.monotonic()
+
+    def poll(self,
+             on_started: Callable[[int], None],
+             on_progress: Callable[[int, int], None],
+             on_done: Callable[[int, bool, str], None],
+             timeout: float = 0.2,
+             on_memory: Optional[Callable[[int, int], None]] = None):
+        """
+        Starts pending tasks into free slots and dispatches child events to the callbacks.
+        `on_memory(task_id, peak_bytes)` receives each render's peak memory before its `on_done`.
+        Call repeatedly until `has_work()` returns False.
+        """
+        while self._pending and len(self._running) < self.max_workers and not self._cancel_event.is_set():
+            task_id, input_path, output_path, video_config = self._pending[0]
+            estimate = self._estimate(video_config)
+            if not self._fits(estimate):
+                break  # Waits for a running render to free its share; tasks keep their order.
+            self._pending.popleft()
+            proc = self._ctx.Process(
+                target=_render_entry,
+                args=(task_id, input_path, output_path, video_config, self._events, self._cancel_event,
+                      self.memory_limit),
+                daemon=True
+            )
+            proc.start()
+            self._running[task_id] = proc
+            self._reserved[task_id] = estimate
+            self._configs[task_id] = video_config
+            on_started(task_id)
+
+        try:
+            self._dispatch(self._events.get(timeout=timeout), on_progress, on_done, on_memory)
+        except queue.Empty:
+            pass
+        self._reap(on_progress, on_done, on_memory)
+
+    def _dispatch(self, event, on_progress: Callable[[int, int], None], on_done: Callable[[int, bool, str], None],
+                  on_memory: Optional[Callable[[int, int], None]] = None):
+        kind, task_id = event[0], event[1]
+        if kind == "progress":
+            on_progress(task_id, event[2])
+        elif kind == "memory":
+            video_config = self._configs.get(task_id)
+            if video_config is not None:
+                self.memory_model.record(video_config, event[2])
+            if on_memory: on_memory(task_id, event[2])
+        elif kind == "done":
+            proc = self._running.pop(task_id, None)
+            if proc is not None:
+                proc.join(timeout=1)
+            self._forget(task_id)
+            on_done(task_id, event[2], event[3])
+
+    def _forget(self, task_id: int):
+        self._reserved.pop(task_id, None)
+        self._configs.pop(task_id, None)
+
+    def _reap(self, on_progress: Callable[[int, int], None], on_done: Callable[[int, bool, str], None],
+              on_memory: Optional[Callable[[int, int], None]] = None):
+        if self._cancelled_at is not None and time.monotonic() - self._cancelled_at > self.cancel_grace:
+            for proc in self._running.values():
+                if proc.is_alive():
+                    proc.terminate()
+
+        if not any(not proc.is_alive() for proc in self._running.values()):
+            return
+        # A child may have queued its result just before exiting, so drain the queue before
+        # treating a dead process as a crash (OOM kill, segfault, terminate).
+        try:
+            while True:
+                self._dispatch(self._events.get_nowait(), on_progress, on_done, on_memory)
+        except queue.Empty:
+            pass
+        for task_id, proc in list(self._running.items()):
+            if not proc.is_alive():
+                del self._running[task_id]
+                self._forget(task_id)
+                if self._cancel_event.is_set():
+                    on_done(task_id, True, "Processing cancelled by user.")
+                else:
+                    on_done(task_id, False, f"Render process exited unexpectedly (code {proc.exitcode}).")
+
+    def shutdown(self):
+        self.cancel()
+        for proc in self._running.values():
+            if proc.is_alive():
+                proc.terminate()
+            proc.join(timeout=1)
+        self._running.clear()
+        self._reserved.clear()
+        self._configs.clear()
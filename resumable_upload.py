@@ -0,0 +1,344 @@
+from typing import Callable, Dict, Optional, Tuple
+import http.client
+import json
+import os
+import random
+import re
+import time
+from urllib.parse import urlencode, urlsplit
+
+UPLOAD_URL = "https://www.googleapis.com/upload/youtube/v3/videos"
+# The resumable protocol requires every chunk except the last to be a multiple of 256 KiB.
+CHUNK_ALIGNMENT = 256 * 1024
+DEFAULT_CHUNK_SIZE = 32 * CHUNK_ALIGNMENT  # 8 MiB
+
+RETRYABLE_STATUS = {500, 502, 503, 504}
+RETRYABLE_EXCEPTIONS = (OSError, http.client.HTTPException)
+
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d+)")
+
+
+class ResumableUploadError(Exception):
+    """A non-retryable response from the upload endpoint."""
+    def __init__(self, message: str, status: Optional[int] = None, body: bytes = b""):
+        super().__init__(message)
+        self.status, self.body = status, body
+
+
+class UploadCancelled(Exception):
+    pass
+
+
+class _SessionExpired(Exception):
+    pass
+
+
+class _TokenRejected(Exception):
+    """HTTP 401: the access token expired or was revoked."""
+    def __init__(self, body: bytes = b""):
+        super().__init__("access token rejected")
+        self.body = body
+
+
+def align_chunk_size(chunk_size: int) -> int:
+    return max(CHUNK_ALIGNMENT, chunk_size - chunk_size % CHUNK_ALIGNMENT)
+
+
+class ResumableUpload:
+    """
+    Client for the Google resumable upload protocol that can pick up after a process restart.
+
+    The session URI and the byte offset confirmed by the server are written to `session_store`
+    after every chunk, so a later run of the same upload (same `session_key`) queries the server
+    for its offset and continues from there instead of starting from byte zero.
+
+    `session_store` needs load_upload_session(key), save_upload_session(key, session_uri, offset, total)
+    and clear_upload_session(key); JobStore provides them.
+
+    `token_provider(force_refresh)` returns an access token. It is called with True after the
+    server rejected the previous token (HTTP 401) and must then fetch a new one, not return a cached one.
+    """
+    def __init__(self, file_path: str, metadata: Dict, token_provider: Callable[[bool], str],
+                 session_key: Optional[str] = None, session_store=None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, upload_url: str = UPLOAD_URL,
+                 part: str = "snippet,status", content_type: str = "video/*",
+                 max_retries: int = 8, backoff_base: float = 1.0, backoff_max: float = 64.0,
+                 timeout: float = 120.0, on_session_start: Optional[Callable[[], None]] = None):
+        self.file_path, self.metadata, self.token_provider = file_path, metadata, token_provider
+        self.session_key, self.session_store = session_key, session_store
+        self.chunk_size = align_chunk_size(chunk_size)
+        self.upload_url, self.part, self.content_type = upload_url, part, content_type
+        self.max_retries, self.backoff_base, self.backoff_max = max_retries, backoff_base, backoff_max
+        self.timeout = timeout
+        # Called before a new session is opened (the API call that costs quota); may raise to abort.
+        self.on_session_start = on_session_start
+        self._session_announced = False
+        self._token_rejected = False
+        # None while the length is unknown (see StreamingResumableUpload).
+        self.total_size: Optional[int] = os.path.getsize(file_path) if file_path else None
+        self.session_uri: Optional[str] = None
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._conn_netloc: Optional[str] = None
+
+    # --- HTTP plumbing ---
+    def _request(self, method: str, url: str, headers: Dict[str, str], body: bytes = b""
+                ) -> Tuple[int, Dict[str, str], bytes]:
+        parts = urlsplit(url)
+        if self._conn is None or self._conn_netloc != parts.netloc:
+            self._close_connection()
+            conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            self._conn, self._conn_netloc = conn_cls(parts.netloc, timeout=self.timeout), parts.netloc
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        try:
+            self._conn.request(method, path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            data = response.read()
+        except RETRYABLE_EXCEPTIONS:
+            self._close_connection()
+            raise
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn, self._conn_netloc = None, None
+
+    def _auth_headers(self) -> Dict[str, str]:
+        force_refresh, self._token_rejected = self._token_rejected, False
+        return {"Authorization": f"Bearer {self.token_provider(force_refresh)}"}
+
+    def _on_token_rejected(self, attempt: int, error: _TokenRejected):
+        # The next request asks the provider for a new token instead of resending the refused one.
+        if attempt >= self.max_retries:
+            raise ResumableUploadError(f"Upload rejected (HTTP 401): {error.body[:500].decode('utf-8', 'replace')}",
+                                       401, error.body)
+        self._token_rejected = True
+
+    def _sleep_backoff(self, attempt: int, cancel_check: Optional[Callable[[], bool]]):
+        if attempt >= self.max_retries:
+            raise ResumableUploadError(f"Upload failed after {self.max_retries} retries.")
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * (0.5 + random.random() / 2)
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline:
+            if cancel_check and cancel_check():
+                raise UploadCancelled()
+            time.sleep(min(0.2, max(0.0, deadline - time.monotonic())))
+
+    # --- Session state ---
+    def _persist(self, offset: int):
+        if self.session_store is not None and self.session_key:
+            self.session_store.save_upload_session(self.session_key, self.session_uri, offset, self.total_size)
+
+    def _forget_session(self):
+        self.session_uri = None
+        self._session_announced = False
+        if self.session_store is not None and self.session_key:
+            self.session_store.clear_upload_session(self.session_key)
+
+    def _start_session(self) -> str:
+        # Retries after a connection error reuse the announcement; only a genuinely new session counts again.
+        if self.on_session_start and not self._session_announced:
+            self.on_session_start()
+            self._session_announced = True
+        query = urlencode({"uploadType": "resumable", "part": self.part})
+        headers = dict(self._auth_headers())
+        headers.update({
+            "Content-Type": "application/json; charset=UTF-8",
+            "X-Upload-Content-Type": self.content_type,
+        })
+        if self.total_size is not None:
+            headers["X-Upload-Content-Length"] = str(self.total_size)
+        status, response_headers, body = self._request("POST", f"{self.upload_url}?{query}", headers,
+                                                       json.dumps(self.metadata).encode("utf-8"))
+        if status == 401:
+            raise _TokenRejected(body)
+        if status in RETRYABLE_STATUS:
+            raise http.client.HTTPException(f"Server error {status} while starting upload session")
+        if status != 200 or "location" not in response_headers:
+            raise ResumableUploadError(f"Could not start upload session (HTTP {status}).", status, body)
+        return response_headers["location"]
+
+    def _query_offset(self) -> Tuple[int, Optional[Dict]]:
+        """Asks the server how many bytes it holds. Returns (offset, final_response_or_None)."""
+        headers = dict(self._auth_headers())
+        total = "*" if self.total_size is None else self.total_size
+        headers.update({"Content-Length": "0", "Content-Range": f"bytes */{total}"})
+        status, response_headers, body = self._request("PUT", self.session_uri, headers)
+        return self._interpret(status, response_headers, body)
+
+    def _interpret(self, status: int, headers: Dict[str, str], body: bytes) -> Tuple[int, Optional[Dict]]:
+        if status in (200, 201):
+            return self.total_size or 0, json.loads(body.decode("utf-8") or "{}")
+        if status == 308:
+            match = _RANGE_RE.match(headers.get("range", ""))
+            return (int(match.group(2)) + 1 if match else 0), None
+        if status == 401:
+            raise _TokenRejected(body)
+        if status in (404, 410):
+            raise _SessionExpired()
+        if status in RETRYABLE_STATUS:
+            raise http.client.HTTPException(f"Server error {status}")
+        raise ResumableUploadError(f"Upload rejected (HTTP {status}): {body[:500].decode('utf-8', 'replace')}", status, body)
+
+    # --- Upload loop ---
+    def run(self, progress_callback: Optional[Callable[[float], None]] = None,
+            cancel_check: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        Uploads the file and returns the JSON resource from the final response.
+
+        Raises:
+            ResumableUploadError: On a non-retryable response or when retries are exhausted.
+            UploadCancelled: When `cancel_check` returns True; the session is kept for a later resume.
+        """
+        try:
+            return self._run(progress_callback, cancel_check)
+        finally:
+            self._close_connection()
+
+    def _run(self, progress_callback, cancel_check) -> Dict:
+        offset, attempt = 0, 0
+        saved = self.session_store.load_upload_session(self.session_key) \
+            if self.session_store is not None and self.session_key else None
+        if saved and saved.get("total") == self.total_size:
+            self.session_uri = saved["session_uri"]
+            needs_query = True
+        else:
+            needs_query = False
+
+        with open(self.file_path, "rb") as f:
+            while True:
+                if cancel_check and cancel_check():
+                    raise UploadCancelled()
+                try:
+                    if self.session_uri is None:
+                        self.session_uri, offset = self._start_session(), 0
+                        self._persist(offset)
+                    elif needs_query:
+                        offset, result = self._query_offset()
+                        needs_query = False
+                        if result is not None:
+                            self._forget_session()
+                            return result
+
+                    f.seek(offset)
+                    chunk = f.read(self.chunk_size)
+                    headers = dict(self._auth_headers())
+                    headers["Content-Length"] = str(len(chunk))
+                    headers["Content-Type"] = self.content_type
+                    if chunk:
+                        headers["Content-Range"] = f"bytes {offset}-{offset + len(chunk) - 1}/{self.total_size}"
+                    else:
+                        headers["Content-Range"] = f"bytes */{self.total_size}"
+                    status, response_headers, body = self._request("PUT", self.session_uri, headers, chunk)
+                    offset, result = self._interpret(status, response_headers, body)
+                except _TokenRejected as e:
+                    self._on_token_rejected(attempt, e)
+                    attempt += 1
+                    continue
+                except _SessionExpired:
+                    # The server forgot the session (it expires after about a week); start over. The
+                    # restart counts as a retry, so an endpoint that keeps answering 404 ends the upload.
+                    self._sleep_backoff(attempt, cancel_check)
+                    attempt += 1
+                    self._forget_session()
+                    continue
+                except RETRYABLE_EXCEPTIONS:
+                    self._sleep_backoff(attempt, cancel_check)
+                    attempt += 1
+                    # Part of the chunk may have arrived; find out exactly how much before resending.
+                    needs_query = self.session_uri is not None
+                    continue
+
+                attempt = 0
+                if result is not None:
+                    self._forget_session()
+                    if progress_callback: progress_callback(100)
+                    return result
+                self._persist(offset)
+                if progress_callback and self.total_size:
+                    progress_callback(offset / self.total_size * 100)
+
+
+class StreamingResumableUpload(ResumableUpload):
+    """
+    Resumable upload of a stream whose length is only known once it ends, such as encoder output.
+
+    Chunks are sent with an open-ended Content-Range ("bytes a-b/*") and the final one carries the
+    total. Bytes are kept only until the server confirms them, so a failed chunk can be resent
+    after a retry without replaying the stream. A stream cannot be replayed after a restart,
+    though, so no session is persisted and an expired session fails the upload.
+
+    `source` needs read(size) -> bytes returning b"" at the end; SpillBuffer provides it.
+    """
+    def __init__(self, source, metadata: Dict, token_provider: Callable[[bool], str], **kwargs):
+        kwargs.pop("session_key", None)
+        kwargs.pop("session_store", None)
+        super().__init__(None, metadata, token_provider, **kwargs)
+        self.source = source
+        self.bytes_sent = 0
+
+    def _run(self, progress_callback, cancel_check) -> Dict:
+        pending, pending_offset = bytearray(), 0  # Unconfirmed bytes, starting at pending_offset.
+        eof, attempt, needs_query = False, 0, False
+        while True:
+            if cancel_check and cancel_check():
+                raise UploadCancelled()
+            while not eof and len(pending) < self.chunk_size:
+                data = self.source.read(self.chunk_size - len(pending))
+                if data:
+                    pending += data
+                else:
+                    eof = True
+                    self.total_size = pending_offset + len(pending)
+            try:
+                if self.session_uri is None:
+                    if pending_offset:
+                        raise ResumableUploadError("Upload session was lost mid-stream and the stream cannot be replayed.")
+                    self.session_uri = self._start_session()
+                elif needs_query:
+                    offset, result = self._query_offset()
+                    needs_query = False
+                    if result is not None:
+                        return result
+                    if offset < pending_offset:
+                        raise ResumableUploadError("Server lost confirmed bytes mid-stream and the stream cannot be replayed.")
+                    del pending[:offset - pending_offset]
+                    pending_offset = offset
+                    continue  # Top the chunk up again before resending.
+
+                # Every chunk but the last is exactly chunk_size, which keeps it 256 KiB aligned.
+                chunk = bytes(pending[:self.chunk_size])
+                total = "*" if not eof else self.total_size
+                headers = dict(self._auth_headers())
+                headers["Content-Length"] = str(len(chunk))
+                headers["Content-Type"] = self.content_type
+                if chunk:
+                    headers["Content-Range"] = f"bytes {pending_offset}-{pending_offset + len(chunk) - 1}/{total}"
+                else:
+                    headers["Content-Range"] = f"bytes */{total}"
+                status, response_headers, body = self._request("PUT", self.session_uri, headers, chunk)
+                offset, result = self._interpret(status, response_headers, body)
+            except _TokenRejected as e:
+                self._on_token_rejected(attempt, e)
+                attempt += 1
+                continue
+            except _SessionExpired:
+                self._sleep_backoff(attempt, cancel_check)
+                attempt += 1
+                self.session_uri = None
+                continue
+            except RETRYABLE_EXCEPTIONS:
+                self._sleep_backoff(attempt, cancel_check)
+                attempt += 1
+                needs_query = self.session_uri is not None
+                continue
+
+            attempt = 0
+            if result is not None:
+                self.bytes_sent = self.total_size
+                if progress_callback: progress_callback(100)
+                return result
+            if offset < pending_offset:
+                raise ResumableUploadError("Server lost confirmed bytes mid-stream and the stream cannot be replayed.")
+            del pending[:offset - pending_offset]
+            pending_offset = self.bytes_sent = offset
@@ -0,0 +1,174 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional, Tuple
+import csv
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from config import VideoConfig
+from audio_cache import audio_cache
+from ffmpeg_backend import FFmpegRenderer, probe_media, _atempo_chain
+
+# Segments shorter than this are not worth the extra ffmpeg start-up and concat work.
+MIN_SEGMENT_SECONDS = 30.0
+
+# Share of the task progress bar for each phase.
+_SPLIT_SHARE, _ENCODE_SHARE = 5.0, 85.0
+
+
+def _concat_entry(path: str) -> str:
+    # The concat demuxer uses shell-like quoting; a quote inside the path is closed, escaped and reopened.
+    return "file '" + path.replace("'", "'\\''") + "'\n"
+
+
+class SegmentEncoder:
+    """
+    Renders one long video by splitting it into keyframe-aligned segments and encoding them in parallel.
+
+    1. The video track is stream-copied into N pieces with ffmpeg's segment muxer, which only
+       cuts on keyframes, so no frame is lost or duplicated at a boundary.
+    2. Each piece runs through the VideoConfig filter graph in its own ffmpeg process.
+    3. The encoded pieces are joined with the concat demuxer without re-encoding, and the audio
+       is processed once over the whole timeline (tempo change, replacement or removal) and muxed
+       in, so it cannot drift at segment boundaries.
+    """
+    def __init__(self, renderer: Optional[FFmpegRenderer] = None):
+        self.renderer = renderer or FFmpegRenderer()
+
+    def is_available(self) -> bool:
+        return self.renderer.is_available()
+
+    def segment_count(self, duration: float, requested: int) -> int:
+        return max(1, min(requested, int(duration // MIN_SEGMENT_SECONDS)))
+
+    def render(self, input_path: str, output_path: str, video_config: VideoConfig,
+               progress_callback: Optional[Callable[[float], None]] = None,
+               cancel_check: Optional[Callable[[], bool]] = None
+              ) -> Tuple[bool, str]:
+        """
+        Renders `input_path` with `video_config.parallel_segments` encoders.
+
+        Returns:
+            Tuple[bool, str]: A success flag and the output path or an error message.
+        """
+        ffmpeg_path = self.renderer.ffmpeg_path
+        if not ffmpeg_path:
+            return (False, "ffmpeg executable not found.")
+        try:
+            duration, size, has_audio = probe_media(input_path, ffmpeg_path)
+        except Exception as e:
+            return (False, f"Video probe error: {e}")
+        segments = self.segment_count(duration, video_config.parallel_segments)
+        if segments < 2:
+            return self.renderer.render(input_path, output_path, video_config, progress_callback, cancel_check)
+
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix=".segments_", dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            pieces, error = self._split(input_path, work_dir, duration / segments)
+            if error:
+                return (False, error)
+            if progress_callback: progress_callback(_SPLIT_SHARE)
+
+            encoded, error = self._encode_pieces(pieces, work_dir, video_config, size, progress_callback, cancel_check)
+            if error:
+                return (True, error) if error == "Processing cancelled by user." else (False, error)
+
+            output_duration = duration / video_config.speed if video_config.speed > 0 else duration
+            cmd = self._join_command(encoded, work_dir, input_path, output_path, video_config, has_audio, output_duration)
+            returncode, stderr_tail = self.renderer.run_with_progress(cmd, output_duration, None, cancel_check)
+            if returncode is None:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                return (True, "Processing cancelled by user.")
+            if returncode != 0:
+                return (False, f"Joining segments failed (ffmpeg exited with code {returncode}): {stderr_tail}")
+            if progress_callback: progress_callback(100)
+            return (True, output_path)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _split(self, input_path: str, work_dir: str, segment_time: float) -> Tuple[List[Tuple[str, float]], str]:
+        """Cuts the video track at the first keyframe after each multiple of `segment_time`."""
+        list_path = os.path.join(work_dir, "segments.csv")
+        cmd = [self.renderer.ffmpeg_path, "-hide_banner", "-nostdin", "-y", "-i", input_path,
+               "-map", "0:v:0", "-c", "copy", "-f", "segment", "-segment_time", f"{segment_time:.3f}",
+               "-reset_timestamps", "1", "-segment_list", list_path, "-segment_list_type", "csv",
+               os.path.join(work_dir, "source_%03d.mkv")]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+        if result.returncode != 0:
+            return [], f"Splitting into segments failed: {result.stderr.strip()[-2000:]}"
+        pieces = []
+        with open(list_path, newline="") as f:
+            for name, start, end in csv.reader(f):
+                pieces.append((os.path.join(work_dir, name), float(end) - float(start)))
+        return pieces, ""
+
+    def _encode_pieces(self, pieces: List[Tuple[str, float]], work_dir: str, video_config: VideoConfig,
+                       size: Tuple[int, int], progress_callback: Optional[Callable[[float], None]],
+                       cancel_check: Optional[Callable[[], bool]]) -> Tuple[List[str], str]:
+        # Audio is handled once for the whole video, so each piece is encoded silent.
+        video_only = replace(video_config, audio_mode="Remove")
+        total = sum(length for _, length in pieces) or 1.0
+        done: Dict[int, float] = {}
+        lock = threading.Lock()
+        failed = threading.Event()
+
+        def report(index: int, length: float, value: float):
+            with lock:
+                done[index] = length * value / 100
+                overall = _SPLIT_SHARE + _ENCODE_SHARE * sum(done.values()) / total
+            if progress_callback: progress_callback(min(overall, _SPLIT_SHARE + _ENCODE_SHARE))
+
+        def encode(index: int, source: str, length: float) -> Tuple[str, Optional[int], str]:
+            target = os.path.join(work_dir, f"encoded_{index:03d}.mp4")
+            output_length = length / video_config.speed if video_config.speed > 0 else length
+            cmd = self.renderer.build_command(source, target, video_only, size, False, output_length)
+            returncode, stderr_tail = self.renderer.run_with_progress(
+                cmd, output_length, lambda value: report(index, length, value),
+                lambda: failed.is_set() or bool(cancel_check and cancel_check())
+            )
+            if returncode != 0:
+                failed.set()  # No point finishing the other pieces.
+            return target, returncode, stderr_tail
+
+        with ThreadPoolExecutor(max_workers=max(1, min(len(pieces), video_config.parallel_segments))) as executor:
+            results = list(executor.map(lambda item: encode(item[0], *item[1]), enumerate(pieces)))
+
+        if cancel_check and cancel_check():
+            return [], "Processing cancelled by user."
+        for index, (_, returncode, stderr_tail) in enumerate(results):
+            if returncode not in (0, None):
+                return [], f"Encoding segment {index + 1}/{len(pieces)} failed (ffmpeg exited with code {returncode}): {stderr_tail}"
+        return [target for target, _, _ in results], ""
+
+    def _join_command(self, encoded: List[str], work_dir: str, input_path: str, output_path: str,
+                      video_config: VideoConfig, has_audio: bool, output_duration: float) -> List[str]:
+        concat_list = os.path.join(work_dir, "concat.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            f.writelines(_concat_entry(path) for path in encoded)
+
+        cmd = [self.renderer.ffmpeg_path, "-hide_banner", "-nostdin", "-y",
+               "-f", "concat", "-safe", "0", "-i", concat_list, "-i", input_path]
+        cmd_maps = ["-map", "0:v:0"]
+        audio_codec = "aac"
+        if video_config.audio_mode == "Replace" and video_config.audio_path:
+            track = audio_cache.track_for(video_config.audio_path, video_config.normalize_audio)
+            cmd += ["-stream_loop", "-1", "-i", track]
+            cmd_maps += ["-map", "2:a:0"]
+            if audio_cache.is_prepared(track):
+                audio_codec = "copy"
+        elif video_config.audio_mode == "Keep Original" and has_audio:
+            if video_config.speed != 1.0:
+                cmd += ["-filter_complex", f"[1:a]{','.join(_atempo_chain(video_config.speed))}[aout]"]
+                cmd_maps += ["-map", "[aout]"]
+            else:
+                cmd_maps += ["-map", "1:a:0"]
+        cmd += cmd_maps + ["-c:v", "copy"]
+        if len(cmd_maps) > 2:
+            cmd += ["-c:a", audio_codec]
+        cmd += ["-t", f"{output_duration:.3f}", "-movflags", "+faststart",
+                "-progress", "pipe:1", "-nostats", output_path]
+        return cmd
@@ -0,0 +1,142 @@
+from collections import deque
+from typing import Optional
+import tempfile
+import threading
+
+DEFAULT_MEMORY_LIMIT = 32 * 1024 * 1024    # 32 MiB held in RAM before spilling to disk
+DEFAULT_MAX_BUFFERED = 1024 * 1024 * 1024  # 1 GiB in total before the encoder is paused
+
+
+class BufferAborted(Exception):
+    """Raised to the writer once the reader has given up on the stream."""
+    pass
+
+
+class SpillBuffer:
+    """
+    Bounded FIFO byte pipe between an encoder thread (writer) and an uploader thread (reader).
+
+    Data is kept in memory up to `memory_limit`; anything beyond that goes to an anonymous
+    temporary file and is read back in order. Once `max_buffered` bytes are waiting, write()
+    blocks until the reader catches up, so a slow connection pauses the encoder instead of
+    filling the disk.
+    """
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT, max_buffered: int = DEFAULT_MAX_BUFFERED,
+                 spill_dir: Optional[str] = None):
+        self.memory_limit = memory_limit
+        self.max_buffered = max(memory_limit, max_buffered)
+        self.spill_dir = spill_dir
+        self._cond = threading.Condition()
+        self._memory = deque()
+        self._memory_size = 0
+        self._spill = None
+        self._spill_read = self._spill_write = 0
+        self._closed = False
+        self._aborted = False
+        self._error: Optional[BaseException] = None
+        self.bytes_written = 0
+        self.bytes_spilled = 0
+        self.peak_buffered = 0
+
+    @property
+    def buffered(self) -> int:
+        return self._memory_size + (self._spill_write - self._spill_read)
+
+    # --- Writer side ---
+    def write(self, data: bytes):
+        if not data:
+            return
+        with self._cond:
+            while self.buffered and self.buffered + len(data) > self.max_buffered and not self._aborted:
+                self._cond.wait()
+            if self._aborted:
+                raise BufferAborted()
+            # Memory is only used while nothing is waiting on disk, which keeps the byte order intact.
+            if self._spill_write == self._spill_read and self._memory_size + len(data) <= self.memory_limit:
+                self._memory.append(bytes(data))
+                self._memory_size += len(data)
+            else:
+                if self._spill is None:
+                    self._spill = tempfile.TemporaryFile(prefix='render_stream_', dir=self.spill_dir)
+                self._spill.seek(self._spill_write)
+                self._spill.write(data)
+                self._spill_write += len(data)
+                self.bytes_spilled += len(data)
+            self.bytes_written += len(data)
+            self.peak_buffered = max(self.peak_buffered, self.buffered)
+            self._cond.notify_all()
+
+    def close(self):
+        """Marks the end of the stream; the reader gets b"" once everything has been read."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def fail(self, error: BaseException):
+        """Ends the stream with an error that read() raises in the reader."""
+        with self._cond:
+            self._error, self._closed = error, True
+            self._cond.notify_all()
+
+    # --- Reader side ---
+    def read(self, size: int) -> bytes:
+        """Blocks until data is available and returns up to `size` bytes, or b"" at the end of the stream."""
+        with self._cond:
+            while not self.buffered and not self._closed:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+            if self._memory:
+                data = self._read_memory(size)
+            elif self._spill_write > self._spill_read:
+                data = self._read_spill(size)
+            else:
+                data = b""
+                self._release_spill()
+            self._cond.notify_all()
+            return data
+
+    def abort(self):
+        """Called by the reader when it stops early; pending and future writes raise BufferAborted."""
+        with self._cond:
+            self._aborted = True
+            self._memory.clear()
+            self._memory_size = 0
+            self._release_spill()
+            self._cond.notify_all()
+
+    def _read_memory(self, size: int) -> bytes:
+        parts, remaining = [], size
+        while self._memory and remaining > 0:
+            block = self._memory.popleft()
+            if len(block) > remaining:
+                self._memory.appendleft(block[remaining:])
+                block = block[:remaining]
+            parts.append(block)
+            remaining -= len(block)
+        data = b"".join(parts)
+        self._memory_size -= len(data)
+        return data
+
+    def _read_spill(self, size: int) -> bytes:
+        self._spill.seek(self._spill_read)
+        data = self._spill.read(min(size, self._spill_write - self._spill_read))
+        self._spill_read += len(data)
+        if self._spill_read == self._spill_write:
+            # Fully drained: rewind so the file does not keep growing over a long render.
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._spill_read = self._spill_write = 0
+        return data
+
+    def _release_spill(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._spill_read = self._spill_write = 0
+
+    def __del__(self):
+        try:
+            self._release_spill()
+        except Exception:
+            pass
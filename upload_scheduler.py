@@ -0,0 +1,106 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from collections import OrderedDict, deque
+import threading
+import time
+
+
+class UploadScheduler:
+    """
+    Runs uploads for several accounts in parallel with fair round-robin ordering.
+
+    At most `max_concurrent` uploads run in total and at most `per_account_limit` (or the
+    account's entry in `account_limits`) per account. Each free worker takes the next item from
+    the first account in the rotation that is under its cap, and that account then moves to the
+    back, so a channel with a hundred queued videos cannot starve the others.
+
+    Items submitted with `not_before` (a time.time() timestamp) stay queued until then, which is
+    how uploads are deferred to the next quota window.
+    """
+    def __init__(self, upload_fn: Callable[[Any], None], max_concurrent: int = 4, per_account_limit: int = 1,
+                 account_limits: Optional[Dict[Hashable, int]] = None):
+        self.upload_fn = upload_fn
+        self.max_concurrent = max(1, max_concurrent)
+        self.per_account_limit = max(1, per_account_limit)
+        self.account_limits = dict(account_limits or {})
+        self._queues: "OrderedDict[Hashable, deque]" = OrderedDict()
+        self._active: Dict[Hashable, int] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> "UploadScheduler":
+        for _ in range(self.max_concurrent):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, account: Hashable, item: Any, not_before: Optional[float] = None):
+        # Allowed after close() too, so a running upload can put itself back as deferred.
+        with self._cond:
+            self._queues.setdefault(account, deque()).append((not_before or 0.0, item))
+            self._cond.notify_all()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return sum(len(items) for items in self._queues.values())
+
+    def close(self):
+        """Workers exit once everything queued, including deferred items, has been uploaded."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self) -> List[Any]:
+        """Drops everything still queued and returns the dropped items; running uploads are left alone."""
+        with self._cond:
+            dropped = [item for items in self._queues.values() for _, item in items]
+            self._queues.clear()
+            self._closed = True
+            self._cond.notify_all()
+        return dropped
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _limit_for(self, account: Hashable) -> int:
+        return self.account_limits.get(account, self.per_account_limit)
+
+    def _next_item(self):
+        with self._cond:
+            while True:
+                now, next_due = time.time(), None
+                for account in list(self._queues):
+                    items = self._queues[account]
+                    if self._active.get(account, 0) >= self._limit_for(account):
+                        continue
+                    due = next((entry for entry in items if entry[0] <= now), None)
+                    if due is None:
+                        earliest = min(entry[0] for entry in items)
+                        next_due = earliest if next_due is None else min(next_due, earliest)
+                        continue
+                    items.remove(due)
+                    self._active[account] = self._active.get(account, 0) + 1
+                    # Served accounts go to the back of the rotation.
+                    self._queues.move_to_end(account)
+                    if not items:
+                        del self._queues[account]
+                    return account, due[1]
+                if self._closed and not self._queues:
+                    return None
+                self._cond.wait(None if next_due is None else max(0.05, next_due - now))
+
+    def _worker(self):
+        while True:
+            next_item = self._next_item()
+            if next_item is None:
+                return
+            account, item = next_item
+            try:
+                self.upload_fn(item)
+            finally:
+                with self._cond:
+                    self._active[account] -= 1
+                    # A slot for this account opened up; a waiting worker may now take its next item.
+                    self._cond.notify_all()
@@ -0,0 +1,191 @@
+"""
+Local stand-in for the YouTube resumable upload endpoint.
+
+Implements enough of the protocol (session start, chunked PUTs with Content-Range, 308 status
+queries) to exercise ResumableUpload without network access or quota. Faults can be injected to
+check that uploads retry and resume correctly.
+
+    python upload_stub_server.py --port 8765 --fail-every 5
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+
+UPLOAD_PATH = "/upload/youtube/v3/videos"
+SESSION_PREFIX = "/upload/session/"
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)")
+
+
+class _Session:
+    def __init__(self, total: Optional[int], metadata: Dict):
+        self.total, self.metadata = total, metadata
+        self.data = bytearray()
+        self.video_id: Optional[str] = None
+
+
+class StubUploadServer:
+    """
+    Threaded HTTP server speaking the resumable upload protocol.
+
+    Args:
+        fail_every: Answer every n-th chunk PUT with 503 (0 disables).
+        drop_every: Accept only half of every n-th chunk and then drop the connection (0 disables).
+        latency: Seconds added to every response.
+        bandwidth: Bytes per second at which request bodies are read (0 for unlimited).
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_every: int = 0, drop_every: int = 0,
+                 latency: float = 0.0, bandwidth: float = 0.0):
+        self.fail_every, self.drop_every = fail_every, drop_every
+        self.latency, self.bandwidth = latency, bandwidth
+        self.sessions: Dict[str, _Session] = {}
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._chunk_counter = itertools.count(1)
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def upload_url(self) -> str:
+        return self.base_url + UPLOAD_PATH
+
+    def start(self) -> "StubUploadServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def expire_session(self, session_id: str):
+        """Forgets a session so the next request for it gets 404, as after Google's one-week expiry."""
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, headers: Optional[Dict[str, str]] = None, body: bytes = b""):
+                if server.latency:
+                    time.sleep(server.latency)
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self, length: int) -> bytes:
+                if not server.bandwidth:
+                    return self.rfile.read(length)
+                received = bytearray()
+                block = max(1, int(server.bandwidth / 20))
+                while len(received) < length:
+                    received += self.rfile.read(min(block, length - len(received)))
+                    time.sleep(min(block, length) / server.bandwidth)
+                return bytes(received)
+
+            def do_POST(self):
+                if not self.path.startswith(UPLOAD_PATH) or "uploadType=resumable" not in self.path:
+                    return self._reply(404)
+                metadata = json.loads(self._read_body(int(self.headers.get("Content-Length", 0))) or b"{}")
+                total = self.headers.get("X-Upload-Content-Length")
+                session_id = str(next(server._ids))
+                with server.lock:
+                    server.sessions[session_id] = _Session(int(total) if total else None, metadata)
+                self._reply(200, {"Location": f"{server.base_url}{SESSION_PREFIX}{session_id}"})
+
+            def do_PUT(self):
+                session_id = self.path[len(SESSION_PREFIX):] if self.path.startswith(SESSION_PREFIX) else ""
+                length = int(self.headers.get("Content-Length", 0))
+                with server.lock:
+                    session = server.sessions.get(session_id)
+                if session is None:
+                    self._read_body(length)
+                    return self._reply(404)
+
+                match = _CONTENT_RANGE_RE.match(self.headers.get("Content-Range", ""))
+                if not match:
+                    self._read_body(length)
+                    return self._reply(400)
+                start, _, total = match.groups()
+                if total != "*":
+                    session.total = int(total)
+
+                if start is None:
+                    # Status query.
+                    return self._session_status(session, session_id)
+
+                chunk_number = next(server._chunk_counter)
+                if server.fail_every and chunk_number % server.fail_every == 0:
+                    self._read_body(length)
+                    return self._reply(503)
+                if server.drop_every and chunk_number % server.drop_every == 0:
+                    partial = self._read_body(length // 2)
+                    self._store(session, int(start), partial)
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+
+                self._store(session, int(start), self._read_body(length))
+                self._session_status(session, session_id)
+
+            def _store(self, session: _Session, start: int, data: bytes):
+                with server.lock:
+                    # Bytes before the confirmed offset were already received; ignore any overlap.
+                    if start <= len(session.data):
+                        session.data[start:] = data
+                        del session.data[start + len(data):]
+
+            def _session_status(self, session: _Session, session_id: str):
+                if session.total is not None and len(session.data) >= session.total:
+                    if session.video_id is None:
+                        session.video_id = f"stub{session_id}"
+                    body = json.dumps({"kind": "youtube#video", "id": session.video_id,
+                                       "snippet": session.metadata.get("snippet", {})}).encode("utf-8")
+                    return self._reply(200, {"Content-Type": "application/json"}, body)
+                headers = {"Range": f"bytes=0-{len(session.data) - 1}"} if session.data else {}
+                self._reply(308, headers)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the YouTube resumable upload endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every n-th chunk with 503.")
+    parser.add_argument("--drop-every", type=int, default=0, help="Drop the connection mid-way through every n-th chunk.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="Upload bandwidth limit in bytes per second.")
+    args = parser.parse_args()
+    stub = StubUploadServer(args.host, args.port, args.fail_every, args.drop_every, args.latency, args.bandwidth)
+    print(f"Stub upload endpoint listening on {stub.upload_url}")
+    try:
+        stub.start()._thread.join()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -1,50 +1,105 @@
 from typing import Callable, Optional, Tuple
-from moviepy.editor import VideoFileClip, AudioFileClip, vfx, ColorClip, CompositeVideoClip
+from moviepy.editor import VideoFileClip, AudioFileClip
+from moviepy.audio.fx.all import audio_loop
+from proglog import ProgressBarLogger
 import os
 from config import VideoConfig
+from audio_cache import audio_cache
+from ffmpeg_backend import FFmpegRenderer
+from effects import AffineWarp, ColorKernel, FramePool
+from logo_overlay import LogoOverlay
+from segment_encoder import SegmentEncoder
+
+class RenderCancelled(Exception):
+    """Raised from inside write_videofile when a cancel request arrives mid-render."""
+
+class _MoviePyProgressLogger(ProgressBarLogger):
+    """Maps MoviePy's frame counter onto the 50-100% range of the task progress."""
+    def __init__(self, progress_callback: Optional[Callable[[float], None]],
+                 cancel_check: Optional[Callable[[], bool]]):
+        super().__init__()
+        self.progress_callback, self.cancel_check = progress_callback, cancel_check
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if self.cancel_check and self.cancel_check():
+            raise RenderCancelled()
+        if bar == 't' and attr == 'index' and self.progress_callback:
+            total = self.bars[bar]['total']
+            if total:
+                self.progress_callback(50 + 50 * value / total)
 
 class VideoProcessor:
     def __init__(self):
-        # Processor is now fully stateless
-        pass
+        # Stateless apart from the resolved ffmpeg executable
+        self.ffmpeg_renderer = FFmpegRenderer()
+        self.segment_encoder = SegmentEncoder(self.ffmpeg_renderer)
 
     def process_video(self, input_path: str, output_path: str,
                       video_config: VideoConfig,
                       cancel_requested: bool,
-                      progress_callback: Optional[Callable[[float], None]] = None
+                      progress_callback: Optional[Callable[[float], None]] = None,
+                      cancel_check: Optional[Callable[[], bool]] = None
                      ) -> Tuple[bool, str]:
-        try:
-            if cancel_requested:
-                return (True, "Processing cancelled by user.")
+        """
+        Renders `input_path` into `output_path` with the backend selected in the VideoConfig.
+
+        `cancel_requested` is a snapshot taken before the render starts; `cancel_check` is
+        polled while rendering so a running render can be stopped.
+        """
+        if cancel_requested or (cancel_check and cancel_check()):
+            return (True, "Processing cancelled by user.")
+
+        # Configs that leave the picture alone only need the video track copied into the output.
+        if video_config.render_plan() != "render" and self.ffmpeg_renderer.is_available():
+            remux_ok, remux_msg = self.ffmpeg_renderer.remux(input_path, output_path, video_config, cancel_check)
+            if remux_ok:
+                if progress_callback and remux_msg == output_path: progress_callback(100)
+                return (remux_ok, remux_msg)
+            # Typically a source codec that MP4 cannot hold; a full render still works.
+
+        if video_config.render_backend == "FFmpeg" and self.ffmpeg_renderer.is_available():
+            render = self.segment_encoder.render if video_config.parallel_segments > 1 else self.ffmpeg_renderer.render
+            ffmpeg_ok, ffmpeg_msg = render(input_path, output_path, video_config, progress_callback, cancel_check)
+            if ffmpeg_ok:
+                return (ffmpeg_ok, ffmpeg_msg)
+            # Fall back to the MoviePy pipeline, keeping the ffmpeg error for the report.
+            moviepy_ok, moviepy_msg = self._process_with_moviepy(
+                input_path, output_path, video_config, progress_callback, cancel_check
+            )
+            if moviepy_ok:
+                return (moviepy_ok, moviepy_msg)
+            return (False, f"{ffmpeg_msg}; MoviePy fallback: {moviepy_msg}")
 
+        return self._process_with_moviepy(input_path, output_path, video_config, progress_callback, cancel_check)
+
+    def _process_with_moviepy(self, input_path: str, output_path: str,
+                              video_config: VideoConfig,
+                              progress_callback: Optional[Callable[[float], None]] = None,
+                              cancel_check: Optional[Callable[[], bool]] = None
+                             ) -> Tuple[bool, str]:
+        try:
             clip = VideoFileClip(input_path)
-            original_size = clip.size
             
             # 1. Apply Effects based on VideoConfig
-            if video_config.flip_mode == "Horizontal":
-                clip = clip.fx(vfx.mirror_x)
-            elif video_config.flip_mode == "Vertical":
-                clip = clip.fx(vfx.mirror_y)
-
-            if video_config.rotation_angle != 0:
-                clip = clip.rotate(video_config.rotation_angle)
-
-            if video_config.zoom_factor > 1.0:
-                zoom = video_config.zoom_factor
-                w, h = original_size
-                crop_w, crop_h = int(w / zoom), int(h / zoom)
-                clip = clip.fx(vfx.crop, width=crop_w, height=crop_h, x_center=w/2, y_center=h/2).resize(original_size)
-
-            if video_config.overlay_opacity > 0:
-                overlay = ColorClip(size=original_size, color=(0, 0, 0), duration=clip.duration)
-                overlay = overlay.set_opacity(video_config.overlay_opacity)
-                clip = CompositeVideoClip([clip, overlay])
+            # Flip, rotation and zoom are one precomputed affine warp, resampled once per frame.
+            geometry = AffineWarp(video_config, clip.size)
+            if not geometry.is_identity:
+                clip = clip.fl_image(geometry)
+
+            # Filters that need a writable frame copy it into one of a few reused buffers rather than
+            # allocating a new full-resolution array per frame.
+            frame_pool = FramePool()
+
+            # Brightness, contrast, saturation and the darkening overlay in one in-place uint8 pass.
+            color_kernel = ColorKernel.from_config(video_config, frame_pool)
+            if not color_kernel.is_identity:
+                clip = clip.fl_image(color_kernel)
+
+            if video_config.logo_path:
+                clip = clip.fl_image(LogoOverlay(video_config, clip.size, frame_pool=frame_pool))
             
             if video_config.speed != 1.0:
                 clip = clip.speedx(video_config.speed)
-
-            if video_config.brightness != 1.0:
-                clip = clip.fx(vfx.colorx, video_config.brightness)
             
        
 
@@ -55,18 +110,25 @@ class VideoProcessor:
                 clip = clip.without_audio()
             elif video_config.audio_mode == "Replace" and video_config.audio_path:
                 try:
-                    audio_clip = AudioFileClip(video_config.audio_path)
-                    clip = clip.set_audio(audio_clip.set_duration(clip.duration))
+                    audio_clip = AudioFileClip(audio_cache.track_for(video_config.audio_path, video_config.normalize_audio))
+                    clip = clip.set_audio(audio_loop(audio_clip, duration=clip.duration))
                 except Exception as e:
                     clip.close()
                     return (False, f"Audio replacement failed: {e}")
             
-            if cancel_requested:
+            if cancel_check and cancel_check():
                 clip.close()
                 return (True, "Processing cancelled during transformation.")
 
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            clip.write_videofile(output_path, codec="libx264", audio_codec="aac", logger=None)
+            try:
+                clip.write_videofile(output_path, codec="libx264", audio_codec="aac",
+                                     logger=_MoviePyProgressLogger(progress_callback, cancel_check))
+            except RenderCancelled:
+                clip.close()
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                return (True, "Processing cancelled by user.")
             clip.close()
 
             if progress_callback: progress_callback(100)
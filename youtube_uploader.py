@@ -1,21 +1,149 @@
-from typing import Optional, Callable, Tuple
+from typing import Dict, Optional, Callable, Tuple
+from collections import OrderedDict
 import os
 import pickle
-from datetime import datetime
+import tempfile
+import threading
+from datetime import datetime, timedelta
 
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from discovery_cache import discovery_cache
+from resumable_upload import (ResumableUpload, StreamingResumableUpload, ResumableUploadError, UploadCancelled,
+                              DEFAULT_CHUNK_SIZE, UPLOAD_URL)
+from quota_tracker import QuotaExceededError, QuotaTracker, UPLOAD_COST, is_quota_error
+
+class CredentialCache:
+    """
+    Thread-safe LRU cache of credentials and built YouTube service objects, keyed by token file.
+    The service object is only built for callers that ask for it; uploads need just the credentials.
+
+    Credentials are refreshed only when they are within `refresh_margin` seconds of expiry, and the
+    token file is rewritten (atomically) only when the pickled credentials actually changed. An entry
+    is reloaded when its token file is modified on disk, e.g. after re-linking the account.
+    """
+    def __init__(self, max_entries: int = 32, refresh_margin: float = 300.0):
+        self.max_entries, self.refresh_margin = max_entries, refresh_margin
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._token_locks: Dict[str, threading.Lock] = {}
+        self.hits = self.misses = self.refreshes = self.token_writes = 0
+
+    def _token_lock(self, token_file: str) -> threading.Lock:
+        with self._lock:
+            return self._token_locks.setdefault(token_file, threading.Lock())
+
+    def get(self, token_file: str):
+        """
+        Returns (credentials, service) for a token file, loading, refreshing and building as needed.
+
+        Raises:
+            ValueError: If the token file is missing or holds credentials that cannot be refreshed.
+        """
+        entry = self._entry(token_file, with_service=True)
+        return entry['creds'], entry['service']
+
+    def credentials(self, token_file: str, force_refresh: bool = False):
+        """
+        Like `get`, but returns only the (refreshed) credentials and never builds a service.
+        `force_refresh` refreshes them even when they look valid, e.g. after the server rejected the token.
+        """
+        return self._entry(token_file, with_service=False, force_refresh=force_refresh)['creds']
+
+    def _entry(self, token_file: str, with_service: bool, force_refresh: bool = False) -> Dict:
+        token_file = os.path.abspath(token_file)
+        # Per-token lock: a slow refresh for one account does not hold up the others.
+        with self._token_lock(token_file):
+            mtime = os.stat(token_file).st_mtime_ns if os.path.exists(token_file) else None
+            with self._lock:
+                entry = self._entries.get(token_file)
+                if entry and entry['mtime'] == mtime:
+                    self._entries.move_to_end(token_file)
+                    self.hits += 1
+                else:
+                    entry = None
+                    self.misses += 1
+
+            if entry is None:
+                if mtime is None:
+                    raise ValueError(f"Token file not found: {token_file}")
+                with open(token_file, 'rb') as token:
+                    raw = token.read()
+                entry = {'creds': pickle.loads(raw), 'raw': raw, 'mtime': mtime, 'service': None}
+
+            creds = entry['creds']
+            if force_refresh or self._needs_refresh(creds):
+                if not creds.refresh_token:
+                    raise ValueError(f"Token file is invalid or expired and cannot be refreshed: {token_file}")
+                from google.auth.transport.requests import Request
+                creds.refresh(Request())
+                self.refreshes += 1
+                self._write_back(token_file, entry)
+
+            if with_service and entry['service'] is None:
+                entry['service'] = discovery_cache.build('youtube', 'v3', creds)
+
+            with self._lock:
+                self._entries[token_file] = entry
+                self._entries.move_to_end(token_file)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return entry
+
+    def _needs_refresh(self, creds) -> bool:
+        if not creds.valid:
+            return True
+        # google-auth stores expiry as naive UTC.
+        return creds.expiry is not None and creds.expiry - datetime.utcnow() < timedelta(seconds=self.refresh_margin)
+
+    def _write_back(self, token_file: str, entry: Dict):
+        raw = pickle.dumps(entry['creds'])
+        if raw == entry['raw']:
+            return
+        # Write next to the target and rename, so a crash never leaves a truncated token file.
+        fd, tmp_path = tempfile.mkstemp(prefix='.token_', dir=os.path.dirname(token_file))
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(raw)
+            os.replace(tmp_path, token_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        entry['raw'], entry['mtime'] = raw, os.stat(token_file).st_mtime_ns
+        self.token_writes += 1
+
+    def invalidate(self, token_file: str):
+        with self._lock:
+            self._entries.pop(os.path.abspath(token_file), None)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for dashboards: hits, misses, refreshes, token_writes and current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'refreshes': self.refreshes,
+                    'token_writes': self.token_writes, 'size': len(self._entries)}
+
+# Shared by every uploader in the process, so parallel upload threads reuse each other's work.
+credential_cache = CredentialCache()
 
 class YouTubeUploader:
     """
     Handles authentication and video uploads to YouTube.
     This class is designed to work with specific token files for multi-account support.
+
+    Uploads go through the resumable protocol in `chunk_size` pieces. When a `session_store`
+    (e.g. JobStore) is given, the session survives restarts and the upload continues from the
+    offset the server confirmed. Credentials and service objects come from `credential_cache`.
+
+    upload_video keeps all per-upload state local, so one instance can serve several upload
+    threads at once. With a `quota_tracker`, quota is reserved per client project before each new
+    upload session, and quota rejections surface as QuotaExceededError instead of a failure.
     """
-    def __init__(self):
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, session_store=None, upload_url: str = UPLOAD_URL,
+                 cache: Optional[CredentialCache] = None, quota_tracker: Optional[QuotaTracker] = None):
         self.CLIENT_SECRETS_FILE = "client_secret.json"
         self.SCOPES = ['https://www.googleapis.com/auth/youtube.upload', 'https://www.googleapis.com/auth/youtube.readonly']
+        self.chunk_size, self.session_store, self.upload_url = chunk_size, session_store, upload_url
+        self.cache = cache or credential_cache
+        self.quota_tracker = quota_tracker
         self._service = None
 
     def authenticate(self, token_file: str) -> Tuple[bool, str]:
@@ -29,22 +157,7 @@ class YouTubeUploader:
             Tuple[bool, str]: A tuple containing a success flag and a message.
         """
         try:
-            creds = None
-            if os.path.exists(token_file):
-                with open(token_file, 'rb') as token:
-                    creds = pickle.load(token)
-
-            if not creds or not creds.valid:
-                if creds and creds.expired and creds.refresh_token:
-                    creds.refresh(Request())
-                else:
-                    return (False, f"Token file is invalid or expired and cannot be refreshed: {token_file}")
-                
-                # Re-save the refreshed token to ensure it's up-to-date
-                with open(token_file, 'wb') as token:
-                    pickle.dump(creds, token)
-
-            self._service = build('youtube', 'v3', credentials=creds)
+            _, self._service = self.cache.get(token_file)
             return (True, "Authentication successful.")
         except Exception as e:
             return (False, f"Authentication error for {token_file}: {e}")
@@ -53,7 +166,8 @@ class YouTubeUploader:
                      video_file: str,
                      config: 'YouTubeConfig',
                      token_file: str,
-                     progress_callback: Optional[Callable[[float], None]] = None
+                     progress_callback: Optional[Callable[[float], None]] = None,
+                     cancel_check: Optional[Callable[[], bool]] = None
                     ) -> Tuple[bool, str]:
         """
         Uploads a video to YouTube using credentials from a specific token file.
@@ -63,13 +177,82 @@ class YouTubeUploader:
             config (YouTubeConfig): A dataclass object with title, description, etc.
             token_file (str): The path to the token file for the target YouTube account.
             progress_callback (Optional[Callable[[float], None]]): A function to call with upload progress (0-100).
+            cancel_check (Optional[Callable[[], bool]]): Polled between chunks; the session is kept for a later resume.
+
+        Returns:
+            Tuple[bool, str]: A tuple containing a success flag and the resulting video URL or an error message.
+
+        Raises:
+            QuotaExceededError: When the project's quota for the day is used up; the upload should be
+                retried after `retry_at` rather than counted as failed.
+        """
+        def make_upload(body, reserve_quota):
+            stat = os.stat(video_file)
+            return ResumableUpload(
+                video_file, body, lambda force_refresh: self._access_token(token_file, force_refresh),
+                session_key=f"{os.path.abspath(video_file)}|{stat.st_size}|{stat.st_mtime_ns}|{token_file}",
+                session_store=self.session_store, chunk_size=self.chunk_size,
+                upload_url=self.upload_url, part=','.join(body.keys()), on_session_start=reserve_quota
+            )
+        return self._upload(make_upload, config, token_file, progress_callback, cancel_check)
+
+    def upload_stream(self,
+                      source,
+                      config: 'YouTubeConfig',
+                      token_file: str,
+                      progress_callback: Optional[Callable[[float], None]] = None,
+                      cancel_check: Optional[Callable[[], bool]] = None,
+                      start_producer: Optional[Callable[[], None]] = None
+                     ) -> Tuple[bool, str]:
+        """
+        Uploads a video while it is still being rendered.
+
+        Args:
+            source: Object with read(size) returning b"" at the end of the stream, e.g. a SpillBuffer.
+            config (YouTubeConfig): A dataclass object with title, description, etc.
+            token_file (str): The path to the token file for the target YouTube account.
+            start_producer (Optional[Callable[[], None]]): Starts whatever writes into `source`. It is
+                called once the quota check has passed, so no render is started for an upload that
+                cannot happen today.
 
         Returns:
             Tuple[bool, str]: A tuple containing a success flag and the resulting video URL or an error message.
+
+        Raises:
+            QuotaExceededError: As for upload_video; raised before any data is read from `source`.
         """
-        auth_ok, auth_msg = self.authenticate(token_file)
-        if not auth_ok:
-            return (False, auth_msg)
+        def make_upload(body, reserve_quota):
+            return StreamingResumableUpload(
+                source, body, lambda force_refresh: self._access_token(token_file, force_refresh),
+                chunk_size=self.chunk_size, upload_url=self.upload_url, part=','.join(body.keys()), on_session_start=reserve_quota
+            )
+        if self.quota_tracker:
+            try:
+                project = self.project_for(token_file)
+            except Exception as e:
+                return (False, f"Authentication error for {token_file}: {e}")
+            if self.quota_tracker.remaining(project) < UPLOAD_COST:
+                raise QuotaExceededError(project, self.quota_tracker.next_window_start())
+        if start_producer:
+            start_producer()
+        return self._upload(make_upload, config, token_file, progress_callback, cancel_check)
+
+    def _upload(self, make_upload, config: 'YouTubeConfig', token_file: str,
+                progress_callback: Optional[Callable[[float], None]],
+                cancel_check: Optional[Callable[[], bool]]) -> Tuple[bool, str]:
+        try:
+            project = self.project_for(token_file)
+        except Exception as e:
+            return (False, f"Authentication error for {token_file}: {e}")
+
+        reserved = False
+
+        def reserve_quota():
+            nonlocal reserved
+            if self.quota_tracker:
+                if not self.quota_tracker.try_reserve(project):
+                    raise QuotaExceededError(project, self.quota_tracker.next_window_start())
+                reserved = True
         
         try:
             body = {
@@ -92,22 +275,38 @@ class YouTubeUploader:
                 except ValueError:
                     return (False, "Invalid schedule format. Please use DD/MM/YYYY HH:MM.")
 
-            media = MediaFileUpload(video_file, chunksize=-1, resumable=True)
-
-            request = self._service.videos().insert(
-                part=','.join(body.keys()),
-                body=body,
-                media_body=media
-            )
-            
-            response = None
-            while response is None:
-                status, response = request.next_chunk()
-                if status and progress_callback:
-                    progress_callback(status.progress() * 100)
+            upload = make_upload(body, reserve_quota)
+            try:
+                response = upload.run(progress_callback, cancel_check)
+            except Exception as e:
+                if isinstance(e, ResumableUploadError) and is_quota_error(e.status, e.body):
+                    if self.quota_tracker:
+                        self.quota_tracker.mark_exhausted(project)
+                    raise QuotaExceededError(project, QuotaTracker.next_window_start()) from e
+                if reserved and upload.session_uri is None:
+                    # No session was created (bad metadata, retries exhausted, cancelled), so the
+                    # reserved units were never spent.
+                    self.quota_tracker.release(project)
+                raise
 
             video_id = response.get('id')
             video_url = f"https://www.youtube.com/watch?v={video_id}"
             return (True, video_url)
+        except QuotaExceededError:
+            raise
+        except UploadCancelled:
+            return (False, "Upload cancelled by user; it will resume from the confirmed offset next time.")
         except Exception as e:
-            return (False, f"Upload failed: {str(e)}")
\ No newline at end of file
+            return (False, f"Upload failed: {str(e)}")
+
+    def _access_token(self, token_file: str, force_refresh: bool = False) -> str:
+        # Called before every chunk, so a token that expires during a long upload is refreshed in place.
+        return self.cache.credentials(token_file, force_refresh).token
+
+    def project_for(self, token_file: str) -> str:
+        """The Google Cloud project (OAuth client id) whose quota uploads with this token consume."""
+        creds = self.cache.credentials(token_file)
+        return getattr(creds, 'client_id', None) or os.path.abspath(token_file)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.cache.stats()
\ No newline at end of file